@@ -0,0 +1,61 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Qubits and gates of the circuits compiled with every ancilla strategy
+
+Usage: python -m benchmarks.bench_ancilla [-k FILTER] [--max-qubits N] [--slow]
+"""
+
+import argparse
+
+from qlasskit import qlassf
+from qlasskit.compiler import LivenessStrategy, PebblingStrategy
+
+from .bench_compile import CASES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", "--filter", default="", help="Run only matching cases")
+    parser.add_argument(
+        "--max-qubits",
+        type=int,
+        default=0,
+        help="Qubit cap of the pebbling strategy (default: 0, as few as possible)",
+    )
+    parser.add_argument("--slow", action="store_true", help="Include the slow cases")
+    args = parser.parse_args()
+
+    strategies = [
+        ("default", None),
+        ("liveness", LivenessStrategy()),
+        (f"pebbling({args.max_qubits})", PebblingStrategy(args.max_qubits)),
+    ]
+    for name, src, slow in CASES:
+        if args.filter not in name or (slow and not args.slow):
+            continue
+
+        qf = qlassf(src, to_compile=False)
+        print(name)
+        for s_name, strategy in strategies:
+            qf.compile(ancilla_strategy=strategy)
+            st = qf.compile_stats.stages[-1]
+            print(
+                f"    {s_name:<16} {st.qubits:6} qubits {st.gates:8} gates "
+                f"{st.duration:9.4f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-stage time and peak memory of the compilation of representative functions
+
+Usage: python -m benchmarks.bench_compile [-k FILTER] [-r REPEAT] [--slow]
+    [--json OUT] [--compare BASELINE] [--threshold RATIO]
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+from .harness import bench, pipeline
+
+# (name, source, slow); slow cases take minutes and only run with --slow
+CASES: List[Tuple[str, str, bool]] = [
+    (
+        "qint8_add",
+        "def f(a: Qint8, b: Qint8) -> Qint8:\n\treturn a + b",
+        False,
+    ),
+    (
+        "qint8_cmp",
+        "def f(a: Qint8, b: Qint8) -> bool:\n\treturn a > b",
+        False,
+    ),
+    (
+        "qint8_mul",
+        "def f(a: Qint8, b: Qint8) -> Qint8:\n\treturn a * b",
+        True,
+    ),
+    (
+        "qint6_mul",
+        "def f(a: Qint6, b: Qint6) -> Qint6:\n\treturn a * b",
+        False,
+    ),
+    (
+        "qint16_add",
+        "def f(a: Qint16, b: Qint16) -> Qint16:\n\treturn a + b",
+        False,
+    ),
+    (
+        "qint16_cmp",
+        "def f(a: Qint16, b: Qint16) -> bool:\n\treturn a > b",
+        False,
+    ),
+    (
+        "qint16_mul",
+        "def f(a: Qint16, b: Qint16) -> Qint16:\n\treturn a * b",
+        True,
+    ),
+    (
+        "qfixed_add",
+        "def f(a: Qfixed[2, 3], b: Qfixed[2, 3]) -> Qfixed[2, 3]:\n\treturn a + b",
+        False,
+    ),
+    (
+        "qfixed_mul_const",
+        "def f(a: Qfixed[2, 3]) -> Qfixed[2, 3]:\n\treturn a * 3",
+        False,
+    ),
+    (
+        "qfixed_cmp",
+        "def f(a: Qfixed[2, 3], b: Qfixed[2, 3]) -> bool:\n\treturn a > b",
+        False,
+    ),
+    (
+        "qlist_sum",
+        "def f(a: Qlist[Qint4, 4]) -> Qint4:\n"
+        "\ts = Qint4(0)\n"
+        "\tfor x in a:\n"
+        "\t\ts = s + x\n"
+        "\treturn s",
+        False,
+    ),
+    (
+        "qmatrix_xor",
+        "def f(m: Qmatrix[bool, 3, 3]) -> bool:\n"
+        "\tr = False\n"
+        "\tfor row in m:\n"
+        "\t\tfor x in row:\n"
+        "\t\t\tr = r ^ x\n"
+        "\treturn r",
+        False,
+    ),
+    # Examples from docs/source
+    (
+        "hash_simp",
+        "def hash_simp(m: Qlist[Qint[4], 2]) -> Qint[8]:\n"
+        "\thv = 0\n"
+        "\tfor i in m:\n"
+        "\t\thv = ((hv << 4) ^ (hv >> 1) ^ i) & 0xFF\n"
+        "\treturn hv",
+        False,
+    ),
+    (
+        "sudoku_2x2",
+        "def sudoku_check(m: Qmatrix[bool, 2, 2]) -> bool:\n"
+        "\tconstr = m[0][0]\n"
+        "\tsub0 = m[0][0] ^ m[0][1]\n"
+        "\tsub1 = m[1][0] ^ m[1][1]\n"
+        "\tsub2 = m[0][0] ^ m[1][0]\n"
+        "\tsub3 = m[0][1] ^ m[1][1]\n"
+        "\treturn sub0 and sub1 and sub2 and sub3 and constr",
+        False,
+    ),
+    (
+        "sudoku_4x4",
+        "def sudoku_check(m: Qmatrix[Qint[2], 4, 4]) -> bool:\n"
+        "\tres = (m[0][2] == 3) and (m[0][0] == 1)\n"
+        "\tfor i in range(len(m)):\n"
+        "\t\tc = (Qint3(0) + m[i][0] + m[i][1] + m[i][2] + m[i][3]) == 6\n"
+        "\t\tr = (Qint3(0) + m[0][i] + m[1][i] + m[2][i] + m[3][i]) == 6\n"
+        "\t\tres = res and c and r\n"
+        "\treturn res",
+        False,
+    ),
+    (
+        "factorize",
+        "def factorize(a: Tuple[Qint[2], Qint[2]]) -> bool:\n"
+        "\treturn a[0] * a[1] == 9",
+        False,
+    ),
+    (
+        "sat",
+        "def sat(b_list: Qlist[bool, 5]) -> bool:\n"
+        "\tr = True\n"
+        "\ti = 0\n"
+        "\tfor b in b_list:\n"
+        "\t\tr = r and (b if i % 2 == 0 else not b)\n"
+        "\t\ti += 1\n"
+        "\treturn r",
+        False,
+    ),
+]
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Return the cases whose total time or peak memory grew more than `threshold`
+    times with respect to the baseline"""
+    regressions = []
+    for name, res in results.items():
+        if name not in baseline:
+            continue
+        for key in ["total", "max_peak_memory"]:
+            old, new = baseline[name][key], res[key]
+            if old > 0 and new / old > threshold:
+                regressions.append(f"{name}: {key} {old:.4g} -> {new:.4g}")
+    return regressions
+
+
+def print_result(name: str, res: Dict[str, Any]):
+    print(
+        f"{name}: {res['total']:.3f}s, "
+        f"peak {res['max_peak_memory'] / 1024**2:.2f}MiB"
+    )
+    for stage, t in res["time"].items():
+        print(
+            f"    {stage:<28} {t:9.4f}s "
+            f"{res['peak_memory'][stage] / 1024**2:9.2f}MiB"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", "--filter", default="", help="Run only matching cases")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("--slow", action="store_true", help="Include the slow cases")
+    parser.add_argument("--json", help="Write the results to a json file")
+    parser.add_argument("--compare", help="Baseline json to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Max ratio with the baseline before failing (default: 1.25)",
+    )
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+    for name, src, slow in CASES:
+        if args.filter not in name or (slow and not args.slow):
+            continue
+        results[name] = bench(lambda: pipeline(src), repeat=args.repeat)
+        print_result(name, results[name])
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
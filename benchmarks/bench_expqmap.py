@@ -0,0 +1,95 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Internal compiler on a 16 bit multiplication and on a wide expression list,
+compared with the linear scan ExpQMap
+
+Usage: python -m benchmarks.bench_expqmap [-w WIDTH] [--no-mul]
+
+The expressions of the multiplication take minutes to translate; they are kept in the
+compilation cache, so only the first run is slow.
+"""
+
+import argparse
+import time
+from typing import List
+
+from sympy import Symbol
+
+from qlasskit import qlassf
+from qlasskit.ast2logic import Arg, BoolExpList
+from qlasskit.compiler import ExpQMap, internalcompiler, to_quantum
+from qlasskit.types import Qint16
+
+MUL_SRC = "def mul(a: Qint8, b: Qint8) -> Qint16:\n\treturn a * b"
+
+
+class LinearScanExpQMap(ExpQMap):
+    """ExpQMap with the previous O(n) remove"""
+
+    def __setitem__(self, exp, qubit):
+        self.remove([qubit])
+        self.exp_map[exp] = qubit
+
+    def remove(self, qubits):
+        todel = [exp for exp, q in self.exp_map.items() if q in qubits]
+        for exp in todel:
+            del self.exp_map[exp]
+
+
+def wide(width: int):
+    """Every output bit is a function of three inputs, so all the subexpressions stay
+    live until the end of the compilation"""
+    ins = [Symbol(f"a.{i}") for i in range(width + 2)]
+    args = [Arg("a", bool, [s.name for s in ins])]
+    returns = Arg("_ret", Qint16, [f"_ret.{i}" for i in range(width)])
+    exps: BoolExpList = [
+        (Symbol(f"_ret.{i}"), (ins[i] & ins[i + 1]) ^ ~ins[i + 2]) for i in range(width)
+    ]
+    return args, returns, exps
+
+
+def bench(cls, args: List[Arg], returns: Arg, exps: BoolExpList) -> float:
+    internalcompiler.ExpQMap = cls
+    try:
+        t = time.perf_counter()
+        to_quantum("f", args, returns, exps)
+        return time.perf_counter() - t
+    finally:
+        internalcompiler.ExpQMap = ExpQMap
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-w", "--width", type=int, default=5_000)
+    parser.add_argument("--no-mul", action="store_true", help="Skip the multiplication")
+    args = parser.parse_args()
+
+    cases = []
+    if not args.no_mul:
+        qf = qlassf(MUL_SRC, to_compile=False, cache=True)
+        cases.append(("qint8 * qint8 -> qint16", qf.args, qf.returns, qf.expressions))
+    cases.append((f"wide {args.width}", *wide(args.width)))
+
+    for name, *case in cases:
+        t_new = bench(ExpQMap, *case)
+        t_old = bench(LinearScanExpQMap, *case)
+        print(
+            f"{name:<26} ExpQMap: {t_new:.3f}s, linear scan: {t_old:.3f}s "
+            f"({t_old / t_new:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Construction time of Grover circuits, given an already compiled oracle
+
+Usage: python -m benchmarks.bench_grover [-n ITERATIONS ...] [-b BITS]
+"""
+
+import argparse
+import time
+
+from qlasskit import qlassf
+from qlasskit.algorithms import Grover
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--iterations", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("-b", "--bits", type=int, default=12)
+    args = parser.parse_args()
+
+    src = f"def oracle(a: Qint{args.bits}) -> bool:\n\treturn (a * 3 + 7) & 0xff == 123"
+    qf = qlassf(src)
+
+    for n in args.iterations:
+        t = time.perf_counter()
+        grover = Grover(qf, n_iterations=n)
+        t_build = time.perf_counter() - t
+        qc = grover.circuit()
+        print(
+            f"qint{args.bits} x {n:<5} {t_build:.3f}s "
+            f"({qc.num_gates} gates, {qc.num_qubits} qubits)"
+        )
+
+
+if __name__ == "__main__":
+    main()
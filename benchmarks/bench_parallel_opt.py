@@ -0,0 +1,83 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Optimizer time of the default profile, sequential and over a process pool
+
+With --steps, every step runs in the pool whatever its size, and the time of each step
+is printed next to its input size: the steps that are not faster in the pool are below
+the size PARALLEL_NODES is meant to exclude.
+
+Usage: python -m benchmarks.bench_parallel_opt [-p PROCESSES ...] [-b BITS] [--steps]
+"""
+
+import argparse
+import time
+
+from sympy import preorder_traversal
+
+from qlasskit import CompileStats, qlassf
+from qlasskit.boolopt import BoolOptimizerProfile, defaultOptimizer
+
+noOptimizer = BoolOptimizerProfile([])
+
+SOURCES = {
+    "add": "def f(a: Qint{n}, b: Qint{n}) -> Qint{n}:\n\treturn a + b",
+    "cmp": "def f(a: Qint{n}, b: Qint{n}) -> bool:\n\treturn a > b and a != 3",
+    "cond": "def f(a: Qint{n}, b: Qint{n}) -> Qint{n}:\n"
+    "\treturn a + b if a > b else a - b",
+    "loop": "def f(a: Qint{n}, b: Qint{n}) -> Qint{n}:\n\tc = a\n\tfor i in range(2):"
+    "\n\t\tif c > b:\n\t\t\tc = c - b\n\treturn c",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-p", "--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("-b", "--bits", type=int, default=8)
+    parser.add_argument("--steps", action="store_true", help="Time every step")
+    args = parser.parse_args()
+
+    for name, src in SOURCES.items():
+        src = src.format(n=args.bits)
+        exps = qlassf(src, to_compile=False, bool_optimizer=noOptimizer).expressions
+        if args.steps:
+            bench_steps(f"{name}{args.bits}", exps, args.processes)
+            continue
+
+        for p in args.processes:
+            opt = defaultOptimizer.with_processes(p) if p > 1 else defaultOptimizer
+            t = time.perf_counter()
+            res = opt.apply(exps)
+            print(
+                f"{name}{args.bits} x {p:<3} {time.perf_counter() - t:.3f}s "
+                f"({len(res)} expressions)"
+            )
+
+
+def bench_steps(name, exps, processes):
+    stats = CompileStats(count_nodes=True)
+    defaultOptimizer.apply(exps, stats)
+    times = {p: CompileStats() for p in processes if p > 1}
+    for p, st in times.items():
+        defaultOptimizer.with_processes(p, parallel_nodes=0).apply(exps, st)
+
+    nodes = sum(1 for _, e in exps for _ in preorder_traversal(e))
+    for i, st in enumerate(stats.stages):
+        par = " ".join(f"x{p} {t.stages[i].duration:.4f}s" for p, t in times.items())
+        print(f"{name:8} {st.name:28} {nodes:7} nodes  x1 {st.duration:.4f}s {par}")
+        nodes = st.nodes
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""QASM export of a big circuit, compared with the linear scan reverse qubit lookup
+
+Usage: python -m benchmarks.bench_qasm_export [-g GATES] [-q QUBITS]
+"""
+
+import argparse
+import random
+import time
+
+from qlasskit.qcircuit import QCircuit
+from qlasskit.qcircuit.exporter_qasm import QasmExporter
+
+
+class LinearScanQCircuit(QCircuit):
+    """QCircuit with the previous O(n) get_key_by_index"""
+
+    def get_key_by_index(self, i: int):
+        for key in reversed(self.qubit_map.keys()):
+            if self.qubit_map[key] == i:
+                return key
+        raise Exception(f"Qubit with index {i} not found")
+
+
+def build(qc_class, n_gates: int, n_qubits: int) -> QCircuit:
+    random.seed(0)
+    qc = qc_class()
+    for i in range(n_qubits):
+        qc.add_qubit(f"q_{i}")
+    for _ in range(n_gates):
+        a, b, c = random.sample(range(n_qubits), 3)
+        random.choice([lambda: qc.x(a), lambda: qc.cx(a, b), lambda: qc.ccx(a, b, c)])()
+    return qc
+
+
+def bench(qc_class, n_gates: int, n_qubits: int) -> float:
+    qc = build(qc_class, n_gates, n_qubits)
+    t = time.perf_counter()
+    QasmExporter(version=3).export(qc, mode="circuit")
+    return time.perf_counter() - t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-g", "--gates", type=int, default=100_000)
+    parser.add_argument("-q", "--qubits", type=int, default=2_000)
+    args = parser.parse_args()
+
+    t = bench(QCircuit, args.gates, args.qubits)
+    print(f"QCircuit       {args.gates} gates, {args.qubits} qubits: {t:.3f}s")
+
+    # The linear scan is measured on a fraction of the gates and scaled up
+    frac = 100
+    t = bench(LinearScanQCircuit, args.gates // frac, args.qubits) * frac
+    print(f"linear scan    {args.gates} gates, {args.qubits} qubits: ~{t:.3f}s (est.)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Time of the SympyTransformer steps of the default profile, and of the same rewrites
+fused in a rule_rewrite step, on ripple-carry adders and on conditionals
+
+Usage: python -m benchmarks.bench_transformers [-w WIDTH ...] [-b BITS ...]
+"""
+
+import argparse
+import time
+
+from sympy import Symbol
+
+from qlasskit import qlassf
+from qlasskit.boolopt import (
+    BoolOptimizerProfile,
+    SympyTransformer,
+    defaultOptimizer,
+    fusedOptimizer,
+)
+from qlasskit.boolopt.bool_optimizer import apply_cse, merge_expressions
+from qlasskit.types import _full_adder
+
+
+def ripple_carry(n):
+    """Return the expressions of the sum bits and of the carry of an n bit adder; the
+    carry chain is shared by all of them"""
+    carry = Symbol("cin")
+    exps = []
+    for i in range(n):
+        carry, s = _full_adder(carry, Symbol(f"a.{i}"), Symbol(f"b.{i}"))
+        exps.append((Symbol(f"_ret.{i}"), s))
+    return exps + [(Symbol("_ret.c"), carry)]
+
+
+def conditional(n):
+    """Return the merged expressions of a conditional over Qint of n bits, before the
+    transformer steps"""
+    src = (
+        f"def f(a: Qint{n}, b: Qint{n}) -> Qint{n}:\n\treturn a + b if a > b else a - b"
+    )
+    opt = BoolOptimizerProfile([merge_expressions, apply_cse])
+    return qlassf(src, to_compile=False, bool_optimizer=opt).expressions
+
+
+def run(name, n, exps):
+    res = []
+    for profile in [defaultOptimizer, fusedOptimizer]:
+        steps = [s for s in profile.steps if isinstance(s, SympyTransformer)]
+        t = time.perf_counter()
+        out = exps
+        for step in steps:
+            out = profile.apply_step(step, out)
+        res.append(time.perf_counter() - t)
+    print(f"{name:<6} {n:<4} passes {res[0]:.3f}s, fused {res[1]:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-w", "--widths", type=int, nargs="+", default=[8, 16, 32, 64, 128]
+    )
+    parser.add_argument("-b", "--bits", type=int, nargs="+", default=[2, 4, 8])
+    args = parser.parse_args()
+
+    for n in args.widths:
+        run("adder", n, ripple_carry(n))
+    for n in args.bits:
+        run("cond", n, conditional(n))
+
+
+if __name__ == "__main__":
+    main()
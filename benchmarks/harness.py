@@ -0,0 +1,119 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Stage by stage driver of the qlassf compilation pipeline, used by the benchmarks"""
+
+import ast
+import time
+import tracemalloc
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+from qlasskit.ast2ast import ast2ast
+from qlasskit.ast2logic import translate_ast
+from qlasskit.boolopt import BoolOptimizerProfile, defaultOptimizer
+from qlasskit.compiler import to_quantum
+from qlasskit.qcircuit.exporter_qasm import QasmExporter
+
+Stage = Tuple[str, Callable[[Any], Any]]
+
+
+def pipeline(
+    src: str,
+    types: List[Any] = [],
+    defs: List[Any] = [],
+    bool_optimizer: BoolOptimizerProfile = defaultOptimizer,
+    compiler: str = "internal",
+    uncompute: bool = True,
+) -> List[Stage]:
+    """Return the stages of the compilation of `src`, as in QlassF.from_function; every
+    stage takes the output of the previous one"""
+    state: Dict[str, Any] = {}
+
+    def translate(fun):
+        state["name"], state["args"], state["returns"], exps = translate_ast(
+            fun, types, defs
+        )
+        return exps
+
+    def compile(exps):
+        return to_quantum(
+            state["name"],
+            state["args"],
+            state["returns"],
+            exps,
+            compiler=compiler,
+            uncompute=uncompute,
+        )
+
+    stages: List[Stage] = [
+        ("parse", lambda _: ast.parse(src)),
+        ("ast2ast", lambda fun_ast: ast2ast(fun_ast.body[0])),
+        ("translate_ast", translate),
+    ]
+    stages += [
+        (
+            BoolOptimizerProfile.step_name(i, s),
+            partial(BoolOptimizerProfile.apply_step, s),
+        )
+        for i, s in enumerate(bool_optimizer.steps)
+    ]
+    stages += [
+        ("compile", compile),
+        ("export", lambda qc: QasmExporter(version=3).export(qc, mode="circuit")),
+    ]
+    return stages
+
+
+def run_stages(stages: List[Stage], trace_memory: bool = False) -> Dict[str, Any]:
+    """Run the stages once, returning the wall time of each stage (and its peak memory
+    in bytes if trace_memory is True) and the output of the last one"""
+    times: Dict[str, float] = {}
+    peaks: Dict[str, int] = {}
+    value = None
+
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        for name, fn in stages:
+            if trace_memory:
+                tracemalloc.reset_peak()
+            t = time.perf_counter()
+            value = fn(value)
+            times[name] = time.perf_counter() - t
+            if trace_memory:
+                peaks[name] = tracemalloc.get_traced_memory()[1]
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    return {"time": times, "peak_memory": peaks, "result": value}
+
+
+def bench(stages_factory: Callable[[], List[Stage]], repeat: int = 3) -> Dict[str, Any]:
+    """Benchmark a pipeline: the time of every stage is the minimum over `repeat` runs,
+    the peak memory is measured in a separate run since tracing slows down the stages"""
+    best: Dict[str, float] = {}
+    for _ in range(repeat):
+        res = run_stages(stages_factory())
+        for k, v in res["time"].items():
+            best[k] = min(best.get(k, v), v)
+
+    res = run_stages(stages_factory(), trace_memory=True)
+    return {
+        "time": best,
+        "total": sum(best.values()),
+        "peak_memory": res["peak_memory"],
+        "max_peak_memory": max(res["peak_memory"].values(), default=0),
+    }
@@ -17,6 +17,8 @@ __version__ = "0.1.37"
 
 from .qcircuit import QCircuit, SupportedFrameworks, SupportedFramework  # noqa: F401
 from .qlassfun import QlassF, qlassf, qlassfa  # noqa: F401
+from .cache import CompilationCache  # noqa: F401
+from .compile_stats import CompileStats, SkippedStep, StageStats  # noqa: F401
 from .ast2ast import ast2ast  # noqa: F401
 from .ast2logic import exceptions  # noqa: F401
 from .types import (  # noqa: F401, F403
@@ -28,6 +28,7 @@ class Grover(QAlgorithm):
         element_to_search: Optional[Qtype] = None,
         n_iterations: Optional[int] = None,
         n_matching: int = 1,
+        subcircuits: bool = False,
     ):
         """
         Args:
@@ -37,6 +38,8 @@ class Grover(QAlgorithm):
             n_iterations (int, optional): force a number of iterations
                 (otherwise, pi/4*sqrt(N/n_matching))
             n_matching (int): the number of expected matching values (default: 1)
+            subcircuits (bool): if True, the oracle and the diffuser are defined once as
+                subcircuits and called at every iteration, instead of being inlined
         """
         if len(oracle.args) != 1:
             raise Exception("the oracle should receive exactly one parameter")
@@ -64,7 +67,7 @@ class Grover(QAlgorithm):
         else:
             self.oracle = oracle
 
-        oracle_qc = self.oracle.circuit()
+        oracle_qc = self.oracle.circuit().copy()
 
         # Add negative phase to result
         oracle_qc.add_qubit(name="_ret_phased")
@@ -96,7 +99,66 @@ class Grover(QAlgorithm):
         self._qcircuit.h(oracle_qc["_ret_phased"])
 
         # Repeat oracle and diffuser for n_iterations
-        self._qcircuit += (oracle_qc + diffuser_qc).repeat(n_iterations)
+        if subcircuits:
+            block = QCircuit(oracle_qc.num_qubits)
+            block.append_subcircuit(oracle_qc, name=self.oracle.name)
+            block.append_subcircuit(diffuser_qc, name="diffuser")
+        else:
+            block = oracle_qc + diffuser_qc
+            block.remove_identities()
+        # The iterations are a lazy view of the block, materialized only on change
+        self._qcircuit += block.repeat(n_iterations)
+
+    def _matching_mask(self):
+        """Return a boolean array with the output of the oracle for every element of the
+        search space, evaluated classically"""
+        import numpy as np
+
+        size = 2**self.search_space_size
+        try:
+            packed = self.oracle.truth_table_packed()[-1].astype("<u8")
+            bits = np.unpackbits(packed.view(np.uint8), bitorder="little")[:size]
+        except Exception:
+            bits = np.array([row[-1] for row in self.oracle.truth_table()])
+        return bits.astype(bool)
+
+    def success_probabilities(
+        self, max_iterations: Optional[int] = None
+    ) -> List[float]:
+        """Return the probability of measuring a matching element after 0, 1, ...,
+        max_iterations iterations (default: twice n_iterations), to tune n_iterations
+        and n_matching without simulating the circuit.
+
+        The matching elements are found by evaluating the oracle classically, then the
+        circuit is simulated on the amplitudes of the search register, _ret and
+        _ret_phased only, so every iteration costs O(2**n): the oracle flips _ret of
+        the matching elements and the phase of the states with _ret and _ret_phased
+        set, and the diffuser is a reflection about the mean of the amplitudes of the
+        search register and _ret_phased, for every value of _ret.
+
+        Args:
+            max_iterations (int, optional): the last iteration count of the curve
+        """
+        import numpy as np
+
+        if max_iterations is None:
+            max_iterations = 2 * self.n_iterations
+
+        # The oracle and the diffuser do not depend on the order of the elements, so the
+        # amplitudes are indexed by (_ret, _ret_phased, row of the truth table)
+        matching = np.flatnonzero(self._matching_mask())
+        size = 2**self.search_space_size
+        amps = np.zeros((2, 2, size))
+        amps[0] = 1 / math.sqrt(2 * size)
+
+        probs = [len(matching) / size]
+        for _ in range(max_iterations):
+            amps[:, :, matching] = amps[::-1, :, matching]
+            amps[1, 1] *= -1
+            amps -= 2 * amps.mean(axis=(1, 2), keepdims=True)
+            amps *= -1
+            probs.append(float(np.sum(amps[:, :, matching] ** 2)))
+        return probs
 
     # @override
     @property
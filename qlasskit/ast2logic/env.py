@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import sys
+from functools import lru_cache
 from typing import Dict, List, Tuple
 
 from sympy import Symbol
@@ -30,6 +31,35 @@ from .typing import Arg, LogicFun
 Binding: TypeAlias = Arg
 TypeBinding = Tuple[str, Qtype]
 
+BOUND_DEFS_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=BOUND_DEFS_CACHE_SIZE)
+def _bind_logicfun(prefix: str, args: Tuple, exps: Tuple, n_rets: int) -> Tuple:
+    """Rename args and exps of a def with `prefix` and compress the exps so it contains
+    only the n_rets return expressions; memoized on the (hashable) def content"""
+    r_args = tuple(
+        (f"{prefix}_{name}", ttype, tuple(f"{prefix}_{b}" for b in bitvec))
+        for name, ttype, bitvec in args
+    )
+
+    # Replace all the symbols in expr with def_name+symbol
+    r_map: Dict[Symbol, Symbol] = {}
+    d_exp: Dict[Symbol, Boolean] = {}
+    n_exps = []
+    for s, e in exps:
+        for x in e.free_symbols:
+            if x not in r_map:
+                r_map[x] = Symbol(f"{prefix}_{x.name}")
+        r_s = Symbol(f"{prefix}_{s.name}")
+
+        # Compress expr so it contains only len(returns) expressions
+        new_e = e.xreplace(r_map).xreplace(d_exp)
+        d_exp[r_s] = new_e
+        n_exps.append((r_s, new_e))
+
+    return r_args, tuple(n_exps[-n_rets:])
+
 
 class Env:
     def __init__(self) -> None:
@@ -64,36 +94,22 @@ class Env:
         if self.know_type(deff[0]):
             return
 
-        # Replace all the symbols in expr with def_name+symbol
-        def arg_rename(a):
-            a.name = f"{deff[0]}_{a.name}"
-            a.bitvec = list(map(lambda b: f"{deff[0]}_{b}", a.bitvec))
-            return a
-
-        def exp_rename(se):
-            s, e = se
-            for x in e.free_symbols:
-                e = e.subs(x, Symbol(f"{deff[0]}_{x.name}"))
-            return (Symbol(f"{deff[0]}_{s.name}"), e)
-
-        deff = (
-            deff[0],  # name
-            list(map(arg_rename, deff[1])),  # args
-            deff[2],  # returns
-            list(map(exp_rename, deff[3])),  # exprs
+        name, args, returns, exps = deff
+        r_args, r_exps = _bind_logicfun(
+            name,
+            tuple((a.name, a.ttype, tuple(a.bitvec)) for a in args),
+            tuple(exps),
+            len(returns),
         )
 
-        # Compress expr so it contains only len(returns) expressions
-        d_exp: Dict[Symbol, Boolean] = {}
-        n_exps = []
-        for s, e in deff[3]:
-            new_e = e.subs(d_exp)
-            d_exp[s] = new_e
-            n_exps.append((s, new_e))
-
-        deff = (deff[0], deff[1], deff[2], n_exps[-len(deff[2]) :])
-
-        self.defs.append(deff)
+        self.defs.append(
+            (
+                name,
+                [Arg(n, ttype, list(bitvec)) for n, ttype, bitvec in r_args],
+                returns,
+                list(r_exps),
+            )
+        )
 
     def getdef(self, fun_name: str) -> LogicFun:
         try:
@@ -14,8 +14,13 @@
 # isort:skip_file
 
 from .sympytransformer import SympyTransformer  # noqa: F401
+from .booldag import BoolDAG, BoolNode  # noqa: F401
+from .budget import Budget  # noqa: F401
+from .rules import Rule, rule_rewrite  # noqa: F401
 from .bool_optimizer import (  # noqa: F401
     BoolOptimizerProfile,
     defaultOptimizer,
     fastOptimizer,
+    fusedOptimizer,
+    xagOptimizer,
 )
@@ -12,13 +12,29 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Dict
+import inspect
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-from sympy import Symbol, cse
+from sympy import Basic, Symbol, cse, numbered_symbols
 from sympy.logic.boolalg import And, Boolean, Not, Or, Xor, simplify_logic
 
 from ..ast2logic import BoolExpList
 from . import SympyTransformer
+from .budget import (
+    Budget,
+    BudgetGuard,
+    check_deadline,
+    exceeds_nodes,
+    run_in_worker,
+    run_with_timeout,
+    time_left,
+    wait_first,
+    worker_result,
+)
 from .exp_transformers import (
     remove_Implies,
     remove_ITE,
@@ -26,9 +42,15 @@ from .exp_transformers import (
     transform_or2and,
     transform_or2xor,
 )
+from .rules import Rule, absorption_rules, default_rules, rule_rewrite
+from .xag import xag_rewrite
+
+if TYPE_CHECKING:
+    from ..compile_stats import CompileStats
 
 
 def custom_simplify_logic(expr):
+    check_deadline()
     if isinstance(expr, Xor):
         return expr
     elif isinstance(expr, (And, Or, Not)):
@@ -38,27 +60,211 @@ def custom_simplify_logic(expr):
         return simplify_logic(expr)
 
 
-def merge_expressions(exps: BoolExpList) -> BoolExpList:
-    n_exps = []
-    emap: Dict[Symbol, Boolean] = {}
+ExpGuard = Callable[[Symbol, Callable[[Boolean], Boolean], Boolean], Optional[Boolean]]
+"""Applies a function to the expression of a symbol, returning None if it exceeds the
+budget"""
 
-    for s, e in exps:
-        e = e.xreplace(emap)
-        e = custom_simplify_logic(e)
+
+class _Packed:
+    """A list of expressions, pickled as the table of their shared nodes.
+
+    Unpickling a sympy expression calls the constructor of every node, evaluating it
+    again, and takes longer than most optimizer steps; the expressions here are already
+    evaluated, so they are rebuilt with Basic.__new__."""
+
+    def __init__(self, exps: List[Any]):
+        self.exps = exps
+
+    def __reduce__(self):
+        index: Dict[int, int] = {}
+        nodes: List[Any] = []
+
+        # Post-order walk with an explicit stack, as expressions can be deeper than the
+        # recursion limit
+        stack = list(self.exps)
+        while stack:
+            e = stack[-1]
+            if id(e) in index:
+                stack.pop()
+                continue
+            pending = [a for a in e.args if id(a) not in index]
+            if pending:
+                stack += pending
+                continue
+
+            stack.pop()
+            if e.args:
+                args = tuple(index[id(a)] for a in e.args)
+                nodes.append((type(e), args, hasattr(e, "_argset")))
+            else:
+                nodes.append(e)
+            index[id(e)] = len(nodes) - 1
+
+        return _Packed._load, (nodes, [index[id(e)] for e in self.exps])
+
+    @staticmethod
+    def _load(nodes: List[Any], roots: List[int]) -> "_Packed":
+        objs: List[Basic] = []
+        for n in nodes:
+            if isinstance(n, tuple):
+                cls, args, argset = n
+                obj = Basic.__new__(cls, *[objs[a] for a in args])
+                if argset:
+                    obj._argset = frozenset(obj._args)
+                n = obj
+            objs.append(n)
+        return _Packed([objs[r] for r in roots])
+
+
+class _Merge:
+    """The state of merge_expressions"""
+
+    def __init__(self, exps: BoolExpList):
+        self.exps = exps
+        self.emap: Dict[Symbol, Boolean] = {}
+        self.res: BoolExpList = []
+        self.temps: Optional[Iterator[Symbol]] = None
+
+    def add(self, s: Symbol, e: Boolean, r: Optional[Boolean]):
+        """Add the merged expression r of the next assignment s = e"""
+        # An expression exceeding the budget is kept unsimplified; if it is not a
+        # return value, it is computed once in a new symbol instead of being inlined
+        if r is None:
+            r = e.xreplace(self.emap)
+            if s.name[0:4] != "_ret":
+                if self.temps is None:
+                    used = {x for t, ex in self.exps for x in ex.free_symbols | {t}}
+                    self.temps = numbered_symbols("m", exclude=used)
+                t = next(self.temps)
+                self.res.append((t, r))
+                r = t
 
         if s.name[0:4] != "_ret":
-            emap[s] = e
+            self.emap[s] = r
         else:
-            n_exps.append((s, e))
+            self.res.append((s, r))
+
+
+def _merge_one(s: Symbol, packed: _Packed, budget: Optional[Budget]):
+    """Inline in e the expressions of the used symbols and simplify it within the
+    budget, where packed holds e followed by the used symbols and their expressions;
+    return the result (None if it exceeds the budget) and the skips. Runs in the
+    workers of a parallel merge"""
+    e, *rest = packed.exps
+    emap = dict(zip(rest[0::2], rest[1::2]))
+
+    def merge(e):
+        return custom_simplify_logic(e.xreplace(emap))
 
-    return n_exps
+    if budget is None:
+        return _Packed([merge(e)]), []
+    guard = BudgetGuard(budget)
+    r = guard(s, merge, e)
+    return (None if r is None else _Packed([r])), guard.skipped
+
+
+def _merge_parallel(m: _Merge, guard: Optional[BudgetGuard], executor: Executor):
+    """Merge the assignments in the executor, each as soon as the assignments it
+    depends on are merged; results are added in order, so they are the same of a
+    sequential merge"""
+    exps = m.exps
+    budget = guard.budget if guard is not None else None
+
+    # An assignment can start when the last assignment of every symbol it uses is added
+    last: Dict[Any, int] = {}
+    need = []
+    for i, (s, e) in enumerate(exps):
+        need.append(max([last[x] + 1 for x in e.free_symbols if x in last], default=0))
+        last[s] = i
+    order = sorted(range(len(exps)), key=lambda i: need[i])
+
+    running: Dict[Future, int] = {}
+    done: Dict[int, Any] = {}
+    added, p = 0, 0
+
+    def submit():
+        # Called after every add: the symbols used by the submitted assignments can
+        # only be redefined by later ones, which are not added yet
+        nonlocal p
+        while p < len(order) and need[order[p]] <= added:
+            s, e = exps[order[p]]
+            used: List[Any] = [x for x in e.free_symbols if x in m.emap]
+            packed = _Packed([e] + [y for x in used for y in (x, m.emap[x])])
+            fut = executor.submit(
+                run_in_worker, _merge_one, time_left(), s, packed, budget
+            )
+            running[fut] = order[p]
+            p += 1
+
+    try:
+        submit()
+        while added < len(exps):
+            for fut in wait_first(running):
+                done[running.pop(fut)] = worker_result(fut)
+
+            while added in done:
+                r, skipped = done.pop(added)
+                if guard is not None:
+                    guard.skipped += skipped
+                m.add(*exps[added], None if r is None else r.exps[0])
+                added += 1
+                submit()
+    finally:
+        for fut in running:
+            fut.cancel()
+
+
+def merge_expressions(
+    exps: BoolExpList,
+    guard: Optional[ExpGuard] = None,
+    executor: Optional[Executor] = None,
+) -> BoolExpList:
+    m = _Merge(exps)
+    if executor is not None and (guard is None or isinstance(guard, BudgetGuard)):
+        _merge_parallel(m, guard, executor)
+        return m.res
+
+    def merge(e):
+        return custom_simplify_logic(e.xreplace(m.emap))
+
+    for s, e in exps:
+        m.add(s, e, merge(e) if guard is None else guard(s, merge, e))
+    return m.res
+
+
+def sort_by_dependencies(exps: BoolExpList) -> BoolExpList:
+    """Stable topological sort of the assignments of exps, so every symbol is assigned
+    before its first use"""
+    index: Dict[Any, int] = {s: i for i, (s, _) in enumerate(exps)}
+    placed = set()
+    res = []
+    for i in range(len(exps)):
+        stack = [i]
+        while stack:
+            j = stack[-1]
+            if j in placed:
+                stack.pop()
+                continue
+            deps = [
+                index[x]
+                for x in exps[j][1].free_symbols
+                if x in index and index[x] not in placed
+            ]
+            if deps:
+                stack.extend(deps)
+            else:
+                placed.add(j)
+                res.append(exps[j])
+                stack.pop()
+    return res
 
 
 def apply_cse(exps: BoolExpList) -> BoolExpList:
     lsts = list(zip(*exps))
     repl, red = cse(list(lsts[1]))
     res = repl + list(zip(lsts[0], red))
-    return res
+    # Subexpressions are hoisted before the temporaries they use, if exps has any
+    return sort_by_dependencies(res)
 
 
 def print_step(name: str):
@@ -71,16 +277,220 @@ def print_step(name: str):
     return _print_step
 
 
+def _transform(opt: SympyTransformer, packed: _Packed, budget: Optional[Budget]):
+    """Apply opt to every expression within the budget, where packed holds symbols and
+    expressions alternated; return the results packed the same way and the skips. Runs
+    in the workers of a parallel step"""
+    exps = list(zip(packed.exps[0::2], packed.exps[1::2]))
+    guard = BudgetGuard(budget) if budget is not None else None
+    res = BoolOptimizerProfile.apply_step(opt, exps, guard)
+    skipped = guard.skipped if guard is not None else []
+    return _Packed([x for s, e in res for x in (s, e)]), skipped
+
+
+PARALLEL_NODES = 10000
+"""Default node count above which a step runs in the pool: on smaller inputs the
+transfer of the expressions to the workers costs more than half of the step (see
+benchmarks/bench_parallel_opt.py)"""
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(processes: int) -> ProcessPoolExecutor:
+    """Return the pool of `processes` workers shared by the profiles, started on first
+    use and kept for the next compilations"""
+    with _pools_lock:
+        if processes not in _pools:
+            _pools[processes] = ProcessPoolExecutor(processes)
+        return _pools[processes]
+
+
 class BoolOptimizerProfile:
-    def __init__(self, steps):
-        self.steps = steps
+    """A list of optimizer steps, applied in order to the expressions of a function.
+
+    Args:
+        steps (list): functions of a BoolExpList, SympyTransformer applied to every
+            expression, or Rule; consecutive rules are applied together by a single
+            rule_rewrite step
+        budget (Budget, optional): time and node limits of every step, and of every
+            step on a single expression; a step exceeding them leaves its input
+            unsimplified and is reported in CompileStats.skipped (default: no limit).
+            Steps with skippable = False, like remove_ITE, always run
+        processes (int, optional): if greater than 1, SympyTransformer steps and the
+            steps accepting an executor argument (like merge_expressions) run in a pool
+            of worker processes (default: None)
+        parallel_nodes (int, optional): with processes, only the steps whose input has
+            more sympy nodes run in the pool (default: PARALLEL_NODES)
+    """
 
-    def apply(self, exps):
-        for opt in self.steps:
-            if isinstance(opt, SympyTransformer):
-                exps = list(map(lambda e: (e[0], opt.visit(e[1])), exps))
+    def __init__(
+        self,
+        steps,
+        budget: Optional[Budget] = None,
+        processes: Optional[int] = None,
+        parallel_nodes: int = PARALLEL_NODES,
+    ):
+        self.steps = []
+        for step in steps:
+            if not isinstance(step, Rule):
+                self.steps.append(step)
+            elif self.steps and isinstance(self.steps[-1], rule_rewrite):
+                self.steps[-1] = rule_rewrite(self.steps[-1].rules + [step])
             else:
-                exps = opt(exps)
+                self.steps.append(rule_rewrite([step]))
+        self.budget = budget
+        self.processes = processes
+        self.parallel_nodes = parallel_nodes
+
+    def with_budget(self, **kwargs) -> "BoolOptimizerProfile":
+        """Return a copy of the profile with the budget given by kwargs (see Budget);
+        the node limits are exact, while step_time and exp_time are best-effort and
+        do not interrupt a running sympy call"""
+        return BoolOptimizerProfile(
+            self.steps, Budget(**kwargs), self.processes, self.parallel_nodes
+        )
+
+    def with_processes(
+        self, processes: Optional[int] = None, parallel_nodes: int = PARALLEL_NODES
+    ) -> "BoolOptimizerProfile":
+        """Return a copy of the profile optimizing in parallel over `processes` worker
+        processes (default: the number of cpus) the steps whose input has more than
+        parallel_nodes nodes; the result is the same as the one of the sequential
+        profile"""
+        return BoolOptimizerProfile(
+            self.steps, self.budget, processes or os.cpu_count() or 1, parallel_nodes
+        )
+
+    @staticmethod
+    def step_name(i: int, opt) -> str:
+        """Return the name of the i-th step, as reported in the compile stats"""
+        return f"opt:{i}:{getattr(opt, '__name__', opt.__class__.__name__)}"
+
+    @staticmethod
+    def apply_step(
+        opt,
+        exps: BoolExpList,
+        guard: Optional[ExpGuard] = None,
+        executor: Optional[Executor] = None,
+    ) -> BoolExpList:
+        """Apply a step; guard, if given, runs the step on every single expression (for
+        SympyTransformer and for steps accepting a guard argument). With an executor,
+        SympyTransformer run on chunks of exps in parallel, and the steps accepting an
+        executor argument get it"""
+        if isinstance(opt, SympyTransformer):
+            if executor is not None and (
+                guard is None or isinstance(guard, BudgetGuard)
+            ):
+                return BoolOptimizerProfile._apply_transformer(
+                    opt, exps, guard, executor
+                )
+            with opt.memo():
+                if guard is None:
+                    return list(map(lambda e: (e[0], opt.visit(e[1])), exps))
+                res = []
+                for s, e in exps:
+                    r = guard(s, opt.visit, e)
+                    res.append((s, e if r is None else r))
+                return res
+
+        params = inspect.signature(opt).parameters
+        kwargs: Dict[str, Any] = {}
+        if guard is not None and "guard" in params:
+            kwargs["guard"] = guard
+        if executor is not None and "executor" in params:
+            kwargs["executor"] = executor
+        return opt(exps, **kwargs)
+
+    @staticmethod
+    def _apply_transformer(
+        opt, exps: BoolExpList, guard: Optional[BudgetGuard], executor: Executor
+    ) -> BoolExpList:
+        budget = guard.budget if guard is not None else None
+        size = -(-len(exps) // (4 * (os.cpu_count() or 1)))
+        chunks = [
+            _Packed([x for s, e in exps[i : i + size] for x in (s, e)])
+            for i in range(0, len(exps), size)
+        ]
+
+        futures = [
+            executor.submit(run_in_worker, _transform, time_left(), opt, c, budget)
+            for c in chunks
+        ]
+        res: BoolExpList = []
+        try:
+            for fut in futures:
+                r, skipped = worker_result(fut)
+                res += list(zip(r.exps[0::2], r.exps[1::2]))
+                if guard is not None:
+                    guard.skipped += skipped
+        finally:
+            for fut in futures:
+                fut.cancel()
+        return res
+
+    @staticmethod
+    def skip_step(opt, exps: BoolExpList) -> BoolExpList:
+        """Return the result of a skipped step: its input, or for the steps accepting a
+        guard (like merge_expressions) their result without simplifying anything"""
+        if not isinstance(opt, SympyTransformer) and (
+            "guard" in inspect.signature(opt).parameters
+        ):
+            return opt(exps, lambda s, f, e: None)
+        return exps
+
+    def apply_budgeted_step(
+        self, opt, exps: BoolExpList, executor: Optional[Executor] = None
+    ) -> Tuple[BoolExpList, List[Tuple[str, Optional[str]]]]:
+        """Apply a step within the budget, returning the result and the list of the
+        skips as (reason, symbol name or None if the whole step was skipped)"""
+        if self.budget is None or not getattr(opt, "skippable", True):
+            return self.apply_step(opt, exps, executor=executor), []
+
+        b = self.budget
+        if exceeds_nodes(exps, b.step_nodes):
+            return self.skip_step(opt, exps), [("nodes", None)]
+
+        guard = None
+        if b.exp_time is not None or b.exp_nodes is not None:
+            guard = BudgetGuard(b)
+
+        ok, res = run_with_timeout(
+            lambda: self.apply_step(opt, exps, guard, executor), b.step_time
+        )
+        if not ok:
+            return self.skip_step(opt, exps), [("time", None)]
+        if exceeds_nodes(res, b.step_nodes):
+            return self.skip_step(opt, exps), [("nodes", None)]
+        return res, guard.skipped if guard is not None else []
+
+    def executor_for(self, exps: BoolExpList) -> Optional[Executor]:
+        """Return the pool to run a step on exps in, None if it runs in this process"""
+        if self.processes is None or self.processes < 2:
+            return None
+        if not exceeds_nodes(exps, self.parallel_nodes):
+            return None
+        return _pool(self.processes)
+
+    def apply(self, exps, stats: Optional["CompileStats"] = None):
+        try:
+            for i, opt in enumerate(self.steps):
+                executor = self.executor_for(exps)
+                if stats is None:
+                    exps, _ = self.apply_budgeted_step(opt, exps, executor)
+                    continue
+
+                name = self.step_name(i, opt)
+                with stats.stage(name, "optimizer"):
+                    exps, skipped = self.apply_budgeted_step(opt, exps, executor)
+                    stats.set_expressions(exps)
+                for reason, symbol in skipped:
+                    stats.skip(name, reason, symbol)
+        except BrokenProcessPool:
+            # A worker died: the next steps start a new pool
+            with _pools_lock:
+                _pools.pop(self.processes or 0, None)
+            raise
         return exps
 
 
@@ -121,3 +531,20 @@ fastOptimizer = BoolOptimizerProfile(
         remove_obvious_expr(),
     ]
 )
+
+
+xagOptimizer = BoolOptimizerProfile(
+    [
+        xag_rewrite(),
+        remove_ITE(),
+        remove_Implies(),
+        transform_or2xor(),
+        transform_or2and(),
+        remove_obvious_expr(),
+    ]
+)
+
+
+fusedOptimizer = BoolOptimizerProfile(
+    [merge_expressions, apply_cse, *default_rules, *absorption_rules]
+)
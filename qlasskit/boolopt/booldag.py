@@ -0,0 +1,440 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sympy import Symbol
+from sympy.logic import ITE, And, Equivalent, Implies, Not, Or, Xor
+from sympy.logic.boolalg import Boolean, BooleanFalse, BooleanTrue, false, true
+
+from ..ast2logic import BoolExpList
+
+OP_FALSE = 0
+OP_TRUE = 1
+OP_VAR = 2
+OP_NOT = 3
+OP_AND = 4
+OP_OR = 5
+OP_XOR = 6
+
+OP_NAMES = ["false", "true", "var", "not", "and", "or", "xor"]
+
+# An instruction of a compiled program: (node, opcode, operands)
+Instruction = Tuple[int, int, Tuple[int, ...]]
+
+
+class BoolDAGException(Exception):
+    pass
+
+
+class BoolNode:
+    """A lightweight view over a node of a BoolDAG"""
+
+    __slots__ = ("dag", "id")
+
+    def __init__(self, dag: "BoolDAG", id: int):
+        self.dag = dag
+        self.id = id
+
+    @property
+    def op(self) -> int:
+        return self.dag.ops[self.id]
+
+    @property
+    def args(self) -> List["BoolNode"]:
+        return [BoolNode(self.dag, a) for a in self.dag.args(self.id)]
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.dag.names.get(self.id)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, BoolNode)
+            and self.dag is other.dag
+            and self.id == other.id
+        )
+
+    def __hash__(self):
+        return hash((id(self.dag), self.id))
+
+    def __repr__(self):
+        if self.op == OP_VAR:
+            return f"{self.name}"
+        elif self.op in [OP_FALSE, OP_TRUE]:
+            return OP_NAMES[self.op]
+        return f"{OP_NAMES[self.op]}({', '.join(map(repr, self.args))})"
+
+    def __invert__(self):
+        return BoolNode(self.dag, self.dag.not_(self.id))
+
+    def __and__(self, other: "BoolNode"):
+        return BoolNode(self.dag, self.dag.and_([self.id, other.id]))
+
+    def __or__(self, other: "BoolNode"):
+        return BoolNode(self.dag, self.dag.or_([self.id, other.id]))
+
+    def __xor__(self, other: "BoolNode"):
+        return BoolNode(self.dag, self.dag.xor([self.id, other.id]))
+
+
+class BoolDAG:
+    """Hash-consed DAG of boolean expressions.
+
+    Nodes are integer ids; every node has an opcode and a list of operands, stored in flat
+    arrays. Structurally equal nodes are created only once, and nodes are locally
+    simplified on construction (constants, idempotence, complements, double negation,
+    xor parity), so node ids are always in topological order.
+
+    This is a prototype of the expression IR: the translator, the qint arithmetic, the
+    default optimizer steps, the compilers and to_bqm still work on sympy
+    expressions, so a BoolDAG is built from them with from_sympy and converted back
+    with to_sympy. It is used natively only by QlassF.truth_table, and by xag_rewrite,
+    the optimize stage of xagOptimizer.
+    """
+
+    def __init__(self):
+        self.ops = array("b")
+        self.offsets = array("l", [0])
+        self.operands = array("l")
+        self.names: Dict[int, str] = {}
+        self.vars: Dict[str, int] = {}
+        self._table: Dict[Tuple[int, ...], int] = {}
+
+        self.false = self._new(OP_FALSE, ())
+        self.true = self._new(OP_TRUE, ())
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def _new(self, op: int, operands: Tuple[int, ...]) -> int:
+        k = (op,) + operands
+        if k in self._table:
+            return self._table[k]
+
+        i = len(self.ops)
+        self.ops.append(op)
+        self.operands.extend(operands)
+        self.offsets.append(len(self.operands))
+        self._table[k] = i
+        return i
+
+    def node(self, i: int) -> BoolNode:
+        """Return a node view given its id"""
+        return BoolNode(self, i)
+
+    def args(self, i: int) -> Tuple[int, ...]:
+        """Return the operands of node i"""
+        return tuple(self.operands[self.offsets[i] : self.offsets[i + 1]])
+
+    # Node constructors
+
+    def const(self, v: bool) -> int:
+        return self.true if v else self.false
+
+    def var(self, name: str) -> int:
+        if name in self.vars:
+            return self.vars[name]
+        i = self._new(OP_VAR, (len(self.vars),))
+        self.vars[name] = i
+        self.names[i] = name
+        return i
+
+    def not_(self, a: int) -> int:
+        op = self.ops[a]
+        if op == OP_NOT:
+            return self.operands[self.offsets[a]]
+        elif op == OP_FALSE:
+            return self.true
+        elif op == OP_TRUE:
+            return self.false
+        return self._new(OP_NOT, (a,))
+
+    def _nary(self, op: int, operands: Iterable[int], absorbing: int) -> int:
+        neutral = self.true if absorbing == self.false else self.false
+        s: Set[int] = set()
+        for a in operands:
+            if self.ops[a] == op:
+                s.update(self.args(a))
+            else:
+                s.add(a)
+
+        if absorbing in s:
+            return absorbing
+        s.discard(neutral)
+
+        for a in s:
+            if self.ops[a] == OP_NOT and self.operands[self.offsets[a]] in s:
+                return absorbing
+
+        if len(s) == 0:
+            return neutral
+        elif len(s) == 1:
+            return s.pop()
+        return self._new(op, tuple(sorted(s)))
+
+    def and_(self, operands: Iterable[int]) -> int:
+        return self._nary(OP_AND, operands, self.false)
+
+    def or_(self, operands: Iterable[int]) -> int:
+        return self._nary(OP_OR, operands, self.true)
+
+    def xor(self, operands: Iterable[int]) -> int:
+        parity = False
+        s: Set[int] = set()
+        stack = list(operands)
+        while stack:
+            a = stack.pop()
+            op = self.ops[a]
+            if op == OP_XOR:
+                stack.extend(self.args(a))
+            elif op == OP_NOT:
+                parity = not parity
+                stack.append(self.operands[self.offsets[a]])
+            elif op == OP_TRUE:
+                parity = not parity
+            elif op == OP_FALSE:
+                continue
+            elif a in s:
+                s.remove(a)
+            else:
+                s.add(a)
+
+        if len(s) == 0:
+            r = self.false
+        elif len(s) == 1:
+            r = s.pop()
+        else:
+            r = self._new(OP_XOR, tuple(sorted(s)))
+        return self.not_(r) if parity else r
+
+    # Sympy converters
+
+    def from_sympy(  # noqa: C901
+        self,
+        expr: Boolean,
+        env: Optional[Dict[str, int]] = None,
+        memo: Optional[Dict[Boolean, int]] = None,
+    ) -> int:
+        """Add a sympy boolean expression to the dag, returning its node id; symbols
+        found in `env` are replaced with the corresponding node"""
+        env = env if env is not None else {}
+        memo = memo if memo is not None else {}
+
+        def visit(e):  # noqa: C901
+            if e in memo:
+                return memo[e]
+
+            if isinstance(e, Symbol):
+                r = env[e.name] if e.name in env else self.var(e.name)
+            elif isinstance(e, BooleanTrue):
+                r = self.true
+            elif isinstance(e, BooleanFalse):
+                r = self.false
+            elif isinstance(e, Not):
+                r = self.not_(visit(e.args[0]))
+            elif isinstance(e, And):
+                r = self.and_([visit(a) for a in e.args])
+            elif isinstance(e, Or):
+                r = self.or_([visit(a) for a in e.args])
+            elif isinstance(e, Xor):
+                r = self.xor([visit(a) for a in e.args])
+            elif isinstance(e, ITE):
+                c, a, b = [visit(a) for a in e.args]
+                r = self.or_([self.and_([c, a]), self.and_([self.not_(c), b])])
+            elif isinstance(e, Implies):
+                a, b = [visit(a) for a in e.args]
+                r = self.or_([self.not_(a), b])
+            elif isinstance(e, Equivalent):
+                args = [visit(a) for a in e.args]
+                r = self.or_([self.and_(args), self.and_(list(map(self.not_, args)))])
+            else:
+                raise BoolDAGException(f"Expression not supported: {e}")
+
+            memo[e] = r
+            return r
+
+        return visit(expr)
+
+    def to_sympy(self, i: int, memo: Optional[Dict[int, Boolean]] = None) -> Boolean:
+        """Return the sympy expression of node i"""
+        memo = memo if memo is not None else {}
+
+        def visit(n):
+            if n in memo:
+                return memo[n]
+
+            op = self.ops[n]
+            r: Boolean
+            if op == OP_FALSE:
+                r = false
+            elif op == OP_TRUE:
+                r = true
+            elif op == OP_VAR:
+                r = Symbol(self.names[n])
+            elif op == OP_NOT:
+                r = Not(visit(self.args(n)[0]))
+            elif op == OP_AND:
+                r = And(*[visit(a) for a in self.args(n)])
+            elif op == OP_OR:
+                r = Or(*[visit(a) for a in self.args(n)])
+            else:
+                r = Xor(*[visit(a) for a in self.args(n)])
+
+            memo[n] = r
+            return r
+
+        return visit(i)
+
+    def from_exps(self, exps: BoolExpList) -> List[Tuple[Symbol, int]]:
+        """Add a BoolExpList to the dag; references to previously assigned symbols are
+        inlined, so the resulting nodes only depend on free input symbols"""
+        env: Dict[str, int] = {}
+        memo: Dict[Boolean, int] = {}
+        res = []
+        for s, e in exps:
+            n = self.from_sympy(e, env, memo)
+
+            # Memoized expressions referencing the old value of s are no longer valid
+            if s.name in env or s.name in self.vars:
+                memo = {}
+
+            env[s.name] = n
+            res.append((s, n))
+        return res
+
+    def to_exps(self, nodes: List[Tuple[Symbol, int]]) -> BoolExpList:
+        """Return a BoolExpList given a list of (symbol, node)"""
+        memo: Dict[int, Boolean] = {}
+        return [(s, self.to_sympy(n, memo)) for s, n in nodes]
+
+    # Analysis and evaluation
+
+    def cone(self, outputs: Iterable[int]) -> List[int]:
+        """Return the ids of the nodes reachable from outputs, in topological order"""
+        seen = set()
+        stack = list(outputs)
+        while stack:
+            n = stack.pop()
+            if n in seen:
+                continue
+            seen.add(n)
+            stack.extend(self.args(n) if self.ops[n] > OP_VAR else ())
+        return sorted(seen)
+
+    def program(self, outputs: Iterable[int]) -> List[Instruction]:
+        """Return the straight-line program computing outputs"""
+        return [(n, self.ops[n], self.args(n)) for n in self.cone(outputs)]
+
+    def run(  # noqa: C901
+        self,
+        program: List[Instruction],
+        values: Dict[str, Any],
+        ones: Any = True,
+        keep: Optional[Iterable[int]] = None,
+    ) -> Dict[int, Any]:
+        """Run a program, where values contains the value of every input symbol. Values
+        can be bools or bitwise-capable words (ints, numpy arrays), `ones` being the
+        all-ones word used for negation and constants. Returns the value of every node,
+        or only of the `keep` nodes (freeing intermediate values as soon as possible).
+        """
+        zero = ones ^ ones
+        last_use: Dict[int, int] = {}
+        if keep is not None:
+            keep = set(keep)
+            for i, (n, op, args) in enumerate(program):
+                for a in args if op > OP_VAR else ():
+                    last_use[a] = i
+
+        val: Dict[int, Any] = {}
+        for i, (n, op, args) in enumerate(program):
+            if op == OP_VAR:
+                if self.names[n] not in values:
+                    raise BoolDAGException(f"Missing value for {self.names[n]}")
+                val[n] = values[self.names[n]]
+            elif op == OP_NOT:
+                val[n] = val[args[0]] ^ ones
+            elif op == OP_AND:
+                r = val[args[0]]
+                for a in args[1:]:
+                    r = r & val[a]
+                val[n] = r
+            elif op == OP_OR:
+                r = val[args[0]]
+                for a in args[1:]:
+                    r = r | val[a]
+                val[n] = r
+            elif op == OP_XOR:
+                r = val[args[0]]
+                for a in args[1:]:
+                    r = r ^ val[a]
+                val[n] = r
+            else:
+                val[n] = ones if op == OP_TRUE else zero
+
+            if keep is not None and op > OP_VAR:
+                for a in args:
+                    if last_use[a] == i and a not in keep:
+                        del val[a]
+        return val
+
+    def evaluate(self, outputs: List[int], values: Dict[str, Any], ones: Any = True):
+        """Evaluate outputs given the values of the input symbols"""
+        val = self.run(self.program(outputs), values, ones, keep=outputs)
+        return [val[o] for o in outputs]
+
+    def evaluate_exhaustive(
+        self,
+        outputs: List[int],
+        inputs: List[str],
+        first_word: int = 0,
+        n_words: Optional[int] = None,
+    ):
+        """Evaluate outputs over every assignment of inputs, using numpy. Rows are packed
+        in uint64 words: bit j of word w is the value at row 64*w+j, and inputs[0] is the
+        most significant bit of the row index. Returns an array (len(outputs), n_words).
+        """
+        import numpy as np
+
+        n = len(inputs)
+        rows = 2**n
+        if n_words is None:
+            n_words = max(1, rows // 64) - first_word
+
+        ones = np.uint64(0xFFFFFFFFFFFFFFFF)
+        widx = np.arange(first_word, first_word + n_words, dtype=np.uint64)
+        values = {}
+        for k, name in enumerate(inputs):
+            p = n - 1 - k
+            if p < 6:
+                pattern = sum(1 << j for j in range(64) if (j >> p) & 1)
+                values[name] = np.full(n_words, pattern, dtype=np.uint64)
+            else:
+                values[name] = np.where(
+                    (widx >> np.uint64(p - 6)) & np.uint64(1), ones, np.uint64(0)
+                )
+
+        val = self.run(self.program(outputs), values, ones, keep=outputs)
+
+        res = np.empty((len(outputs), n_words), dtype=np.uint64)
+        for i, o in enumerate(outputs):
+            res[i] = val[o]
+        if rows < 64:
+            res &= np.uint64((1 << rows) - 1)
+        return res
+
+    def count(self, outputs: Iterable[int]) -> int:
+        """Return the number of nodes needed to compute outputs"""
+        return len(self.cone(outputs))
@@ -0,0 +1,195 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures import wait
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple
+
+from sympy import preorder_traversal
+
+from ..ast2logic import BoolExpList
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Wall-clock and sympy node-count limits of the optimizer steps; a step exceeding
+    them is skipped, leaving its input unsimplified.
+
+    The node limits are exact, the time limits are best-effort: they are checked
+    cooperatively by the steps (see run_with_timeout), so a single sympy call (ie: a
+    simplify_logic of a large expression) is never interrupted, and a step can run
+    well past its time before being skipped.
+
+    Args:
+        step_time (float, optional): seconds after which a step is skipped, not a hard
+            limit
+        step_nodes (int, optional): max nodes of the input and output of every step
+        exp_time (float, optional): seconds after which a step on a single expression
+            is skipped, not a hard limit
+        exp_nodes (int, optional): max nodes of a single expression, before and after
+            a step
+    """
+
+    step_time: Optional[float] = None
+    step_nodes: Optional[int] = None
+    exp_time: Optional[float] = None
+    exp_nodes: Optional[int] = None
+
+
+class BudgetExceededException(Exception):
+    """Raised by check_deadline when the time of a run_with_timeout call is up"""
+
+    def __init__(self, deadline: "_Deadline"):
+        super().__init__("Optimizer time budget exceeded")
+        self.deadline = deadline
+
+
+class _Deadline:
+    __slots__ = ("end",)
+
+    def __init__(self, end: float):
+        self.end = end
+
+
+# Deadlines of the running run_with_timeout calls of every thread, from the outermost
+_local = threading.local()
+
+
+def _deadlines() -> List[_Deadline]:
+    try:
+        return _local.deadlines
+    except AttributeError:
+        _local.deadlines = []
+        return _local.deadlines
+
+
+def check_deadline():
+    """Raise BudgetExceededException if the time of one of the running run_with_timeout
+    calls of this thread is up. The optimizer steps call it between expressions and
+    between the nodes they visit"""
+    deadlines = _deadlines()
+    if deadlines:
+        now = time.perf_counter()
+        for d in deadlines:
+            if d.end <= now:
+                raise BudgetExceededException(d)
+
+
+def time_left() -> Optional[float]:
+    """Return the seconds left to the nearest deadline of this thread, None if there
+    are none"""
+    deadlines = _deadlines()
+    if not deadlines:
+        return None
+    return max(0.0, min(d.end for d in deadlines) - time.perf_counter())
+
+
+def run_with_timeout(
+    f: Callable[[], Any], timeout: Optional[float]
+) -> Tuple[bool, Any]:
+    """Call f, returning (True, result), or (False, None) if it runs longer than timeout
+    seconds. Calls can be nested.
+
+    The timeout is cooperative, not a hard limit: f stops at the first check_deadline
+    call after the time is up; code without checks (ie: a single sympy call) is not
+    interrupted, it runs to the end and its result is then discarded.
+    """
+    if timeout is None:
+        return True, f()
+
+    deadline = _Deadline(time.perf_counter() + timeout)
+    deadlines = _deadlines()
+    deadlines.append(deadline)
+    try:
+        res = f()
+    except BudgetExceededException as ex:
+        if ex.deadline is not deadline:
+            raise
+        return False, None
+    finally:
+        deadlines.remove(deadline)
+
+    if time.perf_counter() > deadline.end:
+        return False, None
+    return True, res
+
+
+def run_in_worker(f: Callable, timeout: Optional[float], *args) -> Any:
+    """Call f(*args) in a worker process, within timeout seconds (the time_left of the
+    caller at submission); return None if they are exceeded"""
+    ok, res = run_with_timeout(lambda: f(*args), timeout)
+    return res if ok else None
+
+
+def worker_result(fut: Future) -> Any:
+    """Return the result of a run_in_worker call, raising BudgetExceededException when
+    the time of this thread is up"""
+    try:
+        r = fut.result(timeout=time_left())
+    except FuturesTimeoutError:
+        r = None
+    # The time of a worker ends after the deadline here, so a None result always raises
+    check_deadline()
+    return r
+
+
+def wait_first(futures: Iterable[Future]) -> Set[Future]:
+    """Wait for the first of futures to finish and return the finished ones, raising
+    BudgetExceededException when the time of this thread is up"""
+    finished, _ = wait(futures, time_left(), FIRST_COMPLETED)
+    check_deadline()
+    return finished
+
+
+def exceeds_nodes(exps: BoolExpList, max_nodes: Optional[int]) -> bool:
+    """Return True if exps have more than max_nodes sympy nodes, stopping the count as
+    soon as the limit is crossed"""
+    if max_nodes is None:
+        return False
+
+    n = 0
+    for _, e in exps:
+        for _ in preorder_traversal(e):
+            n += 1
+            if n > max_nodes:
+                return True
+    return False
+
+
+class BudgetGuard:
+    """Applies a function to the expression of a symbol within the per-expression limits
+    of a budget, returning None if it exceeds them; the skipped expressions are
+    recorded in `skipped` as (reason, symbol name)"""
+
+    def __init__(self, budget: Budget):
+        self.budget = budget
+        self.skipped: List[Tuple[str, Optional[str]]] = []
+
+    def __call__(self, s, f, e):
+        b = self.budget
+        if exceeds_nodes([(s, e)], b.exp_nodes):
+            self.skipped.append(("nodes", s.name))
+            return None
+        ok, res = run_with_timeout(lambda: f(e), b.exp_time)
+        if not ok:
+            self.skipped.append(("time", s.name))
+            return None
+        if exceeds_nodes([(s, res)], b.exp_nodes):
+            self.skipped.append(("nodes", s.name))
+            return None
+        return res
@@ -22,6 +22,8 @@ DISABLE_OR = False
 
 
 class remove_ITE(SympyTransformer):
+    skippable = False
+
     def visit_ITE(self, expr):
         c = self.visit(expr.args[0])
         return self.visit(
@@ -33,6 +35,8 @@ class remove_ITE(SympyTransformer):
 
 
 class remove_Implies(SympyTransformer):
+    skippable = False
+
     def visit_Implies(self, expr):
         return self.visit(Or(Not(self.visit(expr.args[0])), self.visit(expr.args[1])))
 
@@ -63,10 +67,13 @@ class transform_or2xor(SympyTransformer):
 
 
 class transform_or2and(SympyTransformer):
+    # The internal compiler only compiles Or of 2 arguments
+    skippable = False
+
     def visit_Or(self, expr):
         if len(expr.args) > 2 or DISABLE_OR:
             return Not(And(*[Not(self.visit(e)) for e in expr.args]))
-        return expr
+        return super().visit_Or(expr)
 
 
 class remove_obvious_expr(SympyTransformer):
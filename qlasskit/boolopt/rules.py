@@ -0,0 +1,179 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from sympy.logic import ITE, And, Implies, Not, Or, Xor
+from sympy.logic.boolalg import Boolean, false, true
+
+from . import SympyTransformer, exp_transformers
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A rewrite of the nodes of a type, applied by rule_rewrite.
+
+    Args:
+        name (str): name of the rule
+        node (type): sympy class of the nodes the rule applies to
+        rewrite (Callable): returns the replacement of a node whose arguments are
+            already rewritten, or None if the rule does not match; it must be a module
+            level function, so the rule can be sent to worker processes
+        skippable (bool, optional): False if the compilers depend on the rule, so a
+            Budget never skips it (default: True)
+    """
+
+    name: str
+    node: type
+    rewrite: Callable[[Boolean], Optional[Boolean]]
+    skippable: bool = True
+
+
+def _ite_to_or(e):
+    c, t, f = e.args
+    return Or(And(c, t), And(Not(c), f))
+
+
+def _implies_to_or(e):
+    return Or(Not(e.args[0]), e.args[1])
+
+
+def _or_to_xor(e):
+    # Or(And(a,b), And(!a,!b)) = !Xor(a,b)
+    if len(e.args) != 2 or not all(
+        isinstance(x, And) and len(x.args) == 2 for x in e.args
+    ):
+        return None
+    x, y = e.args
+    if set(y.args) != {Not(a) for a in x.args}:
+        return None
+    return Not(Xor(*x.args))
+
+
+def _or_to_and(e):
+    if len(e.args) > 2 or exp_transformers.DISABLE_OR:
+        return Not(And(*[Not(a) for a in e.args]))
+    return None
+
+
+def _double_not(e):
+    if isinstance(e.args[0], Not):
+        return e.args[0].args[0]
+    return None
+
+
+def _has_complement(e):
+    args = set(e.args)
+    return any(isinstance(x, Not) and x.args[0] in args for x in e.args)
+
+
+def _and_complement(e):
+    # And(a, !a, ...) = False
+    return false if _has_complement(e) else None
+
+
+def _or_complement(e):
+    # Or(a, !a, ...) = True
+    return true if _has_complement(e) else None
+
+
+def _absorb(e, dual):
+    args = set(e.args)
+    kept = [
+        x
+        for x in e.args
+        if not (isinstance(x, dual) and any(y in args for y in x.args))
+    ]
+    if len(kept) == len(e.args):
+        return None
+    return e.func(*kept)
+
+
+def _and_absorption(e):
+    # And(a, Or(a, b), ...) = And(a, ...)
+    return _absorb(e, Or)
+
+
+def _or_absorption(e):
+    # Or(a, And(a, b), ...) = Or(a, ...)
+    return _absorb(e, And)
+
+
+remove_ITE_rule = Rule("remove_ITE", ITE, _ite_to_or, skippable=False)
+remove_Implies_rule = Rule("remove_Implies", Implies, _implies_to_or, skippable=False)
+and_complement_rule = Rule("and_complement", And, _and_complement)
+or_complement_rule = Rule("or_complement", Or, _or_complement)
+or2xor_rule = Rule("or2xor", Or, _or_to_xor)
+or2and_rule = Rule("or2and", Or, _or_to_and, skippable=False)
+double_not_rule = Rule("double_not", Not, _double_not)
+and_absorption_rule = Rule("and_absorption", And, _and_absorption)
+or_absorption_rule = Rule("or_absorption", Or, _or_absorption)
+
+default_rules = [
+    remove_ITE_rule,
+    remove_Implies_rule,
+    and_complement_rule,
+    or_complement_rule,
+    or2xor_rule,
+    or2and_rule,
+    double_not_rule,
+]
+"""The rules of the transformers of defaultOptimizer"""
+
+absorption_rules = [and_absorption_rule, or_absorption_rule]
+"""Rules simplifying And(a, Or(a, b)) and Or(a, And(a, b)) to a, which no transformer
+of defaultOptimizer does"""
+
+
+class rule_rewrite(SympyTransformer):
+    """Optimizer step applying a list of rules in a single bottom-up pass, until none
+    of them matches.
+
+    The arguments of every node are rewritten first, then the rules of its type are
+    tried in order; when one matches, its replacement is rewritten in turn. Results
+    are memoized for the pass, and they are normal forms, so rewriting them again is
+    free. Unlike the chain of transformers of defaultOptimizer, every subexpression is
+    rewritten, so the result can be smaller than theirs.
+
+    Args:
+        rules (list): the Rule to apply, by priority; they must not rewrite a node
+            into one they match again
+    """
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        self.skippable = all(r.skippable for r in rules)
+        self.by_node: Dict[type, List[Rule]] = {}
+        for r in rules:
+            self.by_node.setdefault(r.node, []).append(r)
+
+    def __repr__(self):
+        return f"rule_rewrite([{', '.join(r.name for r in self.rules)}])"
+
+    def dispatch(self, e):
+        if not isinstance(e, (And, Or, Not, Implies, ITE, Xor)):
+            return e
+
+        e = self.rebuild(e, [self.visit(a) for a in e.args])
+        for r in self.by_node.get(type(e), []):
+            n = r.rewrite(e)
+            if n is not None:
+                e = self.visit(n)
+                break
+
+        memo = self._memo
+        if memo is not None:
+            memo[e] = e
+        return e
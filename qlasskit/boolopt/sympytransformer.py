@@ -1,8 +1,65 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
 from sympy.logic import ITE, And, Implies, Not, Or, Xor
+from sympy.logic.boolalg import Boolean
+
+from .budget import check_deadline
+
+# Memos of the running passes of every thread, by id of the transformer: the
+# transformers of a profile are shared by the compilations of all the threads
+_local = threading.local()
+
+
+def _memos() -> Dict[int, Dict[Boolean, Boolean]]:
+    try:
+        return _local.memos
+    except AttributeError:
+        _local.memos = {}
+        return _local.memos
 
 
 class SympyTransformer:
+    # False for the transformers the compilers depend on, never skipped by a Budget
+    skippable = True
+
+    @property
+    def _memo(self) -> Optional[Dict[Boolean, Boolean]]:
+        """Results of the running pass of this thread by expression, so subexpressions
+        shared in the tree (or across the expressions of a pass) are transformed once"""
+        return _memos().get(id(self))
+
+    @contextmanager
+    def memo(self):
+        """Share the results of the visits in the context, making them a single pass;
+        visit opens one if it is called outside of a pass"""
+        memos = _memos()
+        if id(self) in memos:
+            yield
+            return
+
+        memos[id(self)] = {}
+        try:
+            yield
+        finally:
+            del memos[id(self)]
+
     def visit(self, e):
+        if not e.args:
+            return e
+        memo = self._memo
+        if memo is None:
+            with self.memo():
+                return self.visit(e)
+
+        r = memo.get(e)
+        if r is None:
+            check_deadline()
+            r = memo[e] = self.dispatch(e)
+        return r
+
+    def dispatch(self, e):
         if isinstance(e, And):
             return self.visit_And(e)
         elif isinstance(e, Or):
@@ -18,20 +75,28 @@ class SympyTransformer:
         else:
             return e
 
+    def rebuild(self, e, args):
+        """Return e with the given args, or e itself if they are unchanged (sympy
+        constructors walk the whole expression, so rebuilding every node of a pass would
+        take quadratic time)"""
+        if all(a is b for a, b in zip(args, e.args)):
+            return e
+        return e.func(*args)
+
     def visit_And(self, e):
-        return And(*[self.visit(a) for a in e.args])
+        return self.rebuild(e, [self.visit(a) for a in e.args])
 
     def visit_Or(self, e):
-        return Or(*[self.visit(a) for a in e.args])
+        return self.rebuild(e, [self.visit(a) for a in e.args])
 
     def visit_Not(self, e):
-        return Not(self.visit(e.args[0]))
+        return self.rebuild(e, [self.visit(e.args[0])])
 
     def visit_ITE(self, e):
-        return ITE(*[self.visit(a) for a in e.args])
+        return self.rebuild(e, [self.visit(a) for a in e.args])
 
     def visit_Implies(self, e):
-        return Implies(*[self.visit(a) for a in e.args])
+        return self.rebuild(e, [self.visit(a) for a in e.args])
 
     def visit_Xor(self, e):
-        return Xor(*[self.visit(a) for a in e.args])
+        return self.rebuild(e, [self.visit(a) for a in e.args])
@@ -0,0 +1,328 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from itertools import combinations, product
+from typing import Dict, List, Tuple
+
+from sympy import Symbol, numbered_symbols
+from sympy.logic.boolalg import Boolean, Not
+
+from ..ast2logic import BoolExpList
+from .booldag import (
+    OP_AND,
+    OP_FALSE,
+    OP_NOT,
+    OP_OR,
+    OP_TRUE,
+    OP_VAR,
+    OP_XOR,
+    BoolDAG,
+    BoolDAGException,
+)
+
+CUT_SIZE = 4
+
+# Truth tables of the cut leaves, over CUT_SIZE variables
+_LEAF_TT = [0xAAAA, 0xCCCC, 0xF0F0, 0xFF00]
+_MASK = 0xFFFF
+
+# A replacement of a cut function: (opcode, [(leaf index, negated)], negated output)
+Form = Tuple[int, List[Tuple[int, bool]], bool]
+
+
+def _forms() -> Dict[int, Form]:
+    """Return the library of the cut functions implementable with at most one gate:
+    constants, literals, and AND / XOR of literals (OR being a negated AND)"""
+    lib: Dict[int, Form] = {0: (OP_FALSE, [], False), _MASK: (OP_TRUE, [], False)}
+
+    def add(tt, form):
+        if tt not in lib:
+            lib[tt] = form
+
+    for i in range(CUT_SIZE):
+        add(_LEAF_TT[i], (OP_VAR, [(i, False)], False))
+        add(_LEAF_TT[i] ^ _MASK, (OP_VAR, [(i, False)], True))
+
+    for k in range(2, CUT_SIZE + 1):
+        for leaves in combinations(range(CUT_SIZE), k):
+            x = 0
+            for i in leaves:
+                x ^= _LEAF_TT[i]
+            add(x, (OP_XOR, [(i, False) for i in leaves], False))
+            add(x ^ _MASK, (OP_XOR, [(i, False) for i in leaves], True))
+
+            for neg in product([False, True], repeat=k):
+                a = _MASK
+                for i, n in zip(leaves, neg):
+                    a &= _LEAF_TT[i] ^ (_MASK if n else 0)
+                add(a, (OP_AND, list(zip(leaves, neg)), False))
+                add(a ^ _MASK, (OP_AND, list(zip(leaves, neg)), True))
+    return lib
+
+
+_FORMS = _forms()
+
+
+def _eval_op(op: int, xs: List[int]) -> int:
+    """Apply op to truth tables"""
+    if op == OP_FALSE:
+        return 0
+    elif op == OP_TRUE:
+        return _MASK
+    elif op == OP_NOT:
+        return xs[0] ^ _MASK
+
+    r = xs[0]
+    for x in xs[1:]:
+        if op == OP_AND:
+            r &= x
+        elif op == OP_OR:
+            r |= x
+        else:
+            r ^= x
+    return r
+
+
+def _is_gate(dag: BoolDAG, n: int) -> bool:
+    return dag.ops[n] in (OP_AND, OP_OR, OP_XOR)
+
+
+class _Rewriter:
+    """One pass of cut-based rewriting over the cone of the outputs of a BoolDAG.
+
+    Cuts of at most CUT_SIZE leaves are enumerated bottom-up (keeping max_cuts per
+    node); the function of every cut is computed as a truth table and, if it is in the
+    library of one-gate forms, the node is replaced when its fanout-free cone over the
+    cut contains more gates than the form."""
+
+    def __init__(self, dag: BoolDAG, outputs: List[int], max_cuts: int):
+        self.dag = dag
+        self.outputs = outputs
+        self.max_cuts = max_cuts
+        self.cone = dag.cone(outputs)
+        self.refs: Dict[int, int] = {}
+        for n in self.cone:
+            for a in self._fanins(n):
+                self.refs[a] = self.refs.get(a, 0) + 1
+        for o in outputs:
+            self.refs[o] = self.refs.get(o, 0) + 1
+
+    def _fanins(self, n: int) -> Tuple[int, ...]:
+        return self.dag.args(n) if self.dag.ops[n] > OP_VAR else ()
+
+    def _cuts(self) -> Dict[int, List[Tuple[int, ...]]]:
+        dag = self.dag
+        cuts: Dict[int, List[Tuple[int, ...]]] = {}
+        for n in self.cone:
+            op = dag.ops[n]
+            if op in (OP_FALSE, OP_TRUE):
+                cuts[n] = [()]
+                continue
+
+            res = set()
+            args = self._fanins(n)
+            if op == OP_NOT:
+                res.update(cuts[args[0]])
+            elif 0 < len(args) <= CUT_SIZE:
+                for combo in product(*[cuts[a] for a in args]):
+                    u = set().union(*combo)
+                    if len(u) <= CUT_SIZE:
+                        res.add(tuple(sorted(u)))
+
+            cuts[n] = sorted(res, key=lambda c: (len(c), c))[: self.max_cuts] + [(n,)]
+        return cuts
+
+    def _truth_table(self, n: int, leaves: Tuple[int, ...]) -> int:
+        dag = self.dag
+        val = {leaf: _LEAF_TT[i] for i, leaf in enumerate(leaves)}
+
+        def visit(m):
+            if m in val:
+                return val[m]
+            r = _eval_op(dag.ops[m], [visit(a) for a in self._fanins(m)])
+            val[m] = r
+            return r
+
+        return visit(n)
+
+    def _mffc_gates(self, n: int, leaves: Tuple[int, ...]) -> int:
+        """Return the number of gates that would become dead replacing n, the root of a
+        cut with the given leaves"""
+        refs = self.refs
+        removed: List[int] = []
+
+        def deref(m):
+            count = 1 if _is_gate(self.dag, m) else 0
+            for a in self._fanins(m):
+                if a in leaves:
+                    continue
+                refs[a] -= 1
+                removed.append(a)
+                if refs[a] == 0:
+                    count += deref(a)
+            return count
+
+        count = deref(n)
+        for a in removed:
+            refs[a] += 1
+        return count
+
+    def rewrites(self) -> Dict[int, Tuple[Form, Tuple[int, ...]]]:
+        """Return the chosen replacement of every rewritten node"""
+        res: Dict[int, Tuple[Form, Tuple[int, ...]]] = {}
+        for n, ncuts in self._cuts().items():
+            if not _is_gate(self.dag, n):
+                continue
+
+            for leaves in ncuts[:-1]:
+                form = _FORMS.get(self._truth_table(n, leaves))
+                if form is None:
+                    continue
+                cost = 1 if form[0] in (OP_AND, OP_XOR) else 0
+                if cost < self._mffc_gates(n, leaves):
+                    res[n] = (form, leaves)
+                    break
+        return res
+
+
+def _build_form(dag: BoolDAG, form: Form, leaves: List[int]) -> int:
+    op, lits, neg = form
+    if op in (OP_FALSE, OP_TRUE):
+        return dag.const(op == OP_TRUE)
+
+    xs = [dag.not_(leaves[i]) if n else leaves[i] for i, n in lits]
+    if op == OP_VAR:
+        r = xs[0]
+    elif op == OP_AND:
+        r = dag.and_(xs)
+    else:
+        r = dag.xor(xs)
+    return dag.not_(r) if neg else r
+
+
+def rewrite_dag(
+    dag: BoolDAG, outputs: List[int], max_cuts: int = 8
+) -> Tuple[BoolDAG, List[int], int]:
+    """Run a rewriting pass, returning a new dag, its outputs and the number of
+    rewritten nodes"""
+    rewrites = _Rewriter(dag, outputs, max_cuts).rewrites()
+
+    ndag = BoolDAG()
+    new: Dict[int, int] = {}
+    for n in dag.cone(outputs):
+        op = dag.ops[n]
+        if n in rewrites:
+            form, leaves = rewrites[n]
+            new[n] = _build_form(ndag, form, [new[x] for x in leaves])
+        elif op == OP_VAR:
+            new[n] = ndag.var(dag.names[n])
+        elif op in (OP_FALSE, OP_TRUE):
+            new[n] = ndag.const(op == OP_TRUE)
+        else:
+            args = [new[a] for a in dag.args(n)]
+            if op == OP_NOT:
+                new[n] = ndag.not_(args[0])
+            elif op == OP_AND:
+                new[n] = ndag.and_(args)
+            elif op == OP_OR:
+                new[n] = ndag.or_(args)
+            else:
+                new[n] = ndag.xor(args)
+
+    return ndag, [new[o] for o in outputs], len(rewrites)
+
+
+def dag_to_exps(dag: BoolDAG, outputs: List[Tuple[Symbol, int]], temps) -> BoolExpList:
+    """Return the expressions of the outputs, where every gate shared by more than one
+    expression is computed once in a new temporary symbol taken from temps"""
+    nodes = [n for _, n in outputs]
+
+    def strip(n):
+        return dag.args(n)[0] if dag.ops[n] == OP_NOT else n
+
+    # The fanout of a gate includes the fanout of its negation, since negating a gate
+    # result is free; negated variables are instead copied on every use
+    fanout: Dict[int, int] = {}
+    uses = [a for n in dag.cone(nodes) if dag.ops[n] > OP_NOT for a in dag.args(n)]
+    for a in uses + nodes:
+        fanout[a] = fanout.get(a, 0) + 1
+        if strip(a) != a:
+            fanout[strip(a)] = fanout.get(strip(a), 0) + 1
+
+    def shared(n):
+        if dag.ops[n] == OP_NOT:
+            return dag.ops[strip(n)] == OP_VAR and fanout.get(n, 0) > 1
+        return _is_gate(dag, n) and fanout.get(n, 0) > 1
+
+    res: BoolExpList = []
+    memo: Dict[int, Boolean] = {}
+    for n in dag.cone(nodes):
+        if not shared(n):
+            continue
+
+        # Gates mostly used negated are stored negated
+        neg = dag.ops[n] != OP_NOT and fanout[n] < 2 * fanout.get(dag.not_(n), 0)
+        t = dag.not_(n) if neg else n
+        s = next(temps)
+        res.append((s, dag.to_sympy(t, memo)))
+        memo[t] = s
+        if neg:
+            memo[n] = Not(s)
+
+    for s, n in outputs:
+        res.append((s, dag.to_sympy(n, memo)))
+    return res
+
+
+class xag_rewrite:
+    """Optimizer step replacing merge_expressions and apply_cse with an And-Xor graph
+    optimization, whose runtime is linear in the size of the graph.
+
+    The expressions are merged into a BoolDAG, which does structural hashing and
+    flattens associative AND / OR / XOR chains; then up to `passes` rounds of cut-based
+    rewriting replace every cone whose function over a cut of at most 4 nodes is a
+    single gate (or a literal or a constant). Gates shared by many outputs become
+    temporary symbols, as cse would do.
+
+    Args:
+        passes (int, optional): maximum number of rewriting passes (default: 3)
+        max_cuts (int, optional): cuts kept for every node (default: 8)
+    """
+
+    # Linear time, and it replaces merge_expressions that the compilers depend on
+    skippable = False
+
+    def __init__(self, passes: int = 3, max_cuts: int = 8):
+        self.passes = passes
+        self.max_cuts = max_cuts
+
+    def __call__(self, exps: BoolExpList) -> BoolExpList:
+        dag = BoolDAG()
+        try:
+            nodes = dag.from_exps(exps)
+        except BoolDAGException:
+            return exps
+
+        rets = [(s, n) for s, n in nodes if s.name[0:4] == "_ret"]
+        symbols = [s for s, _ in rets]
+        outputs = [n for _, n in rets]
+
+        for _ in range(self.passes):
+            dag, outputs, n_rewrites = rewrite_dag(dag, outputs, self.max_cuts)
+            if n_rewrites == 0:
+                break
+
+        used = set(dag.vars.keys()) | {s.name for s in symbols}
+        temps = numbered_symbols("x", exclude=[Symbol(v) for v in used])
+        return dag_to_exps(dag, list(zip(symbols, outputs)), temps)
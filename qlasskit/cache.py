@@ -0,0 +1,222 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ast
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .ast2logic import LogicFun
+
+CACHE_DIR_ENV = "QLASSKIT_CACHE_DIR"
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+ENTRY_SUFFIX = ".qfc"
+
+CacheEntry = Dict[str, Any]
+
+
+def default_cache_dir() -> str:
+    """Return the cache directory, honoring the QLASSKIT_CACHE_DIR env variable"""
+    if os.getenv(CACHE_DIR_ENV):
+        return os.environ[CACHE_DIR_ENV]
+
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "qlasskit")
+
+
+def _type_id(t) -> str:
+    return f"{t.__module__}.{t.__qualname__}:{getattr(t, 'BIT_SIZE', '')}"
+
+
+def _step_id(step) -> str:
+    if hasattr(step, "__qualname__"):
+        return f"{step.__module__}.{step.__qualname__}"
+    sid = f"{step.__class__.__module__}.{step.__class__.__qualname__}"
+    # Steps configured by their arguments, like rule_rewrite, describe them in the repr
+    if type(step).__repr__ is not object.__repr__:
+        sid += f":{step!r}"
+    return sid
+
+
+def _logicfun_id(deff: LogicFun) -> str:
+    name, args, ret, exps = deff
+    return repr(
+        (
+            name,
+            [(a.name, str(a.ttype), a.bitvec) for a in args],
+            (ret.name, str(ret.ttype), ret.bitvec),
+            [(s.name, str(e)) for s, e in exps],
+        )
+    )
+
+
+class CompilationCache:
+    """Content-addressed on-disk cache for optimized expressions and compiled circuits.
+
+    Entries are keyed on the normalized function ast, the injected types and defs, the
+    optimizer profile, the compiler and the uncompute flag; the cache is bounded in size
+    and evicts the least recently used entries first.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Args:
+            path (str, optional): the cache directory (default: default_cache_dir())
+            max_size (int, optional): max size of the cache in bytes (default: 256MB)
+        """
+        self.path = path if path is not None else default_cache_dir()
+        self.max_size = max_size
+
+    def __repr__(self):
+        return f"CompilationCache<{self.path}>"
+
+    def key(
+        self,
+        fun_ast: ast.AST,
+        types: List = [],
+        defs: List[LogicFun] = [],
+        bool_optimizer=None,
+        compiler: str = "internal",
+        uncompute: bool = True,
+        to_compile: bool = True,
+    ) -> str:
+        """Return the content-address of a compilation"""
+        from . import __version__
+
+        steps = bool_optimizer.steps if bool_optimizer is not None else []
+        h = hashlib.sha256()
+        for part in [
+            __version__,
+            ast.dump(fun_ast),
+            repr(sorted(map(_type_id, types))),
+            repr(list(map(_logicfun_id, defs))),
+            repr(list(map(_step_id, steps))),
+            repr((compiler, uncompute, to_compile)),
+        ]:
+            h.update(part.encode())
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, key + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the cached entry for key, or None if not present"""
+        fpath = self._entry_path(key)
+        try:
+            with open(fpath, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Corrupted or incompatible entry
+            self.remove(key)
+            return None
+
+        # Touch the entry, so the eviction policy is LRU
+        try:
+            os.utime(fpath)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: CacheEntry) -> bool:
+        """Store an entry; return False if the entry is not serializable"""
+        try:
+            data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+
+        os.makedirs(self.path, exist_ok=True)
+        fd, tpath = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tpath, self._entry_path(key))
+        except OSError:
+            if os.path.exists(tpath):
+                os.unlink(tpath)
+            return False
+
+        self.evict()
+        return True
+
+    def remove(self, key: str) -> bool:
+        """Remove an entry from the cache; return False if not present"""
+        try:
+            os.unlink(self._entry_path(key))
+            return True
+        except OSError:
+            return False
+
+    def entries(self) -> List[Tuple[str, int, float]]:
+        """Return the list of (key, size, last access time), least recently used first"""
+        if not os.path.isdir(self.path):
+            return []
+
+        res = []
+        for fname in os.listdir(self.path):
+            if not fname.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.path, fname))
+            except OSError:
+                continue
+            res.append((fname[: -len(ENTRY_SUFFIX)], st.st_size, st.st_mtime))
+
+        return sorted(res, key=lambda e: e[2])
+
+    def size(self) -> int:
+        """Return the total size in bytes of the cache"""
+        return sum(map(lambda e: e[1], self.entries()))
+
+    def evict(self) -> int:
+        """Evict least recently used entries until the cache fits max_size;
+        return the number of removed entries"""
+        entries = self.entries()
+        total = sum(map(lambda e: e[1], entries))
+        removed = 0
+        for key, size, _ in entries:
+            if total <= self.max_size:
+                break
+            self.remove(key)
+            total -= size
+            removed += 1
+        return removed
+
+    def purge(self, older_than: Optional[float] = None) -> int:
+        """Remove all the entries (or only the ones not accessed in the last
+        older_than seconds); return the number of removed entries"""
+        removed = 0
+        now = time.time()
+        for key, _, atime in self.entries():
+            if older_than is not None and now - atime < older_than:
+                continue
+            self.remove(key)
+            removed += 1
+        return removed
+
+
+def get_cache(cache: Union[bool, CompilationCache, None]) -> Optional[CompilationCache]:
+    """Resolve the `cache` argument of qlassf to a CompilationCache (or None)"""
+    if isinstance(cache, CompilationCache):
+        return cache
+    elif cache:
+        return CompilationCache()
+    return None
@@ -0,0 +1,229 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from sympy import preorder_traversal
+
+from .ast2logic import BoolExpList
+
+StageCallback = Callable[[str, "StageStats"], None]
+"""A callback receiving the event ("begin" or "end") and the stage"""
+
+
+@dataclass
+class StageStats:
+    """Statistics of a single compilation stage"""
+
+    name: str
+    category: str = "stage"
+    start: float = 0.0
+    """Start time in seconds, relative to the creation of the CompileStats"""
+    duration: Optional[float] = None
+    peak_memory: Optional[int] = None
+    """Peak of the memory traced by tracemalloc during the stage, in bytes"""
+    expressions: Optional[int] = None
+    nodes: Optional[int] = None
+    """Number of sympy nodes of the expressions"""
+    qubits: Optional[int] = None
+    """Number of qubits of the circuit produced by the stage"""
+    gates: Optional[int] = None
+    """Number of gates of the circuit produced by the stage"""
+    _exps: Optional[BoolExpList] = field(default=None, repr=False, compare=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        del d["_exps"]
+        return d
+
+
+@dataclass
+class SkippedStep:
+    """An optimizer step skipped for exceeding its budget"""
+
+    step: str
+    reason: str
+    """The exceeded limit: 'time' or 'nodes'"""
+    symbol: Optional[str] = None
+    """The expression left unsimplified, or None if the step was skipped entirely"""
+
+
+def count_nodes(exps: BoolExpList) -> int:
+    """Return the number of sympy nodes of a list of expressions"""
+    return sum(sum(1 for _ in preorder_traversal(e)) for _, e in exps)
+
+
+class CompileStats:
+    """Records wall time, peak memory, expression and node count of every stage of the
+    compilation of a qlassf function, including every optimizer step
+
+    Args:
+        track_memory (bool, optional): trace the peak memory of the stages with
+            tracemalloc, slowing down the compilation (default: False)
+        count_nodes (bool, optional): count the sympy nodes of the expressions produced
+            by every stage (default: False)
+        callbacks (List[StageCallback], optional): functions called with ("begin", stage)
+            and ("end", stage) around every stage
+    """
+
+    def __init__(
+        self,
+        track_memory: bool = False,
+        count_nodes: bool = False,
+        callbacks: List[StageCallback] = [],
+    ):
+        self.track_memory = track_memory
+        self.count_nodes = count_nodes
+        self.callbacks: List[StageCallback] = list(callbacks)
+        self.stages: List[StageStats] = []
+        self.skipped: List[SkippedStep] = []
+        self._t0 = time.perf_counter()
+        self._open: List[StageStats] = []
+        self._tracing = False
+
+    def on_stage(self, callback: StageCallback):
+        """Register a callback called at the begin and at the end of every stage"""
+        self.callbacks.append(callback)
+
+    def _emit(self, event: str, st: StageStats):
+        for cb in self.callbacks:
+            cb(event, st)
+
+    def _fold_peak(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        for st in self._open:
+            st.peak_memory = max(st.peak_memory or 0, peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name: str, category: str = "stage") -> Iterator[StageStats]:
+        """Context manager recording a stage; stages can be nested"""
+        st = StageStats(name, category, time.perf_counter() - self._t0)
+        self.stages.append(st)
+        self._emit("begin", st)
+
+        if self.track_memory:
+            if not self._open and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            self._fold_peak()
+        self._open.append(st)
+
+        try:
+            yield st
+        finally:
+            st.duration = time.perf_counter() - self._t0 - st.start
+            if self.track_memory and tracemalloc.is_tracing():
+                self._fold_peak()
+            self._open.pop()
+            if self._tracing and not self._open:
+                tracemalloc.stop()
+                self._tracing = False
+
+            if st._exps is not None:
+                st.expressions = len(st._exps)
+                if self.count_nodes:
+                    st.nodes = count_nodes(st._exps)
+                st._exps = None
+            self._emit("end", st)
+
+    def set_expressions(self, exps: BoolExpList):
+        """Set the expressions produced by the innermost running stage"""
+        self._open[-1]._exps = exps
+
+    def skip(self, step: str, reason: str, symbol: Optional[str] = None):
+        """Record an optimizer step skipped for exceeding its budget"""
+        self.skipped.append(SkippedStep(step, reason, symbol))
+
+    def copy(self) -> "CompileStats":
+        """Return a new CompileStats with the same settings, callbacks and stages"""
+        c = CompileStats(self.track_memory, self.count_nodes, self.callbacks)
+        c._t0 = self._t0
+        c.stages = [StageStats(**st.to_dict()) for st in self.stages]
+        c.skipped = list(self.skipped)
+        return c
+
+    def __getitem__(self, name: str) -> StageStats:
+        for st in self.stages:
+            if st.name == name:
+                return st
+        raise KeyError(name)
+
+    def __iter__(self) -> Iterator[StageStats]:
+        return iter(self.stages)
+
+    def __len__(self) -> int:
+        return len(self.stages)
+
+    @property
+    def total_time(self) -> float:
+        """Wall time of the top level stages"""
+        return sum(st.duration or 0 for st in self.stages if st.category == "stage")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_time": self.total_time,
+            "stages": [st.to_dict() for st in self.stages],
+            "skipped": [asdict(sk) for sk in self.skipped],
+        }
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """Serialize the stats as json, writing them to path if given"""
+        s = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(s)
+        return s
+
+    def to_chrome_trace(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """Return the stats in the Chrome trace event format, readable by
+        chrome://tracing and Perfetto, writing them to path if given"""
+        events = []
+        for st in self.stages:
+            args = {
+                k: v
+                for k, v in st.to_dict().items()
+                if k in ["peak_memory", "expressions", "nodes", "qubits", "gates"]
+                and v is not None
+            }
+            events.append(
+                {
+                    "name": st.name,
+                    "cat": st.category,
+                    "ph": "X",
+                    "ts": st.start * 1e6,
+                    "dur": (st.duration or 0) * 1e6,
+                    "pid": 0,
+                    "tid": 0,
+                    "args": args,
+                }
+            )
+        trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(trace, f)
+        return trace
+
+
+def get_compile_stats(profile: Union[bool, CompileStats]) -> CompileStats:
+    """Return the CompileStats for the `profile` argument of qlassf: a new one recording
+    only times and expression counts if False, a detailed one if True"""
+    if isinstance(profile, CompileStats):
+        return profile
+    return CompileStats(track_memory=profile, count_nodes=profile)
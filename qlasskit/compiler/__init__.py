@@ -13,7 +13,7 @@
 # limitations under the License.
 # isort:skip_file
 
-from typing import Literal, List, get_args
+from typing import Literal, List, Optional, get_args
 
 from .expqmap import ExpQMap  # noqa: F401
 from .compiler import Compiler, CompilerException  # noqa: F401
@@ -26,6 +26,8 @@ try:
 except:
     TWEEDLEDUM_ENABLED = False
 
+from .ancilla import AncillaStrategy  # noqa: E402
+from .ancilla import LivenessStrategy, PebblingStrategy  # noqa: E402, F401
 from .internalcompiler import InternalCompiler  # noqa: E402
 from .recompiler import ReCompiler  # noqa: E402
 
@@ -47,11 +49,15 @@ def to_quantum(
     exprs,
     compiler: SupportedCompiler = "internal",
     uncompute: bool = True,
+    ancilla_strategy: Optional[AncillaStrategy] = None,
 ):
     sel_compiler: Compiler
 
+    if ancilla_strategy is not None and compiler != "internal":
+        raise Exception("ancilla_strategy is supported only by the internal compiler")
+
     if compiler == "internal":
-        sel_compiler = InternalCompiler()
+        sel_compiler = InternalCompiler(ancilla_strategy)
     elif compiler == "recompiler":
         sel_compiler = ReCompiler()
     elif compiler == "tweedledum" and TWEEDLEDUM_ENABLED:
@@ -0,0 +1,390 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from bisect import bisect_right
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from sympy import Symbol, preorder_traversal
+
+from ..ast2logic.typing import BoolExpList
+from ..qcircuit import QCircuitEnhanced, gates
+from .compiler import CompilerException
+
+if TYPE_CHECKING:
+    from .internalcompiler import InternalCompiler
+
+
+class AncillaStrategy:
+    """Ancilla allocation strategy of the InternalCompiler: the default one reuses any
+    free ancilla, and keeps the intermediate symbols live until the final uncompute"""
+
+    def pick(self, free: Set[int]) -> int:
+        """Remove and return one of the free ancillas"""
+        return free.pop()
+
+    def schedule(self, exprs: BoolExpList) -> BoolExpList:
+        """Return the expressions in the order they are compiled"""
+        return exprs
+
+    def pebbler(
+        self, compiler: "InternalCompiler", qc: QCircuitEnhanced, exprs: BoolExpList
+    ) -> Optional["SymbolPebbler"]:
+        return None
+
+
+class LivenessStrategy(AncillaStrategy):
+    """Uncompute every intermediate symbol right after its last use, so its qubit can be
+    reused; it costs the gates needed to uncompute the symbols. The expressions are
+    reordered to shorten the life of the symbols (see schedule_by_liveness)"""
+
+    def pick(self, free: Set[int]) -> int:
+        anc = min(free)
+        free.remove(anc)
+        return anc
+
+    def schedule(self, exprs: BoolExpList) -> BoolExpList:
+        return schedule_by_liveness(exprs)
+
+    def pebbler(self, compiler, qc, exprs):
+        return SymbolPebbler(compiler, qc, exprs)
+
+
+class PebblingStrategy(LivenessStrategy):
+    """Liveness strategy that also keeps the qubit count under max_qubits: before every
+    expression, the live symbols used furthest in the future are uncomputed, and they
+    are recomputed when needed again. The cap is best effort: a single expression may
+    still need more qubits than available.
+
+    Args:
+        max_qubits (int): the qubit cap
+    """
+
+    def __init__(self, max_qubits: int):
+        self.max_qubits = max_qubits
+
+    def pebbler(self, compiler, qc, exprs):
+        return SymbolPebbler(compiler, qc, exprs, self.max_qubits)
+
+
+def _dependencies(exprs: BoolExpList) -> Tuple[List[Set[int]], List[List[int]]]:
+    """Return the expressions that must come before every expression, keeping the order
+    of the reads and the writes of every symbol, and the readers of the symbol defined
+    by every expression"""
+    preds: List[Set[int]] = [set() for _ in exprs]
+    readers: List[List[int]] = [[] for _ in exprs]
+    last_def: Dict[str, int] = {}
+    last_readers: Dict[str, List[int]] = {}
+    for i, (s, e) in enumerate(exprs):
+        for r in {str(d) for d in e.free_symbols}:
+            if r in last_def:
+                preds[i].add(last_def[r])
+                readers[last_def[r]].append(i)
+            last_readers.setdefault(r, []).append(i)
+
+        if s.name in last_def:
+            preds[i].add(last_def[s.name])
+        preds[i].update(j for j in last_readers.get(s.name, []) if j != i)
+        last_def[s.name] = i
+        last_readers[s.name] = []
+    return preds, readers
+
+
+def schedule_by_liveness(exprs: BoolExpList) -> BoolExpList:
+    """Reorder exprs so the intermediate symbols are used soon after they are computed.
+
+    The order of the reads and the writes of every symbol is kept; among the
+    expressions ready to be computed, the one ending the life of most symbols is
+    picked first, and the original order breaks ties. The expression list of the
+    optimizer computes every temporary symbol before the returns, so with the original
+    order all of them are live at once."""
+    preds, readers = _dependencies(exprs)
+    succs: List[List[int]] = [[] for _ in exprs]
+    for i, p in enumerate(preds):
+        for j in p:
+            succs[j].append(i)
+
+    unread = [len(r) for r in readers]
+    waiting = [len(p) for p in preds]
+    ready = [i for i, w in enumerate(waiting) if w == 0]
+
+    def freed(i: int) -> int:
+        return sum(
+            1
+            for j in preds[i]
+            if unread[j] == 1
+            and i in readers[j]
+            and not exprs[j][0].name.startswith("_")
+        )
+
+    order = []
+    while ready:
+        i = min(ready, key=lambda k: (-freed(k), k))
+        ready.remove(i)
+        order.append(i)
+        for j in preds[i]:
+            if i in readers[j]:
+                unread[j] -= 1
+        for j in succs[i]:
+            waiting[j] -= 1
+            if waiting[j] == 0:
+                ready.append(j)
+
+    return [exprs[i] for i in order]
+
+
+def _written(g: gates.QGate, ws: List[int]) -> List[int]:
+    if isinstance(g, gates.QControlledGate):
+        return ws[g.n_controls :]
+    return ws
+
+
+class Segment:
+    """The gates computing a symbol, replayable on other qubits: scratch qubits are
+    clean before and after the gates, externals are only read"""
+
+    def __init__(self, gate_list, result, scratch, externals, start, end):
+        self.gates: List[gates.AppliedGate] = gate_list
+        self.result: int = result
+        self.scratch: List[int] = scratch
+        self.externals: Dict[int, Optional[str]] = externals
+        """External qubits, with the name of the symbol they contain (None if fixed)"""
+        self.start: int = start
+        self.valid_from: int = end
+        """Index of the gate list after which the result qubit is not written"""
+
+
+class SymbolPebbler:
+    """Uncomputes and recomputes the intermediate symbols of an InternalCompiler run, by
+    replaying (and mirroring) the gates that computed them"""
+
+    def __init__(
+        self,
+        compiler: "InternalCompiler",
+        qc: QCircuitEnhanced,
+        exprs: BoolExpList,
+        max_qubits: Optional[int] = None,
+    ):
+        self.compiler = compiler
+        self.qc = qc
+        self.max_qubits = max_qubits
+        self.segments: Dict[str, Segment] = {}
+        self.live: Set[str] = set()
+        self.evicted: Set[str] = set()
+        self.released = 0
+        self.recomputed = 0
+
+        self._last_write: Dict[int, int] = {}
+        self._scanned = 0
+
+        # Only symbols defined once and never read by temporary symbols are handled
+        names = [s.name for s, _ in exprs]
+        counts = Counter(names)
+        temp_deps = {
+            str(d) for s, e in exprs if s.name.startswith("__") for d in e.free_symbols
+        }
+        self.defs: Dict[str, int] = {}
+        self.managed: Set[str] = set()
+        for i, n in enumerate(names):
+            self.defs[n] = i
+            if (
+                counts[n] == 1
+                and not n.startswith("_")
+                and n not in compiler.input_symbols
+                and n not in temp_deps
+            ):
+                self.managed.add(n)
+
+        self.uses: Dict[str, List[int]] = {n: [] for n in self.managed}
+        self.deps: Dict[str, Set[str]] = {}
+        for i, (s, e) in enumerate(exprs):
+            self.deps[s.name] = {str(d) for d in e.free_symbols} & self.managed
+            for d in self.deps[s.name]:
+                if self.defs[d] < i:
+                    self.uses[d].append(i)
+
+        # A symbol dies after its last use, but not before the symbols computed from it
+        # are uncomputed, since their gates read it
+        self.release_after: Dict[int, List[str]] = {}
+        ext: Dict[str, int] = {}
+        for n in sorted(self.managed, key=self.defs.__getitem__, reverse=True):
+            r = max(self.uses[n] + [self.defs[n], ext.get(n, -1)])
+            self.release_after.setdefault(r, []).append(n)
+            for d in self.deps[n]:
+                ext[d] = max(ext.get(d, -1), r)
+
+    def _scan(self):
+        gl = self.qc.gates
+        for i in range(self._scanned, len(gl)):
+            g, ws, _ = gl[i]
+            for w in _written(g, ws):
+                self._last_write[w] = i
+        self._scanned = len(gl)
+
+    def before(self, i: int, exp):
+        """Called before compiling the i-th expression"""
+        self._scan()
+        needed = {str(d) for d in exp.free_symbols} & self.managed
+
+        if self.max_qubits is not None:
+            need = sum(1 for n in preorder_traversal(exp) if not n.is_Atom)
+            need += sum(
+                1 + len(self.segments[n].scratch) for n in needed & self.evicted
+            )
+            while self._live_qubits() + need > self.max_qubits:
+                cand = self._furthest(i, needed)
+                if cand is None or not self._evict(cand):
+                    break
+
+        for n in sorted(needed & self.evicted, key=self.defs.__getitem__):
+            if not self._recompute(n):
+                raise CompilerException(f"Cannot recompute the symbol {n}")
+
+        self._start = len(self.qc.gates)
+        self._n_before = self.qc.num_qubits
+        self._free_before = set(self.qc.free_ancilla_lst)
+
+    def after(self, i: int, sym, iret: int):
+        """Called after the i-th expression is compiled and its ancillas uncomputed"""
+        self._scan()
+        if sym.name in self.managed:
+            seg = self._record(iret)
+            if seg is not None:
+                self.segments[sym.name] = seg
+                self.live.add(sym.name)
+
+        for n in sorted(self.release_after.get(i, []), key=self.defs.__getitem__)[::-1]:
+            if n in self.live and self._evict(n):
+                self.released += 1
+
+    def _live_qubits(self) -> int:
+        return self.qc.num_qubits - len(self.qc.free_ancilla_lst)
+
+    def _furthest(self, i: int, needed: Set[str]) -> Optional[str]:
+        """Return the live symbol whose next use is the furthest from i"""
+        best, best_next = None, -1
+        for n in sorted(self.live - needed, key=self.defs.__getitem__):
+            if any(u is not None and u not in self.live for u in self._ext(n)):
+                continue
+            uses = self.uses[n]
+            j = bisect_right(uses, i)
+            nxt = uses[j] if j < len(uses) else len(self.defs)
+            if nxt > best_next:
+                best, best_next = n, nxt
+        return best
+
+    def _ext(self, name: str):
+        return self.segments[name].externals.values()
+
+    def _record(self, iret: int) -> Optional[Segment]:
+        qc = self.qc
+        start, end = self._start, len(qc.gates)
+        seg_gates = [qc.gates[j] for j in range(start, end)]
+
+        def clean(q):
+            return q >= self._n_before or q in self._free_before
+
+        if not clean(iret) or not all(g.is_self_inverse() for g, _, _ in seg_gates):
+            return None
+
+        touched: Set[int] = set()
+        written: Set[int] = set()
+        for g, ws, _ in seg_gates:
+            touched.update(ws)
+            written.update(_written(g, ws))
+
+        scratch = [
+            q for q in touched if q != iret and clean(q) and q in qc.free_ancilla_lst
+        ]
+        externals: Dict[int, Optional[str]] = {}
+        for q in touched - set(scratch) - {iret}:
+            if clean(q) or q in written:
+                return None
+            live = [n for n in qc.qubit_map.keys_of(q) if n in self.live]
+            externals[q] = live[0] if live else None
+
+        return Segment(seg_gates, iret, scratch, externals, start, end)
+
+    def _replay(self, seg: Segment, target: int, reverse: bool):
+        """Apply the gates of the segment (or their mirror) writing the result to
+        target, and using fresh ancillas as scratch"""
+        qc = self.qc
+        remap = {seg.result: target}
+        for q, u in seg.externals.items():
+            remap[q] = q if u is None else qc[u]
+        scratch = [qc.get_free_ancilla() for _ in seg.scratch]
+        remap.update(zip(seg.scratch, scratch))
+
+        n = len(qc.gates_computed)
+        for g, ws, p in reversed(seg.gates) if reverse else seg.gates:
+            qc.append(g, [remap[w] for w in ws], p)
+
+        # The scratch qubits are clean again, as the temporaries after an uncompute
+        replayed = qc.gates_computed[n:]
+        del qc.gates_computed[n:]
+        qc.gates_computed.extend(ag for ag in replayed if ag[1][-1] not in scratch)
+        qc.free_ancilla_lst.update(scratch)
+        self._scan()
+
+    def _valid(self, name: str) -> bool:
+        seg = self.segments[name]
+        for q, u in seg.externals.items():
+            if u is None and self._last_write.get(q, -1) >= seg.start:
+                return False
+            if u is not None and u not in self.live and not self._recompute(u):
+                return False
+        return True
+
+    def _evict(self, name: str) -> bool:
+        """Uncompute a live symbol, freeing its qubit"""
+        qc = self.qc
+        q = qc[name]
+        seg = self.segments[name]
+        if (
+            qc.qubit_map.keys_of(q) != [name]
+            or self._last_write.get(q, -1) >= seg.valid_from
+            or not self._valid(name)
+        ):
+            return False
+
+        self._replay(seg, q, reverse=True)
+        self.compiler.expqmap.remove([q])
+        del qc[name]
+        qc[f"anc_{name}"] = q
+        qc.gates_computed = qc._new_gate_list(
+            [ag for ag in qc.gates_computed if q not in _written(ag[0], ag[1])]
+        )
+        qc.ancilla_lst.add(q)
+        qc.free_ancilla_lst.add(q)
+
+        self.live.remove(name)
+        self.evicted.add(name)
+        return True
+
+    def _recompute(self, name: str) -> bool:
+        """Recompute an evicted symbol on a free qubit"""
+        if not self._valid(name):
+            return False
+
+        qc = self.qc
+        q = qc.get_free_ancilla()
+        self._replay(self.segments[name], q, reverse=False)
+        qc.map_qubit(name, q, promote=True)
+        self.compiler.expqmap[Symbol(name)] = q
+
+        self.segments[name].valid_from = len(qc.gates)
+        self.evicted.remove(name)
+        self.live.add(name)
+        self.recomputed += 1
+        return True
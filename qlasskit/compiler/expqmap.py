@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License..
 
-from typing import Dict, List
+from typing import Dict, Iterable, Set
 
 from sympy.logic.boolalg import Boolean
 
@@ -22,6 +22,7 @@ class ExpQMap:
 
     def __init__(self):
         self.exp_map: Dict[Boolean, int] = {}
+        self.qubit_map: Dict[int, Set[Boolean]] = {}
 
     def __contains__(self, exp):
         return exp in self.exp_map
@@ -29,16 +30,23 @@ class ExpQMap:
     def __getitem__(self, exp):
         return self.exp_map[exp]
 
+    def __len__(self):
+        return len(self.exp_map)
+
     def __setitem__(self, exp, qubit):
         self.remove([qubit])
+
+        old = self.exp_map.get(exp)
+        if old is not None:
+            self.qubit_map[old].discard(exp)
+            if not self.qubit_map[old]:
+                del self.qubit_map[old]
+
         self.exp_map[exp] = qubit
+        self.qubit_map.setdefault(qubit, set()).add(exp)
 
-    def remove(self, qubits: List[int]):
+    def remove(self, qubits: Iterable[int]):
         """Remove qubits from the mapping"""
-        todel = []
-        for exp in self.exp_map.keys():
-            if self.exp_map[exp] in qubits:
-                todel.append(exp)
-
-        for exp in todel:
-            del self.exp_map[exp]
+        for qubit in qubits:
+            for exp in self.qubit_map.pop(qubit, ()):
+                del self.exp_map[exp]
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 # from copy import deepcopy
+from typing import Optional
 
 from sympy import Symbol
 from sympy.logic import And, Not, Or, Xor
@@ -22,10 +23,20 @@ from ..ast2logic.typing import Arg, Args, BoolExpList
 from ..boolquant import QuantumBooleanGate
 from ..qcircuit import QCircuit, QCircuitEnhanced
 from . import Compiler, CompilerException, ExpQMap
+from .ancilla import AncillaStrategy
 
 
 class InternalCompiler(Compiler):
-    """InternalCompiler translating an expression list to quantum circuit"""
+    """InternalCompiler translating an expression list to quantum circuit
+
+    Args:
+        ancilla_strategy (AncillaStrategy, optional): how ancillas are allocated and
+            intermediate symbols uncomputed (default: AncillaStrategy)
+    """
+
+    def __init__(self, ancilla_strategy: Optional[AncillaStrategy] = None):
+        super().__init__()
+        self.ancilla_strategy = ancilla_strategy or AncillaStrategy()
 
     # def is_symbol_referenced_in_remaining_exps(self, symbol):
     #     """Return True if the symbol is referenced in remaining expressions"""
@@ -39,7 +50,7 @@ class InternalCompiler(Compiler):
     def compile(  # noqa: C901
         self, name, args: Args, returns: Arg, exprs: BoolExpList, uncompute=True
     ) -> QCircuit:
-        qc = QCircuitEnhanced(name=name)
+        qc = QCircuitEnhanced(name=name, pick_ancilla=self.ancilla_strategy.pick)
         self.expqmap = ExpQMap()
         # self.remaining_exps = deepcopy(exprs)
 
@@ -47,9 +58,14 @@ class InternalCompiler(Compiler):
         self.input_symbols = [arg_b for arg in args for arg_b in arg.bitvec]
         [qc.add_qubit(arg) for arg in self.input_symbols]
 
+        exprs = self.ancilla_strategy.schedule(exprs)
+        self.pebbler = self.ancilla_strategy.pebbler(self, qc, exprs)
+
         # 2. Iterate over all expressions; iret contains qubit index for the current exp
-        for sym, exp in exprs:
+        for i, (sym, exp) in enumerate(exprs):
             # self.remaining_exps.pop(0)
+            if self.pebbler is not None:
+                self.pebbler.before(i, exp)
 
             is_temp = sym.name.startswith("__")
             symp_exp = self._symplify_exp(exp)
@@ -64,6 +80,10 @@ class InternalCompiler(Compiler):
             # 2.3 Remove all the temp qubits
             self.expqmap.remove(qc.uncompute())
 
+            # 2.4 Uncompute the symbols not needed anymore
+            if self.pebbler is not None:
+                self.pebbler.after(i, sym, iret)
+
         # 3. Remove identities gates (ie: X - X)
         qc.remove_identities()
 
@@ -207,10 +227,12 @@ class InternalCompiler(Compiler):
             return iret
 
         # 1. Compile the expression
+        shared = expr.args[0] in self.expqmap
         eret = self.compile_expr(qc, expr.args[0])
 
-        # 2. If the expression is on an ancilla, perform the X updating the exp
-        if eret in qc.ancilla_lst:
+        # 2. If the expression is on an ancilla computed just for the Not, perform the X
+        #    updating the exp (a shared one may still be used, ie: And(e, ~e))
+        if eret in qc.ancilla_lst and not shared:
             qc.x(eret)
             self.expqmap[expr] = eret
             return eret
@@ -245,11 +267,16 @@ class InternalCompiler(Compiler):
             elif isinstance(e, Not) and not isinstance(
                 e.args[0], Symbol
             ):  # fixes edge case:
-                d = self.compile_expr(qc, e.args[0], dest=d)
+                r = self.compile_expr(qc, e.args[0], dest=d)
+                if r != d:
+                    qc.cx(r, d)
                 qc.x(d)
-            # 2.5 Otherwise compile the expression
+            # 2.5 Otherwise compile the expression; an already computed expression is
+            #     not written to d, so xor it
             else:
-                d = self.compile_expr(qc, e, dest=d)
+                r = self.compile_expr(qc, e, dest=d)
+                if r != d:
+                    qc.cx(r, d)
 
         self.expqmap[expr] = d
         return d
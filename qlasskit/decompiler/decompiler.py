@@ -125,7 +125,7 @@ class Decompiler:
         qc = qc.copy(True)
 
         i = 0
-        for g, w, p in qc.gates + [(None, [0], None)]:
+        for g, w, p in list(qc.gates) + [(None, [0], None)]:
             if any(isinstance(g, zb_g) for zb_g in ZB_GATES):
                 if current_section_start_index is None:
                     current_section_start_index = i
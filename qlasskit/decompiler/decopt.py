@@ -79,13 +79,19 @@ def circuit_boolean_optimizer(
 
         qc_sec = exprs_to_quantum(exprs=n_exps, symbols=symbols, compiler=compiler)
 
+        # Skip if the section writes an input qubit to a different qubit
+        remapped = any(s.name in symbols and qc_sec[s] != qc[s] for s, _ in n_exps)
+
         if (
             len(qc_sec.gates) > len(section.gates)
             or (qc_sec.used_qubits - section_qubits) != set()
+            or remapped
         ):
             continue
 
         # Replace the circuit section with the new one
         qc_new.gates[section.index[0] : section.index[1]] = qc_sec.gates
 
+    # Cancel the gates that became adjacent across the replaced sections
+    qc_new.remove_identities()
     return qc_new
@@ -19,7 +19,9 @@ SupportedFramework = Literal["qiskit", "sympy", "cirq", "qasm", "pennylane", "qu
 SupportedFrameworks = list(get_args(SupportedFramework))
 
 from . import gates  # noqa: F401, E402
+from .gatelist import CompactGateList, LazyGateList  # noqa: F401, E402
 from .qcircuit import QCircuit  # noqa: F401, E402
 from .qcircuitenhanced import QCircuitEnhanced  # noqa: F401, E402
 from .qcircuitwrapper import QCircuitWrapper, reindex  # noqa: F401, E402
 from .cnotsim import CNotSim, GateNotSimulableException  # noqa: F401, E402
+from .statevectorsim import StatevectorSim  # noqa: F401, E402
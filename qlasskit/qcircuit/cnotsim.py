@@ -12,9 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import List, Union
+from typing import List, Sequence, Union
 
-from .gates import CCX, CX, MCX, MCtrl, X
+from .gates import CCX, CX, MCX, I, MCtrl, QGate, Swap, X
 from .qcircuit import QCircuit
 
 
@@ -25,8 +25,23 @@ class GateNotSimulableException(Exception):
         )
 
 
+def _is_cnot_like(g) -> bool:
+    return (
+        isinstance(g, CX)
+        or isinstance(g, CCX)
+        or isinstance(g, MCX)
+        or (isinstance(g, MCtrl) and isinstance(g.gate, X))
+    )
+
+
+def is_permutation_gate(g: QGate) -> bool:
+    """Return True if g maps every basis state to a basis state, with no phase (X, CX,
+    CCX, MCX, Swap), or does nothing"""
+    return g.is_nop() or isinstance(g, (X, Swap, I)) or _is_cnot_like(g)
+
+
 class CNotSim:
-    """A dummy simulator for X, CX, CCX, MCX circuits"""
+    """A dummy simulator for X, CX, CCX, MCX and Swap circuits"""
 
     def simulate(  # noqa: C901
         self,
@@ -46,15 +61,14 @@ class CNotSim:
         for i, x in enumerate(initialize):
             qubits[i] = x
 
-        for g, w, p in qc.gates:
-            if isinstance(g, X):
+        for g, w, p in qc.iter_gates():
+            if g.is_nop() or isinstance(g, I):
+                continue
+            elif isinstance(g, X):
                 qubits[w[0]] = not qubits[w[0]]
-            elif (
-                isinstance(g, CX)
-                or isinstance(g, CCX)
-                or isinstance(g, MCX)
-                or (isinstance(g, MCtrl) and isinstance(g.gate, X))
-            ):
+            elif isinstance(g, Swap):
+                qubits[w[0]], qubits[w[1]] = qubits[w[1]], qubits[w[0]]
+            elif _is_cnot_like(g):
                 if all([qubits[x] for x in w[0:-1]]):
                     qubits[w[-1]] = not qubits[w[-1]]
             else:
@@ -67,3 +81,99 @@ class CNotSim:
         for q in to_measure:
             measured.append(qubits[qc[q]])
         return measured
+
+    def simulate_packed(self, qc: QCircuit, state):
+        """Simulate a quantum circuit qc over a bit-sliced state, in place
+
+        Args:
+            state (np.ndarray): uint64 array of shape (num_qubits, n_words); bit j of
+                word k of row q is the value of qubit q in the assignment 64*k+j
+        """
+        import numpy as np
+
+        for g, w, p in qc.iter_gates():
+            if g.is_nop() or isinstance(g, I):
+                continue
+            elif isinstance(g, X):
+                np.invert(state[w[0]], out=state[w[0]])
+            elif isinstance(g, Swap):
+                state[[w[0], w[1]]] = state[[w[1], w[0]]]
+            elif _is_cnot_like(g):
+                if len(w) == 1:
+                    np.invert(state[w[0]], out=state[w[0]])
+                elif len(w) == 2:
+                    state[w[1]] ^= state[w[0]]
+                elif len(w) == 3:
+                    state[w[2]] ^= state[w[0]] & state[w[1]]
+                else:
+                    state[w[-1]] ^= np.bitwise_and.reduce(state[w[0:-1]], axis=0)
+            else:
+                raise GateNotSimulableException(g)
+
+        return state
+
+    def simulate_batch(
+        self,
+        qc: QCircuit,
+        initialize: Sequence[Sequence[bool]],
+        to_measure: List[Union[int, str]] = [],
+    ) -> List[List[bool]]:
+        """Simulate a quantum circuit qc for many input assignments at once; the
+        assignments are packed in uint64 words per qubit, so every gate is applied
+        to 64 assignments per bitwise operation
+
+        Args:
+            initialize (Sequence[Sequence[bool]]): list of initializers for the qubits,
+                one for every assignment
+            to_measure (List[int], optional): list of qubits to measure; measure all
+                if None.
+        """
+        import numpy as np
+
+        rows = len(initialize)
+        if rows == 0:
+            return []
+
+        n_words = (rows + 63) // 64
+        bits = np.zeros((qc.num_qubits, n_words * 64), dtype=bool)
+        init = np.asarray(initialize, dtype=bool).reshape(rows, -1)
+        bits[: init.shape[1], :rows] = init.T
+
+        state = np.packbits(bits, axis=1, bitorder="little").view("<u8").copy()
+        self.simulate_packed(qc, state)
+
+        if len(to_measure) != 0:
+            state = state[[qc[q] for q in to_measure]]
+
+        res = np.unpackbits(state.view(np.uint8), axis=1, bitorder="little")
+        return res[:, :rows].T.astype(bool).tolist()
+
+    def permutation_table(self, qc: QCircuit):
+        """Return the permutation of the basis states computed by a circuit of X, CX,
+        CCX, MCX and Swap gates, as an int64 array t where t[i] is the output basis
+        state for the input i (the qubit q is the bit q of the index, as in qiskit).
+
+        All the 2**num_qubits inputs are simulated at once by simulate_packed: the
+        packed rows of the inputs are the periodic bit patterns of the indexes, so they
+        are built without enumerating the assignments."""
+        import numpy as np
+
+        n = qc.num_qubits
+        size = 1 << n
+        n_words = (size + 63) // 64
+
+        state = np.empty((n, n_words), dtype="<u8")
+        k = np.arange(n_words, dtype="<u8")
+        for q in range(n):
+            if q < 6:
+                state[q] = sum(1 << j for j in range(64) if (j >> q) & 1)
+            else:
+                state[q] = np.where((k >> (q - 6)) & 1, ~np.uint64(0), 0)
+
+        self.simulate_packed(qc, state)
+
+        table = np.zeros(size, dtype=np.int64)
+        for q in range(n):
+            bits = np.unpackbits(state[q].view(np.uint8), bitorder="little")[:size]
+            table |= bits.astype(np.int64) << q
+        return table
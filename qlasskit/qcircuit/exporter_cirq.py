@@ -24,6 +24,7 @@ class CirqExporter(QCircuitExporter):
         import cirq
 
         if mode == "gate":
+            exporter, subs = self, {}
 
             class ExportedGate(cirq.Gate):
                 def init(self):
@@ -41,7 +42,12 @@ class CirqExporter(QCircuitExporter):
                             gate_mapping[g_name] if g_name in gate_mapping else g_name
                         )
 
-                        if isinstance(g, gates.MCX) or (
+                        if isinstance(g, gates.SubCircuit):
+                            if g not in subs:
+                                subs[g] = exporter.export(g.qc, "gate")
+                            yield subs[g]().on(*(qubits[i] for i in w))
+
+                        elif isinstance(g, gates.MCX) or (
                             isinstance(g, gates.MCtrl) and isinstance(g.gate, gates.X)
                         ):
                             gg = cirq.ControlledGate(
@@ -24,7 +24,7 @@ class PennyLaneExporter(QCircuitExporter):
 
         ops = []
 
-        for g, w, p in _selfqc.gates:
+        for g, w, p in _selfqc.iter_gates():
             g_name = g.__class__.__name__
 
             gate_mapping = {
@@ -12,78 +12,125 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Literal
+import gzip
+import os
+import re
+from typing import Any, Dict, Iterator, Literal, Optional, TextIO, Union
 
 from . import gates
 from .exporter import QCircuitExporter
 
+WRITE_BUFFER_SIZE = 1 << 20
+
 
 class QasmExporter(QCircuitExporter):
     def __init__(self, version=3):
         self.version = version
 
-    def export_v3(self, _selfqc, mode: Literal["circuit", "gate"]):
-        gate_qasm = f"gate {_selfqc.name} "
-        gate_qasm += " ".join(_selfqc.qubit_map.keys())
-        gate_qasm += " {\n"
+    def _gate_lines(
+        self, _selfqc, name: Optional[str] = None, subs: Dict[Any, str] = {}
+    ) -> Iterator[str]:
+        yield f"gate {name if name else _selfqc.name} "
+        yield " ".join(_selfqc.qubit_map.keys())
+        yield " {\n"
         for g, ws, p in _selfqc.gates:
             if issubclass(g.__class__, gates.NopGate):
                 continue
 
             qbs = list(map(lambda gq: _selfqc.get_key_by_index(gq), ws))
-            if p:
-                gate_qasm += f'\t{g.__name__.lower()}({p:.2f}) {" ".join(qbs)}\n'
+            if isinstance(g, gates.SubCircuit):
+                yield f'\t{subs[g]} {" ".join(qbs)}\n'
+            elif p:
+                yield f'\t{g.__name__.lower()}({p:.2f}) {" ".join(qbs)}\n'
             else:
-                gate_qasm += f'\t{g.__name__.lower()} {" ".join(qbs)}\n'
-        gate_qasm += "}\n\n"
+                yield f'\t{g.__name__.lower()} {" ".join(qbs)}\n'
+        yield "}\n\n"
+
+    def _subcircuit_lines(self, _selfqc, subs: Dict[Any, str]) -> Iterator[str]:
+        """Yield the gate definitions of the subcircuits called by _selfqc, once per
+        subcircuit and before their callers"""
+        for g, _, _ in _selfqc.gates:
+            if not isinstance(g, gates.SubCircuit) or g in subs:
+                continue
+            yield from self._subcircuit_lines(g.qc, subs)
 
-        if mode == "gate":
-            return gate_qasm
+            name = re.sub(r"\W", "_", g.name)
+            if name in subs.values():
+                name += f"_{len(subs)}"
+            subs[g] = name
+            yield from self._gate_lines(g.qc, name, subs)
 
-        qasm = "OPENQASM 3.0;\n\n"
-        qasm += gate_qasm
-        qasm += (
+    def _definition_lines(self, _selfqc) -> Iterator[str]:
+        subs: Dict[Any, str] = {}
+        yield from self._subcircuit_lines(_selfqc, subs)
+        yield from self._gate_lines(_selfqc, subs=subs)
+
+    def _call_line(self, _selfqc) -> str:
+        return (
             _selfqc.name
             + " "
             + ",".join(map(lambda c: f"q[{c}]", range(_selfqc.num_qubits)))
             + ";\n"
         )
 
-        return qasm
-
-    def export_v2(self, _selfqc, mode: Literal["circuit", "gate"]):
-        gate_qasm = f"gate {_selfqc.name} "
-        gate_qasm += " ".join(_selfqc.qubit_map.keys())
-        gate_qasm += " {\n"
-        for g, ws, p in _selfqc.gates:
-            if issubclass(g.__class__, gates.NopGate):
-                continue
-
-            qbs = list(map(lambda gq: _selfqc.get_key_by_index(gq), ws))
-            if p:
-                gate_qasm += f'\t{g.__name__.lower()}({p:.2f}) {" ".join(qbs)}\n'
-            else:
-                gate_qasm += f'\t{g.__name__.lower()} {" ".join(qbs)}\n'
-        gate_qasm += "}\n\n"
+    def iter_v3(self, _selfqc, mode: Literal["circuit", "gate"]) -> Iterator[str]:
+        if mode != "gate":
+            yield "OPENQASM 3.0;\n\n"
+        yield from self._definition_lines(_selfqc)
+        if mode != "gate":
+            yield self._call_line(_selfqc)
+
+    def iter_v2(self, _selfqc, mode: Literal["circuit", "gate"]) -> Iterator[str]:
+        if mode != "gate":
+            yield "OPENQASM 2.0;\n\n"
+            yield 'include "qelib1.inc";\n\n'
+            yield "qreg q[" + str(_selfqc.num_qubits) + "];\n"
+        yield from self._definition_lines(_selfqc)
+        if mode != "gate":
+            yield self._call_line(_selfqc)
 
-        if mode == "gate":
-            return gate_qasm
+    def export_v3(self, _selfqc, mode: Literal["circuit", "gate"]):
+        return "".join(self.iter_v3(_selfqc, mode))
 
-        qasm = "OPENQASM 2.0;\n\n"
-        qasm += 'include "qelib1.inc";\n\n'
-        qasm += "qreg q[" + str(_selfqc.num_qubits) + "];\n"
-        qasm += gate_qasm
-        qasm += (
-            _selfqc.name
-            + " "
-            + ",".join(map(lambda c: f"q[{c}]", range(_selfqc.num_qubits)))
-            + ";\n"
-        )
+    def export_v2(self, _selfqc, mode: Literal["circuit", "gate"]):
+        return "".join(self.iter_v2(_selfqc, mode))
 
-        return qasm
+    def iter_export(self, _selfqc, mode: Literal["circuit", "gate"]) -> Iterator[str]:
+        """Return an iterator over the chunks of the qasm program"""
+        if self.version == 3:
+            return self.iter_v3(_selfqc, mode)
+        else:
+            return self.iter_v2(_selfqc, mode)
 
     def export(self, _selfqc, mode: Literal["circuit", "gate"]):
-        if self.version == 3:
-            return self.export_v3(_selfqc, mode)
+        return "".join(self.iter_export(_selfqc, mode))
+
+    def export_to(
+        self,
+        _selfqc,
+        out: Union[str, os.PathLike, TextIO],
+        mode: Literal["circuit", "gate"] = "circuit",
+        compress: Optional[bool] = None,
+    ):
+        """Write the qasm program incrementally to a text stream or to a path, without
+        building it in memory; the output is the same of export
+
+        Args:
+            out (Union[str, os.PathLike, TextIO]): the destination stream or path
+            mode (Literal["circuit", "gate"], optional): the export mode
+            compress (bool, optional): if True, gzip the output file; if None, gzip if
+                the path ends with .gz (default: None)
+        """
+        if not isinstance(out, (str, os.PathLike)):
+            out.writelines(self.iter_export(_selfqc, mode))
+            return
+
+        if compress is None:
+            compress = os.fspath(out).endswith(".gz")
+
+        if compress:
+            with gzip.open(out, "wt", newline="") as f:
+                f.writelines(self.iter_export(_selfqc, mode))
         else:
-            return self.export_v2(_selfqc, mode)
+            with open(out, "w", buffering=WRITE_BUFFER_SIZE, newline="") as f:
+                f.writelines(self.iter_export(_selfqc, mode))
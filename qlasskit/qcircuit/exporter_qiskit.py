@@ -24,11 +24,20 @@ class QiskitExporter(QCircuitExporter):
         from qiskit.circuit.library.standard_gates import ZGate
 
         qc = QuantumCircuit(_selfqc.num_qubits, 0)
+        subs = {}
 
         for g, w, p in _selfqc.gates:
             g_name = g.__class__.__name__.lower()
 
-            if isinstance(g, gates.MCX) or (
+            if isinstance(g, gates.SubCircuit):
+                if g not in subs:
+                    subs[g] = self.export(g.qc, "gate")
+                    subs[g].name = g.name
+                    if hasattr(QuantumCircuit, g.name):
+                        subs[g].name += "_"
+                qc.append(subs[g], w)
+
+            elif isinstance(g, gates.MCX) or (
                 isinstance(g, gates.MCtrl) and isinstance(g.gate, gates.X)
             ):
                 qc.mcx(w[0:-1], w[-1])
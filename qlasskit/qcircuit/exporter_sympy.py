@@ -36,7 +36,7 @@ class SympyExporter(QCircuitExporter):
     def export(self, _selfqc, mode: Literal["circuit", "gate"]):  # noqa: C901
         qstate = Qubit("0" * _selfqc.num_qubits) if mode == "circuit" else None
 
-        for g, w, p in _selfqc.gates:
+        for g, w, p in _selfqc.iter_gates():
             g_name = g.__class__.__name__
             ga = None
             if isinstance(g, gates.X):
@@ -0,0 +1,345 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+from array import array
+from collections.abc import MutableSequence, Sequence
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import gates
+from .gates import AppliedGate
+
+
+class CompactGateList(MutableSequence):
+    """Struct-of-arrays storage for a list of applied gates.
+
+    Gates are stored as an opcode array (indexes in the table of interned gates), a flat
+    array of qubit operands with offsets and a list of params; items are materialized as
+    (QGate, List[int], param) tuples on access, so it can be used in place of a list.
+    Unique gates (subcircuits) are not interned, the list keeps them alive in `refs`.
+    """
+
+    __slots__ = ("ops", "offsets", "operands", "params", "refs")
+
+    def __init__(self, items: Iterable[AppliedGate] = ()):
+        self.ops = array("l")
+        self.offsets = array("l", [0])
+        self.operands = array("l")
+        self.params: List[Any] = []
+        self.refs: Dict[int, gates.QGate] = {}
+        self.extend(items)
+
+    def _opcode(self, g: gates.QGate) -> int:
+        op = gates.opcode(g)
+        if op < 0:
+            self.refs[op] = g
+        return op
+
+    def _get(self, i: int) -> AppliedGate:
+        return (
+            gates.from_opcode(self.ops[i]),
+            self.operands[self.offsets[i] : self.offsets[i + 1]].tolist(),
+            self.params[i],
+        )
+
+    def _splice(self, start: int, stop: int, items: Iterable[AppliedGate]):
+        """Replace the gates in [start, stop) with items, patching the arrays in place;
+        the offsets after stop are shifted only if the number of operands changes"""
+        ops, operands, ends, params = array("l"), array("l"), array("l"), []
+        base, end = self.offsets[start], self.offsets[stop]
+        for g, w, p in items:
+            ops.append(self._opcode(g))
+            operands.extend(w)
+            ends.append(base + len(operands))
+            params.append(p)
+
+        delta = len(operands) - (end - base)
+        self.ops[start:stop] = ops
+        self.params[start:stop] = params
+        self.operands[base:end] = operands
+        if delta == 0 and len(ops) == stop - start:
+            self.offsets[start + 1 : stop + 1] = ends
+        else:
+            tail = self.offsets[stop + 1 :]
+            if delta != 0:
+                tail = array("l", [o + delta for o in tail])
+            self.offsets[start + 1 :] = ends + tail
+
+    def _index(self, i: int) -> int:
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("gate index out of range")
+        return i
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def __iter__(self) -> Iterator[AppliedGate]:
+        from_opcode, ops, offsets = gates.from_opcode, self.ops, self.offsets
+        operands, params = self.operands, self.params
+        for i in range(len(ops)):
+            yield (
+                from_opcode(ops[i]),
+                operands[offsets[i] : offsets[i + 1]].tolist(),
+                params[i],
+            )
+
+    def __reversed__(self) -> Iterator[AppliedGate]:
+        for i in range(len(self.ops) - 1, -1, -1):
+            yield self._get(i)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return CompactGateList(self._get(j) for j in range(*i.indices(len(self))))
+        return self._get(self._index(i))
+
+    def __setitem__(self, i, value):
+        if not isinstance(i, slice):
+            i = self._index(i)
+            self._splice(i, i + 1, [value])
+            return
+        start, stop, step = i.indices(len(self))
+        if step == 1:
+            self._splice(start, max(start, stop), list(value))
+            return
+        idx, value = range(start, stop, step), list(value)
+        if len(idx) != len(value):
+            raise ValueError(
+                f"attempt to assign sequence of size {len(value)} "
+                f"to extended slice of size {len(idx)}"
+            )
+        for j, v in zip(idx, value):
+            self._splice(j, j + 1, [v])
+
+    def __delitem__(self, i):
+        if not isinstance(i, slice):
+            i = self._index(i)
+            self._splice(i, i + 1, [])
+            return
+        idx = range(*i.indices(len(self)))
+        if idx.step == 1:
+            self._splice(idx.start, max(idx.start, idx.stop), [])
+            return
+        for j in sorted(idx, reverse=True):
+            self._splice(j, j + 1, [])
+
+    def insert(self, i: int, value: AppliedGate):
+        i = min(max(i + len(self) if i < 0 else i, 0), len(self))
+        self._splice(i, i, [value])
+
+    def append(self, value: AppliedGate):
+        g, w, p = value
+        self.ops.append(self._opcode(g))
+        self.operands.extend(w)
+        self.offsets.append(len(self.operands))
+        self.params.append(p)
+
+    def extend(self, values: Iterable[AppliedGate]):
+        if isinstance(values, CompactGateList):
+            base = len(self.operands)
+            self.ops.extend(values.ops)
+            self.operands.extend(values.operands)
+            self.offsets.extend(o + base for o in values.offsets[1:])
+            self.params.extend(values.params)
+            self.refs.update(values.refs)
+        else:
+            for v in values:
+                self.append(v)
+
+    def remap(self, qubits: List[int]) -> "CompactGateList":
+        """Return a copy of the list with every qubit operand q replaced by qubits[q]"""
+        c = self.__copy__()
+        c.operands = array("l", [qubits[q] for q in self.operands])
+        return c
+
+    def __add__(self, other) -> List[AppliedGate]:
+        return list(self) + list(other)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, CompactGateList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def __copy__(self) -> "CompactGateList":
+        c = CompactGateList()
+        c.ops, c.offsets, c.operands = self.ops[:], self.offsets[:], self.operands[:]
+        c.params = list(self.params)
+        c.refs = dict(self.refs)
+        return c
+
+    def __deepcopy__(self, memo) -> "CompactGateList":
+        # Gates are interned and params are immutable, so copying the arrays is enough
+        return self.__copy__()
+
+    def __getstate__(self):
+        # Opcodes are local to the process, so they are not pickled
+        return list(self)
+
+    def __setstate__(self, state):
+        self.ops, self.offsets, self.operands = array("l"), array("l", [0]), array("l")
+        self.params, self.refs = [], {}
+        self.extend(state)
+
+    @property
+    def nbytes(self) -> int:
+        """Size in bytes of the gate storage (params counted as references)"""
+        return sum(
+            a.itemsize * len(a) for a in [self.ops, self.offsets, self.operands]
+        ) + 8 * len(self.params)
+
+
+Segment = Tuple[Sequence[AppliedGate], Sequence[int]]
+
+
+class LazyGateList(MutableSequence):
+    """Gate list made of segments, each one a view of the gates at some indexes of
+    another gate list (ie: the mirror of a circuit is its gate list at reversed indexes).
+
+    The gates are materialized only on iteration; the first change copies them in a new
+    list created by `factory`. The gate lists referenced by the segments must not be
+    modified afterwards.
+    """
+
+    def __init__(
+        self,
+        segments: List[Segment],
+        factory: Callable[[Iterable[AppliedGate]], Any] = list,
+    ):
+        self.segments: Optional[List[Segment]] = segments
+        self.factory = factory
+        self._items: Any = None
+
+    @staticmethod
+    def _segments_of(gate_list: Iterable[AppliedGate]) -> Tuple[List[Segment], Any]:
+        if isinstance(gate_list, LazyGateList):
+            return gate_list._frozen_segments(), gate_list.factory
+        factory = CompactGateList if isinstance(gate_list, CompactGateList) else list
+        block = copy_gate_list(gate_list)
+        return [(block, range(len(block)))], factory
+
+    @classmethod
+    def repeat(cls, gate_list: Iterable[AppliedGate], n: int) -> "LazyGateList":
+        """Return the gates of gate_list repeated n times; the block is copied once and
+        referenced n times"""
+        segments, factory = cls._segments_of(gate_list)
+        return cls(segments * n, factory)
+
+    @classmethod
+    def chain(cls, gate_lists: List[Iterable[AppliedGate]]) -> "LazyGateList":
+        """Return the gates of gate_lists one after the other, without copying the lazy
+        ones; the storage is the one of the first list"""
+        segments: List[Segment] = []
+        factory = None
+        for gl in gate_lists:
+            segs, f = cls._segments_of(gl)
+            segments += segs
+            factory = factory or f
+        return cls(segments, factory or list)
+
+    def _frozen_segments(self) -> List[Segment]:
+        if self._items is None:
+            return list(self.segments)  # type: ignore
+        block = copy_gate_list(self._items)
+        return [(block, range(len(block)))]
+
+    @property
+    def materialized(self) -> bool:
+        return self._items is not None
+
+    def _materialize(self):
+        if self._items is None:
+            self._items = self.factory(iter(self))
+            self.segments = None
+        return self._items
+
+    def __len__(self) -> int:
+        if self._items is not None:
+            return len(self._items)
+        return sum(len(idx) for _, idx in self.segments)  # type: ignore
+
+    def __iter__(self) -> Iterator[AppliedGate]:
+        if self._items is not None:
+            yield from self._items
+            return
+        for src, idx in self.segments:  # type: ignore
+            for i in idx:
+                yield src[i]
+
+    def __reversed__(self) -> Iterator[AppliedGate]:
+        if self._items is not None:
+            yield from reversed(self._items)
+            return
+        for src, idx in reversed(self.segments):  # type: ignore
+            for i in reversed(idx):
+                yield src[i]
+
+    def __getitem__(self, i):
+        if self._items is not None:
+            return self._items[i]
+        if isinstance(i, slice):
+            return self.factory(self[j] for j in range(*i.indices(len(self))))
+        if i < 0:
+            i += len(self)
+        if i >= 0:
+            for src, idx in self.segments:  # type: ignore
+                if i < len(idx):
+                    return src[idx[i]]
+                i -= len(idx)
+        raise IndexError("gate index out of range")
+
+    def __setitem__(self, i, value):
+        self._materialize()[i] = value
+
+    def __delitem__(self, i):
+        del self._materialize()[i]
+
+    def insert(self, i: int, value: AppliedGate):
+        self._materialize().insert(i, value)
+
+    def append(self, value: AppliedGate):
+        self._materialize().append(value)
+
+    def extend(self, values: Iterable[AppliedGate]):
+        if values is self:
+            values = list(values)
+        self._materialize().extend(values)
+
+    def __add__(self, other) -> List[AppliedGate]:
+        return list(self) + list(other)
+
+    def __copy__(self) -> "LazyGateList":
+        return LazyGateList(self._frozen_segments(), self.factory)
+
+    def __deepcopy__(self, memo) -> "LazyGateList":
+        # The segments are never modified, so the copy can share them
+        return self.__copy__()
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, CompactGateList, LazyGateList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+def copy_gate_list(gate_list: Iterable[AppliedGate]):
+    """Return a copy of a gate list, sharing the (immutable) gates and their operands"""
+    if isinstance(gate_list, (CompactGateList, LazyGateList)):
+        return copy.copy(gate_list)
+    return list(gate_list)
@@ -12,7 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, List, Tuple
+import itertools
+import weakref
+from functools import lru_cache
+from typing import Any, Dict, List, MutableSequence, Optional, Tuple
 
 
 class QGate:
@@ -27,6 +30,13 @@ class QGate:
     def __repr__(self):
         return f"{self.__name__}"
 
+    def __copy__(self):
+        # Gates are immutable, so copies (and circuit copies) share them
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
     @classmethod
     def invert(cls):
         return cls
@@ -34,6 +44,9 @@ class QGate:
     def is_nop(self):
         return False
 
+    def is_self_inverse(self):
+        return False
+
 
 class NopGate(QGate):
     def __init__(self, name="nop"):
@@ -54,21 +67,33 @@ class QControlledGate(QGate):
         self.n_controls = n_controls
         self.gate = gate
 
+    def is_self_inverse(self):
+        return self.gate.is_self_inverse()
+
 
 class I(QGate):  # noqa: E742
     def __init__(self):
         super().__init__("I", 1)
 
+    def is_self_inverse(self):
+        return True
+
 
 class X(QGate):
     def __init__(self):
         super().__init__("X")
 
+    def is_self_inverse(self):
+        return True
+
 
 class Y(QGate):
     def __init__(self):
         super().__init__("Y")
 
+    def is_self_inverse(self):
+        return True
+
 
 class S(QGate):
     def __init__(self):
@@ -84,11 +109,17 @@ class H(QGate):
     def __init__(self):
         super().__init__("H")
 
+    def is_self_inverse(self):
+        return True
+
 
 class Z(QGate):
     def __init__(self):
         super().__init__("Z")
 
+    def is_self_inverse(self):
+        return True
+
 
 class P(QGate):
     def __init__(self):
@@ -99,6 +130,9 @@ class Swap(QGate):
     def __init__(self):
         super().__init__("SWAP", 2)
 
+    def is_self_inverse(self):
+        return True
+
 
 class CX(QControlledGate):
     def __init__(self):
@@ -133,6 +167,15 @@ class MCtrl(QControlledGate):
         super().__init__(gate, n_controls)
 
 
+class SubCircuit(QGate):
+    """A named subcircuit: the gates of a circuit are stored once, and applied to the
+    wires of every call (the i-th wire is the i-th qubit of the subcircuit)"""
+
+    def __init__(self, qc, name: Optional[str] = None):
+        super().__init__(name if name else qc.name, qc.num_qubits)
+        self.qc = qc.copy()
+
+
 def apply(gate: QGate, qubits: List[int], param=None):
     if len(qubits) != gate.n_qubits:
         raise Exception(f"expected {gate.n_qubits} qubits ({len(qubits)} given)")
@@ -144,3 +187,77 @@ def apply(gate: QGate, qubits: List[int], param=None):
 
 
 AppliedGate = Tuple[QGate, List[int], Any]
+
+GateList = MutableSequence[AppliedGate]
+"""The gates of a circuit: a list, a CompactGateList or a LazyGateList"""
+
+
+_interned: Dict[Tuple, QGate] = {}
+_opcodes: List[QGate] = []
+
+# Gates compared by identity (subcircuits) are not interned: they get negative opcodes,
+# never reused, and the table does not keep them alive
+_unique: "weakref.WeakValueDictionary[int, QGate]" = weakref.WeakValueDictionary()
+_next_unique = itertools.count(-1, -1)
+
+
+def _gate_key(gate: QGate) -> Optional[Tuple]:
+    """Return the key of the interned gates equal to gate, None if gate is unique"""
+    if isinstance(gate, SubCircuit):
+        # Every subcircuit is a different definition
+        return None
+    if isinstance(gate, QControlledGate):
+        key = _gate_key(gate.gate)
+        if key is None:
+            return None
+        return (gate.__class__, gate.name, gate.n_qubits, key)
+    return (gate.__class__, gate.name, gate.n_qubits)
+
+
+def _own_opcode(gate: QGate) -> Optional[int]:
+    op = getattr(gate, "_opcode", None)
+    if op is None:
+        return None
+    if op < 0:
+        return op if _unique.get(op) is gate else None
+    return op if op < len(_opcodes) and _opcodes[op] is gate else None
+
+
+def intern(gate: QGate) -> QGate:
+    """Return the canonical instance of gate; equal gates share the same object"""
+    if _own_opcode(gate) is not None:
+        return gate
+
+    key = _gate_key(gate)
+    if key is None:
+        gate._opcode = next(_next_unique)  # type: ignore
+        _unique[gate._opcode] = gate  # type: ignore
+        return gate
+    if key not in _interned:
+        gate._opcode = len(_opcodes)  # type: ignore
+        _interned[key] = gate
+        _opcodes.append(gate)
+    return _interned[key]
+
+
+@lru_cache(maxsize=None)
+def interned(gate_class, *args) -> QGate:
+    """Return the canonical instance of gate_class(*args), without allocating a new
+    gate at every call"""
+    return intern(gate_class(*args))
+
+
+def opcode(gate: QGate) -> int:
+    """Return the opcode of a gate, an index in the table of interned gates; unique
+    gates have negative opcodes, valid while the gate is referenced elsewhere"""
+    op = _own_opcode(gate)
+    if op is not None:
+        return op
+    return intern(gate)._opcode  # type: ignore
+
+
+def from_opcode(op: int) -> QGate:
+    """Return the interned gate of a given opcode"""
+    if op < 0:
+        return _unique[op]
+    return _opcodes[op]
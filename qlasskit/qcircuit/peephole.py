@@ -0,0 +1,70 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import gates
+from .gates import AppliedGate
+
+
+def _canonical_wires(g: gates.QGate, ws: List[int]) -> Tuple:
+    """Return the wires of a gate, ignoring the order of symmetric wires (controls and
+    swapped qubits)"""
+    if isinstance(g, gates.QControlledGate):
+        return (
+            tuple(sorted(ws[: g.n_controls])),
+            _canonical_wires(g.gate, ws[g.n_controls :]),
+        )
+    elif isinstance(g, gates.Swap):
+        return tuple(sorted(ws))
+    return tuple(ws)
+
+
+def cancel_inverses(gate_list: Iterable[AppliedGate]) -> List[AppliedGate]:
+    """Remove every pair of equal self-inverse gates (X, CX, CCX, MCX, Swap, H, Z, ...)
+    with no gate acting on their qubits in between, including the pairs that become
+    adjacent after a removal. Barriers are never crossed.
+
+    It keeps, for every qubit, the stack of the live gates acting on it; a gate cancels
+    the previous one if it is on top of the stack of all its qubits, so the pass runs in
+    time linear in the number of gates times their size."""
+    out: List[Optional[AppliedGate]] = []
+    keys: List[Any] = []
+    stacks: Dict[int, List[int]] = {}
+
+    for g, ws, p in gate_list:
+        if g.is_nop():
+            out.append((g, ws, p))
+            keys.append(None)
+            stacks = {}
+            continue
+
+        key = None
+        if g.is_self_inverse() and len(ws) > 0:
+            key = (gates.opcode(g), _canonical_wires(g, ws), p)
+
+            top = stacks.get(ws[0])
+            j = top[-1] if top else None
+            if j is not None and keys[j] == key and all(stacks[w][-1] == j for w in ws):
+                out[j] = None
+                for w in ws:
+                    stacks[w].pop()
+                continue
+
+        for w in ws:
+            stacks.setdefault(w, []).append(len(out))
+        out.append((g, ws, p))
+        keys.append(key)
+
+    return [ag for ag in out if ag is not None]
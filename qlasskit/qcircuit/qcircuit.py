@@ -15,41 +15,137 @@
 import copy
 import math
 import random
-from typing import Any, Dict, List, Literal, Tuple, Union
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple, Union
 
 from sympy import Symbol
 
 from . import SupportedFramework, gates
+from .gatelist import CompactGateList, LazyGateList, copy_gate_list
 from .gates import QGate
+from .peephole import cancel_inverses
+
+
+class QubitMap(dict):
+    """A name => qubit index dict that also maintains the reverse index => names map.
+
+    Since many names can be mapped to the same qubit, every key is tagged with its
+    insertion order; get_key returns the most recently inserted key, as a reversed scan
+    of the dict keys would do. Changes must go through item assignment or the dict
+    methods overridden here (`|=` does not update the reverse map).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._seq = 0
+        self._order: Dict[str, int] = {}
+        self._rev: Dict[int, Dict[str, int]] = {}
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key, index):
+        if key in self:
+            old = dict.__getitem__(self, key)
+            if old == index:
+                return
+            self._unlink(key, old)
+        else:
+            self._order[key] = self._seq
+            self._seq += 1
+
+        dict.__setitem__(self, key, index)
+        self._rev.setdefault(index, {})[key] = self._order[key]
+
+    def __delitem__(self, key):
+        self._unlink(key, dict.__getitem__(self, key))
+        del self._order[key]
+        dict.__delitem__(self, key)
+
+    def _unlink(self, key, index):
+        keys = self._rev[index]
+        del keys[key]
+        if len(keys) == 0:
+            del self._rev[index]
+
+    def get_key(self, index: int):
+        """Return the most recently inserted name of the qubit index, or None"""
+        keys = self._rev.get(index)
+        if not keys:
+            return None
+        return max(keys, key=keys.__getitem__)
+
+    def keys_of(self, index: int) -> List[str]:
+        """Return all the names of the qubit index, in insertion order"""
+        keys = self._rev.get(index, {})
+        return sorted(keys, key=keys.__getitem__)
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        v = self[key]
+        del self[key]
+        return v
+
+    def popitem(self):
+        key = next(reversed(self.keys()))
+        return key, self.pop(key)
+
+    def clear(self):
+        dict.clear(self)
+        self._order.clear()
+        self._rev.clear()
+
+    def copy(self):
+        return QubitMap(self)
+
+    def __reduce__(self):
+        return (QubitMap, (list(self.items()),))
 
 
 class QCircuit:
-    def __init__(self, num_qubits=0, name="qc", native=None):
+    def __init__(self, num_qubits=0, name="qc", native=None, compact=False):
         """Initialize a quantum circuit.
 
         Args:
             num_qubits (int, optional): The number of qubits in the circuit. Defaults to 0.
+            compact (bool, optional): If True, store the gates in a CompactGateList
+                (struct-of-arrays) instead of a list. Defaults to False.
 
         """
         self.name: str = name
         self.num_qubits: int = num_qubits
-        self.gates: List[gates.AppliedGate] = []
-        self.gates_computed: List[gates.AppliedGate] = []
-        self.qubit_map = {}
+        self.compact: bool = compact
+        self.gates: gates.GateList = self._new_gate_list()
+        self.gates_computed: gates.GateList = self._new_gate_list()
+        self.qubit_map = QubitMap()
 
         for x in range(num_qubits):
             self.qubit_map[f"q{x}"] = x
 
         self.__native = native
+        self._permutation: Optional[Tuple[Tuple, Any]] = None
+
+    def _new_gate_list(self, items=[]) -> gates.GateList:
+        """Return a new gate list, using the storage backend of the circuit"""
+        if self.compact:
+            return CompactGateList(items)
+        return list(items)
 
     @property
     def num_gates(self):
-        return len(list(filter(lambda x: not x[0].is_nop(), self.gates)))
+        return len(list(filter(lambda x: not x[0].is_nop(), self.iter_gates())))
 
     @property
     def used_qubits(self):
         _used_qubits = set()
-        for g, w, p in self.gates:
+        for g, w, p in self.iter_gates():
             for i in w:
                 _used_qubits.add(i)
         return _used_qubits
@@ -57,12 +153,40 @@ class QCircuit:
     @property
     def gate_stats(self) -> Dict:
         d = {}
-        for g, w, p in self.gates:
+        for g, w, p in self.iter_gates():
             if g.name not in d:
                 d[g.name] = 0
             d[g.name] += 1
         return d
 
+    def is_permutation(self) -> bool:
+        """Return True if the circuit only contains X, CX, CCX, MCX and Swap gates, so it
+        maps every basis state to a basis state"""
+        from .cnotsim import is_permutation_gate
+
+        return all(is_permutation_gate(g) for g, _, _ in self.iter_gates())
+
+    def permutation_table(self):
+        """Return the permutation of the basis states computed by the circuit, as an int64
+        array t where t[i] is the output basis state for the input i (the qubit q is the
+        bit q of the index). The table is cached on the circuit, keyed by the opcodes
+        and the qubits of its gates, so any change of the gates computes it again; it
+        raises GateNotSimulableException if the circuit is not a permutation."""
+        from .cnotsim import CNotSim
+
+        key = (
+            self.num_qubits,
+            tuple((gates.opcode(g), tuple(w)) for g, w, _ in self.iter_gates()),
+        )
+        cached = self._permutation
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        table = CNotSim().permutation_table(self)
+        table.setflags(write=False)
+        self._permutation = (key, table)
+        return table
+
     @staticmethod
     def random(qubits_n: int, depth: int, gate_list=None) -> "QCircuit":
         qc = QCircuit(qubits_n)
@@ -93,10 +217,13 @@ class QCircuit:
 
     def get_key_by_index(self, i: int):
         """Return the qubit name given its index"""
-        for key in reversed(self.qubit_map.keys()):
-            if self.qubit_map[key] == i:
-                return key
-        raise Exception(f"Qubit with index {i} not found")
+        if not isinstance(self.qubit_map, QubitMap):
+            self.qubit_map = QubitMap(self.qubit_map)
+
+        key = self.qubit_map.get_key(i)
+        if key is None:
+            raise Exception(f"Qubit with index {i} not found")
+        return key
 
     def __repr__(self):
         """Return a string representation of the QCircuit"""
@@ -137,29 +264,41 @@ class QCircuit:
 
     def __add__(self, qc: "QCircuit") -> "QCircuit":
         """Create a new QCircuit that merges two"""
-        nqc = copy.deepcopy(self)
+        nqc = self.copy()
         nqc += qc
         return nqc
 
     def copy(self, vanilla=False) -> "QCircuit":
-        """Create a copy of the quantum circuit; if vanilla is True, reset all mapping info"""
+        """Create a copy of the quantum circuit; if vanilla is True, reset all mapping info.
+        Gates are immutable, so the copy shares them with the original circuit"""
         self.__native = None
         if vanilla:
-            circ = QCircuit(self.num_qubits)
-            circ.gates = copy.deepcopy(self.gates)
+            circ = QCircuit(self.num_qubits, compact=self.compact)
+            circ.gates = copy_gate_list(self.gates)
 
             return circ
 
-        return copy.deepcopy(self)
+        circ = copy.copy(self)
+        for k, v in vars(self).items():
+            if k in ["gates", "gates_computed"]:
+                setattr(circ, k, copy_gate_list(v))
+            elif isinstance(v, (list, set, dict)):
+                setattr(circ, k, v.copy())
+        return circ
 
     def repeat(self, n: int) -> "QCircuit":
-        """Return a copy of the QCircuit repeated n times"""
-        o = self.copy()
+        """Return a copy of the QCircuit repeated n times; the gates are a LazyGateList
+        referencing the gates of this circuit n times, so nothing is copied n times"""
         n_qc = self.copy()
-        for i in range(n - 1):
-            n_qc += o.copy()
+        n_qc.gates = LazyGateList.repeat(self.gates, max(n, 1))
+        n_qc.gates_computed = LazyGateList.repeat(self.gates_computed, max(n, 1))
         return n_qc
 
+    def remove_identities(self):
+        """Remove identities from the circuit, cancelling pairs of self-inverse gates
+        (ie: X - X) not separated by gates acting on the same qubits"""
+        self.gates = self._new_gate_list(cancel_inverses(self.gates))
+
     def __iadd__(self, other: Union[gates.AppliedGate, "QCircuit"]):  # type: ignore
         """AugAssign between a qcircuit and a AppliedGate|QCircuit"""
         if isinstance(other, Tuple):  # type: ignore
@@ -179,6 +318,26 @@ class QCircuit:
                 f"Other circuit and qubits list mismatch {other.num_qubits} != {len(qubits)}"
             )
 
+        if isinstance(other.gates, CompactGateList) and isinstance(
+            other.gates_computed, CompactGateList
+        ):
+            self.gates.extend(other.gates.remap(qubits))
+            self.gates_computed.extend(other.gates_computed.remap(qubits))
+            return self
+
+        # Same qubits: the gates are shared, not remapped
+        if qubits == list(range(other.num_qubits)):
+            if isinstance(other.gates, LazyGateList):
+                # ie: a repeated circuit, kept lazy
+                self.gates = LazyGateList.chain([self.gates, other.gates])
+                self.gates_computed = LazyGateList.chain(
+                    [self.gates_computed, other.gates_computed]
+                )
+                return self
+            self.gates.extend(other.gates)
+            self.gates_computed.extend(other.gates_computed)
+            return self
+
         ogates = []
         ogates_computed = []
 
@@ -198,6 +357,38 @@ class QCircuit:
         self.gates_computed.extend(ogates_computed)
         return self
 
+    def append_subcircuit(
+        self,
+        sub: Union["QCircuit", gates.SubCircuit],
+        qubits: Optional[List[int]] = None,
+        name: Optional[str] = None,
+    ) -> gates.SubCircuit:
+        """Add a call to a named subcircuit, without copying its gates in this circuit.
+
+        Args:
+            sub (Union[QCircuit, SubCircuit]): the circuit, or a SubCircuit returned by a
+                previous call to reuse the same definition
+            qubits (List[int], optional): the qubits of the call (default: the first ones)
+            name (str, optional): the name of the subcircuit (default: the circuit name)
+
+        Returns:
+            SubCircuit: the subcircuit gate
+        """
+        if isinstance(sub, QCircuit):
+            sub = gates.SubCircuit(sub, name)
+
+        self.append(sub, list(range(sub.n_qubits)) if qubits is None else qubits)
+        return sub
+
+    def iter_gates(self) -> Iterator[gates.AppliedGate]:
+        """Iterate over the gates of the circuit, expanding the subcircuit calls"""
+        for g, w, p in self.gates:
+            if isinstance(g, gates.SubCircuit):
+                for sg, sw, sp in g.qc.iter_gates():
+                    yield sg, [w[x] for x in sw], sp
+            else:
+                yield g, w, p
+
     def add_qubit(self, name=None):
         """Add a qubit to the circuit.
 
@@ -246,52 +437,52 @@ class QCircuit:
 
     def barrier(self, label=None):
         """Add a barrier to the circuit"""
-        self.append(gates.Barrier(), [], label)
+        self.append(gates.interned(gates.Barrier), [], label)
 
     def h(self, w: int):
         """H gate"""
         w = self[w]
-        self.append(gates.H(), [w])
+        self.append(gates.interned(gates.H), [w])
 
     def z(self, w: int):
         """Z gate"""
         w = self[w]
-        self.append(gates.Z(), [w])
+        self.append(gates.interned(gates.Z), [w])
 
     def x(self, w: int):
         """X gate"""
         w = self[w]
-        self.append(gates.X(), [w])
+        self.append(gates.interned(gates.X), [w])
 
     def y(self, w: int):
         """Y gate"""
         w = self[w]
-        self.append(gates.Y(), [w])
+        self.append(gates.interned(gates.Y), [w])
 
     def t(self, w: int):
         """T gate"""
         w = self[w]
-        self.append(gates.T(), [w])
+        self.append(gates.interned(gates.T), [w])
 
     def s(self, w: int):
         """S gate"""
         w = self[w]
-        self.append(gates.S(), [w])
+        self.append(gates.interned(gates.S), [w])
 
     def cx(self, w1, w2):
         """CX gate"""
         w1, w2 = self[w1], self[w2]
-        self.append(gates.CX(), [w1, w2])
+        self.append(gates.interned(gates.CX), [w1, w2])
 
     def ccx(self, w1, w2, w3):
         """CCX gate"""
         w1, w2, w3 = self[w1], self[w2], self[w3]
-        self.append(gates.CCX(), [w1, w2, w3])
+        self.append(gates.interned(gates.CCX), [w1, w2, w3])
 
     def cz(self, w1, w2):
         """CZ gate"""
         w1, w2 = self[w1], self[w2]
-        self.append(gates.CZ(), [w1, w2])
+        self.append(gates.interned(gates.CZ), [w1, w2])
 
     def mctrl(self, g, wl: List[int], target, param=None):
         """Multi controlled gate"""
@@ -303,16 +494,16 @@ class QCircuit:
         """Multi CX gate"""
         target = self[target]
         wl = list(map(lambda w: self[w], wl))
-        self.append(gates.MCX(len(wl)), wl + [target])
+        self.append(gates.interned(gates.MCX, len(wl)), wl + [target])
 
     def swap(self, w1, w2):
         w1, w2 = self[w1], self[w2]
-        self.append(gates.Swap(), [w1, w2])
+        self.append(gates.interned(gates.Swap), [w1, w2])
 
     def cp(self, phase, w1, w2):
         """CP gate"""
         w1, w2 = self[w1], self[w2]
-        self.append(gates.CP(), [w1, w2], phase)
+        self.append(gates.interned(gates.CP), [w1, w2], phase)
 
     def qft(self, wl: List[int]):
         """Apply the quantum fourier transform"""
@@ -12,22 +12,37 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import copy
-from typing import List, Union
+from array import array
+from typing import Callable, List, Optional, Set, Union
 
 from sympy import Symbol
 
 from . import gates
+from .gatelist import CompactGateList, LazyGateList
 from .qcircuit import QCircuit
 
 
 class QCircuitEnhanced(QCircuit):
-    def __init__(self, num_qubits=0, name="qc", native=None):
-        super().__init__(num_qubits, name, native)
+    def __init__(
+        self,
+        num_qubits=0,
+        name="qc",
+        native=None,
+        compact=False,
+        pick_ancilla: Optional[Callable[[Set[int]], int]] = None,
+    ):
+        """Initialize a quantum circuit with ancilla management.
 
-        self.ancilla_lst = set()
-        self.free_ancilla_lst = set()
-        self.marked_ancillas = set()
+        Args:
+            pick_ancilla (Callable[[Set[int]], int], optional): function removing and
+                returning an ancilla from the set of free ones (default: set.pop)
+        """
+        super().__init__(num_qubits, name, native, compact)
+
+        self.ancilla_lst: Set[int] = set()
+        self.free_ancilla_lst: Set[int] = set()
+        self.marked_ancillas: Set[int] = set()
+        self.pick_ancilla = pick_ancilla
 
     def map_qubit(self, name: Union[str, Symbol], index: int, promote=False):
         """Map a name to a qubit
@@ -55,30 +70,6 @@ class QCircuitEnhanced(QCircuit):
 
         self[name] = index
 
-    def remove_identities(self):
-        """Remove identities from the circuit"""
-        result: List[gates.AppliedGate] = []
-        i = 0
-        len_g = len(self.gates)  # type: ignore
-        while i < len_g:
-            if i < (len_g - 1) and self.gates[i] == self.gates[i + 1]:  # type: ignore
-                if isinstance(result[-1][0], gates.Barrier):
-                    result.pop()
-                i += 2
-            elif (
-                i < (len_g - 2)
-                and self.gates[i] == self.gates[i + 2]  # type: ignore
-                and isinstance(self.gates[i + 1][0], gates.Barrier)  # type: ignore
-            ):
-                if isinstance(result[-1][0], gates.Barrier):
-                    result.pop()
-                i += 3
-            else:
-                result.append(self.gates[i])  # type: ignore
-                i += 1
-
-        self.gates = result
-
     def add_ancilla(self, name=None, is_free=True):
         """Add an ancilla qubit"""
         i = self.add_qubit(name if name else f"anc_{len(self.ancilla_lst)}")
@@ -91,6 +82,8 @@ class QCircuitEnhanced(QCircuit):
         """Get the first free ancilla available"""
         if len(self.free_ancilla_lst) == 0:
             anc = self.add_ancilla(is_free=False)
+        elif self.pick_ancilla is not None:
+            anc = self.pick_ancilla(self.free_ancilla_lst)
         else:
             anc = self.free_ancilla_lst.pop()
 
@@ -102,12 +95,16 @@ class QCircuitEnhanced(QCircuit):
             self.marked_ancillas.add(w)
 
     def uncompute_all(self, keep: List[Union[Symbol, int]] = []):
-        """Uncompute the whole circuit expect for the keep (symbols or qubit)"""
+        """Uncompute the whole circuit expect for the keep (symbols or qubit)
+
+        The uncomputation is not copied: gates and gates_computed become LazyGateList
+        views of the current gate list followed by its mirror segment."""
         # TODO: replace with + invert(keep)
-        scopy = copy.deepcopy(self.gates)
         uncomputed = set()
+        mirror = array("l")
 
-        for g, qbs, p in reversed(scopy):
+        n = len(self.gates)
+        for i, (g, qbs, p) in enumerate(reversed(self.gates)):
             if (
                 issubclass(g.__class__, gates.NopGate)
                 or qbs[-1] in keep
@@ -119,7 +116,14 @@ class QCircuitEnhanced(QCircuit):
             if qbs[-1] in self.ancilla_lst:
                 self.free_ancilla_lst.add(qbs[-1])
 
-            self.append(g, qbs, p)
+            mirror.append(n - 1 - i)
+
+        factory = CompactGateList if self.compact else list
+        base, computed = self.gates, self.gates_computed
+        self.gates = LazyGateList([(base, range(n)), (base, mirror)], factory)
+        self.gates_computed = LazyGateList(
+            [(computed, range(len(computed))), (base, mirror)], factory
+        )
 
         return uncomputed
 
@@ -133,7 +137,7 @@ class QCircuitEnhanced(QCircuit):
         uncomputed = set()
         new_gates_comp = []
 
-        for g, ws, p in reversed(self.gates_computed):  # type: ignore
+        for g, ws, p in reversed(self.gates_computed):
             if ws[-1] in self.marked_ancillas:
                 uncomputed.add(ws[-1])
                 self.append(g, ws, p)
@@ -143,6 +147,6 @@ class QCircuitEnhanced(QCircuit):
         for x in self.marked_ancillas:
             self.free_ancilla_lst.add(x)
         self.marked_ancillas = self.marked_ancillas - uncomputed
-        self.gates_computed = new_gates_comp[::-1]
+        self.gates_computed = self._new_gate_list(new_gates_comp[::-1])
 
         return uncomputed
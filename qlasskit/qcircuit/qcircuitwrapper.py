@@ -86,6 +86,19 @@ class QCircuitWrapper:
 
         return int_counts
 
+    def sample(
+        self,
+        shots: int = 1024,
+        discard_lower: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> Dict[Any, int]:
+        """Simulate the circuit with the built-in StatevectorSim, measuring all the
+        qubits, and return the decoded counts"""
+        from .statevectorsim import StatevectorSim
+
+        counts = StatevectorSim().sample(self._qcircuit, shots, seed=seed)
+        return self.decode_counts(counts, discard_lower)
+
     def circuit(self):
         return self._qcircuit
 
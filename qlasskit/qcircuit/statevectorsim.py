@@ -0,0 +1,208 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import cmath
+import math
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from . import gates
+from .cnotsim import CNotSim, GateNotSimulableException, is_permutation_gate
+from .qcircuit import QCircuit
+
+_PHASES = {
+    gates.Z: -1,
+    gates.S: 1j,
+    gates.T: cmath.exp(1j * math.pi / 4),
+}
+
+_SQRT1_2 = 1 / math.sqrt(2)
+
+_TABLE_CACHE_SIZE = 4
+
+
+class StatevectorSim:
+    """A statevector simulator for all the gates of qlasskit, based on numpy.
+
+    The state is kept as a tensor with one axis per qubit; every gate is applied in place
+    on the slices of the tensor selected by its qubits (controlled gates only on the
+    slice where the controls are 1), so no unitary is ever built. Amplitudes are indexed
+    as in qiskit: the qubit i is the bit i of the index.
+
+    Runs of X, CX, CCX, MCX and Swap gates longer than twice the number of qubits are
+    applied at once, as an index gather with their permutation table (see
+    QCircuit.permutation_table); the last tables are cached, so runs repeated in the
+    circuit (like the oracle calls of Grover) are computed once.
+
+    Args:
+        dtype (str, optional): the complex dtype of the state (default: complex128)
+    """
+
+    def __init__(self, dtype: str = "complex128"):
+        self.dtype = dtype
+        self._tables: Dict[Tuple, Any] = {}
+
+    def statevector(self, qc: QCircuit, initialize: List[bool] = []):
+        """Return the final state of the circuit qc
+
+        Args:
+            initialize (List[bool], optional): the initial value of the first qubits
+                (default: all zero)
+        """
+        import numpy as np
+
+        n = qc.num_qubits
+        state = np.zeros(2**n, dtype=self.dtype)
+        state[sum(1 << i for i, x in enumerate(initialize) if x)] = 1
+
+        if qc.is_permutation():
+            return self._permute(state, qc.permutation_table())
+
+        run: List[gates.AppliedGate] = []
+        for g, w, p in qc.iter_gates():
+            if is_permutation_gate(g):
+                run.append((g, w, p))
+                continue
+            state = self._apply_run(state, run)
+            run = []
+            self._apply(state.reshape((2,) * n), g, w, p)
+        return self._apply_run(state, run)
+
+    def _permute(self, state, table):
+        import numpy as np
+
+        out = np.empty_like(state)
+        out[table] = state
+        return out
+
+    def _apply_run(self, state, run: List[gates.AppliedGate]):
+        """Apply a run of permutation gates, returning the new state"""
+        n = state.size.bit_length() - 1
+        if len(run) <= 2 * n:
+            tensor = state.reshape((2,) * n)
+            for g, w, p in run:
+                self._apply(tensor, g, w, p)
+            return state
+
+        key = tuple((gates.opcode(g), tuple(w)) for g, w, _ in run)
+        table = self._tables.pop(key, None)
+        if table is None:
+            qc = QCircuit(n)
+            qc.gates = qc._new_gate_list(run)
+            table = CNotSim().permutation_table(qc)
+            if len(self._tables) >= _TABLE_CACHE_SIZE:
+                del self._tables[next(iter(self._tables))]
+        self._tables[key] = table
+        return self._permute(state, table)
+
+    def _apply(self, tensor, g: gates.QGate, w: List[int], p):  # noqa: C901
+        import numpy as np
+
+        if g.is_nop() or isinstance(g, gates.I):
+            return
+
+        # Fixed qubits are selected by slices of length 1, so the result is always a view
+        n = tensor.ndim
+        idx: List = [slice(None)] * n
+        if isinstance(g, gates.QControlledGate):
+            for c in w[: g.n_controls]:
+                idx[n - 1 - c] = slice(1, 2)
+            w = w[g.n_controls :]
+            g = g.gate
+
+        def at(*bits):
+            """Return the slice of idx with the qubit w[i] set to bits[i]"""
+            s = list(idx)
+            for q, b in zip(w, bits):
+                s[n - 1 - q] = slice(b, b + 1)
+            return tuple(s)
+
+        if isinstance(g, gates.X):
+            s0, s1 = at(0), at(1)
+            tmp = tensor[s0].copy()
+            tensor[s0] = tensor[s1]
+            tensor[s1] = tmp
+
+        elif isinstance(g, gates.Swap):
+            s01, s10 = at(0, 1), at(1, 0)
+            tmp = tensor[s01].copy()
+            tensor[s01] = tensor[s10]
+            tensor[s10] = tmp
+
+        elif isinstance(g, gates.P):
+            if p is None:
+                raise GateNotSimulableException(g)
+            tensor[at(1)] *= cmath.exp(1j * p)
+
+        elif g.__class__ in _PHASES:
+            tensor[at(1)] *= _PHASES[g.__class__]
+
+        elif isinstance(g, gates.H):
+            t0, t1 = tensor[at(0)], tensor[at(1)]
+            a = t0.copy()
+            t0 += t1
+            t0 *= _SQRT1_2
+            np.subtract(a, t1, out=t1)
+            t1 *= _SQRT1_2
+
+        elif isinstance(g, gates.Y):
+            t0, t1 = tensor[at(0)], tensor[at(1)]
+            a = t0.copy()
+            np.multiply(t1, -1j, out=t0)
+            np.multiply(a, 1j, out=t1)
+
+        else:
+            raise GateNotSimulableException(g)
+
+    def probabilities(
+        self,
+        qc: QCircuit,
+        to_measure: List[Union[int, str]] = [],
+        initialize: List[bool] = [],
+    ):
+        """Return the probability of every outcome of the measure of to_measure (all the
+        qubits if empty); the qubit to_measure[i] is the bit i of the outcome"""
+        import numpy as np
+
+        probs = np.abs(self.statevector(qc, initialize)) ** 2
+        if len(to_measure) == 0:
+            return probs
+
+        n = qc.num_qubits
+        axes = [n - 1 - qc[q] for q in reversed(to_measure)]
+        kept = sorted(axes)
+        marginal = probs.reshape((2,) * n).sum(
+            axis=tuple(a for a in range(n) if a not in kept)
+        )
+        return marginal.transpose([kept.index(a) for a in axes]).reshape(-1)
+
+    def sample(
+        self,
+        qc: QCircuit,
+        shots: int = 1024,
+        to_measure: List[Union[int, str]] = [],
+        initialize: List[bool] = [],
+        seed: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """Simulate the circuit and sample the measure of to_measure (all the qubits if
+        empty) shots times; returns the counts of every outcome, as bit strings with
+        the first measured qubit on the right (as qiskit counts)"""
+        import numpy as np
+
+        probs = self.probabilities(qc, to_measure, initialize)
+        n_bits = len(probs).bit_length() - 1
+
+        counts = np.random.default_rng(seed).multinomial(shots, probs / probs.sum())
+        return {
+            format(i, f"0{n_bits}b"): int(counts[i]) for i in np.flatnonzero(counts)
+        }
@@ -16,7 +16,7 @@ import ast
 import copy
 import inspect
 from functools import partial, reduce
-from typing import Any, Callable, Dict, List, Tuple, Union, get_args  # noqa: F401
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, get_args  # noqa: F401
 
 from sympy import Symbol
 
@@ -24,9 +24,12 @@ from .ast2ast import ast2ast
 from .ast2logic import Arg, Args, BoolExpList, LogicFun, flatten, translate_ast
 from .boolopt import BoolOptimizerProfile, defaultOptimizer
 from .boolopt.bool_optimizer import merge_expressions
+from .boolopt.booldag import BoolDAG, BoolDAGException
 from .boolquant import Q  # noqa: F403, F401
 from .bqm import BQMFormat, to_bqm
-from .compiler import SupportedCompiler, to_quantum
+from .cache import CompilationCache, get_cache
+from .compile_stats import CompileStats, get_compile_stats
+from .compiler import AncillaStrategy, SupportedCompiler, to_quantum
 from .qcircuit import QCircuitWrapper
 from .types import *  # noqa: F403, F401
 from .types import Qtype, format_outcome, interpret_as_qtype, type_repr
@@ -132,6 +135,7 @@ class QlassF(QCircuitWrapper):
     args: Args
     returns: Arg
     expressions: BoolExpList
+    compile_stats: CompileStats
 
     def __init__(
         self,
@@ -146,6 +150,7 @@ class QlassF(QCircuitWrapper):
         self.args = args
         self.returns = returns
         self.expressions = exps
+        self.compile_stats = CompileStats()
 
     def __repr__(self):
         ret_str = type_repr(self.returns.ttype)
@@ -211,8 +216,82 @@ class QlassF(QCircuitWrapper):
         )
         return header
 
+    def _truth_table_program(self):
+        """Return the dag program evaluating the output expressions and the list of
+        output nodes, or None if expressions are not representable in a BoolDAG"""
+        arg_bits = flatten(list(map(lambda a: a.bitvec, self.args)))
+        dag = BoolDAG()
+        try:
+            nodes = dag.from_exps(self.expressions)
+        except BoolDAGException:
+            return None
+
+        if not set(dag.vars.keys()).issubset(arg_bits):
+            return None
+
+        rets: Dict[str, int] = {}
+        for s, n in nodes:
+            if s.name[0:4] == "_ret":
+                rets.pop(s.name, None)
+                rets[s.name] = n
+
+        return dag, dag.program(rets.values()), list(rets.values())
+
+    def truth_table_chunks(self, chunk_bits: Optional[int] = None):
+        """Returns a generator of (first row, packed outputs) chunks of the truth table,
+        evaluated bit-parallel using numpy; every chunk contains 2**chunk_bits rows
+        (default: all the rows). Packed outputs is a uint64 array (output_size, words)
+        where bit j of word w is the output value at row first_row + 64*w + j; a chunk
+        of less than 64 rows is a single word, whose bits past the chunk are 0.
+
+        Args:
+            chunk_bits (int, optional): log2 of the number of rows per chunk
+        """
+        import numpy as np
+
+        tt_program = self._truth_table_program()
+        if tt_program is None:
+            raise Exception("Expressions not supported by the packed truth table")
+
+        dag, _, rets = tt_program
+        arg_bits = flatten(list(map(lambda a: a.bitvec, self.args)))
+        columns = list(map(dag.var, arg_bits)) + rets
+        outputs = columns[-self.output_size :]
+
+        if chunk_bits is not None and chunk_bits < 0:
+            raise Exception(f"Invalid chunk_bits: {chunk_bits}")
+
+        rows = 2 ** len(arg_bits)
+        chunk_rows = min(rows, 2**chunk_bits) if chunk_bits is not None else rows
+        total_words = max(1, rows // 64)
+
+        if chunk_rows >= 64:
+            chunk_words = chunk_rows // 64
+            for w in range(0, total_words, chunk_words):
+                n_words = min(chunk_words, total_words - w)
+                yield w * 64, dag.evaluate_exhaustive(outputs, arg_bits, w, n_words)
+            return
+
+        # Split every word in chunks of chunk_rows bits
+        mask = np.uint64((1 << chunk_rows) - 1)
+        for w in range(total_words):
+            word = dag.evaluate_exhaustive(outputs, arg_bits, w, 1)
+            for j in range(0, min(rows, 64), chunk_rows):
+                yield w * 64 + j, (word >> np.uint64(j)) & mask
+
+    def truth_table_packed(self):
+        """Returns the outputs of the truth table as a packed uint64 numpy array
+        (output_size, words), where bit j of word w is the output value at row 64*w + j
+        """
+        import numpy as np
+
+        return np.concatenate(
+            list(map(lambda c: c[1], self.truth_table_chunks())), axis=1
+        )
+
     def truth_table(self, max=None) -> List[List[bool]]:
-        """Returns the truth table for the function using the sympy boolean for computing
+        """Returns the truth table for the function, evaluating the expressions as a BoolDAG
+        (or using the sympy boolean for computing, if not representable)
 
         Args:
             max (int, optional): if set, return max lines, randomly selected
@@ -226,12 +305,27 @@ class QlassF(QCircuitWrapper):
                 f"Max truth table size reached: {bits + self.output_size} > {MAX_TRUTH_TABLE_SIZE}"
             )
 
-        exps = merge_expressions(self.expressions)
+        tt_program = self._truth_table_program()
+        if tt_program is None:
+            exps = merge_expressions(self.expressions)
+        elif not max or max >= 2**bits:
+            try:
+                return self._truth_table_numpy()
+            except ImportError:
+                pass
 
         for i in range(0, 2**bits, int(2**bits / max) if max and max < 2**bits else 1):
             bin_str = bin(i)[2:]
             bin_str = "0" * (bits - len(bin_str)) + bin_str
             bin_arr = list(map(lambda c: c == "1", bin_str))
+
+            if tt_program is not None:
+                dag, program, rets = tt_program
+                val = dag.run(program, dict(zip(arg_bits, bin_arr)))
+                outs = (bin_arr + [val[r] for r in rets])[-self.output_size :]
+                truth.append(bin_arr + outs)
+                continue
+
             known = list(zip(arg_bits, bin_arr))
 
             for ename, exp in exps:
@@ -248,15 +342,37 @@ class QlassF(QCircuitWrapper):
 
         return truth
 
-    def compile(self, compiler: SupportedCompiler = "internal", uncompute: bool = True):
-        self._qcircuit = to_quantum(
-            name=self.name,
-            args=self.args,
-            returns=self.returns,
-            exprs=self.expressions,
-            compiler=compiler,
-            uncompute=uncompute,
-        )
+    def _truth_table_numpy(self) -> List[List[bool]]:
+        """Returns the full truth table evaluated bit-parallel"""
+        import numpy as np
+
+        bits = len(flatten(list(map(lambda a: a.bitvec, self.args))))
+        rows = 2**bits
+
+        packed = self.truth_table_packed().astype("<u8")
+        outs = np.unpackbits(packed.view(np.uint8), axis=1, bitorder="little")[:, :rows]
+        ins = (np.arange(rows)[:, None] >> np.arange(bits - 1, -1, -1)) & 1
+
+        return np.concatenate([ins, outs.T], axis=1).astype(bool).tolist()
+
+    def compile(
+        self,
+        compiler: SupportedCompiler = "internal",
+        uncompute: bool = True,
+        ancilla_strategy: Optional[AncillaStrategy] = None,
+    ):
+        with self.compile_stats.stage("compile") as st:
+            self._qcircuit = to_quantum(
+                name=self.name,
+                args=self.args,
+                returns=self.returns,
+                exprs=self.expressions,
+                compiler=compiler,
+                uncompute=uncompute,
+                ancilla_strategy=ancilla_strategy,
+            )
+            st.qubits = self._qcircuit.num_qubits
+            st.gates = self._qcircuit.num_gates
 
     def bind(self, **kwargs) -> "QlassF":
         """Returns a new QlassF with defined params"""
@@ -275,7 +391,7 @@ class QlassF(QCircuitWrapper):
         )
 
     @staticmethod
-    def from_function(
+    def from_function(  # noqa: C901
         f: Union[str, Callable],
         types: List[Qtype] = [],
         defs: List[LogicFun] = [],
@@ -283,6 +399,8 @@ class QlassF(QCircuitWrapper):
         compiler: SupportedCompiler = "internal",
         bool_optimizer: BoolOptimizerProfile = defaultOptimizer,
         uncompute: bool = True,
+        cache: Union[bool, CompilationCache] = False,
+        profile: Union[bool, CompileStats] = False,
     ) -> Union["QlassF", UnboundQlassf]:
         """Create a QlassF from a function or a string containing a function
 
@@ -292,31 +410,89 @@ class QlassF(QCircuitWrapper):
             defs (List[LogicFun]): list of LogicFun to inject
             to_compile (boolean, optional): if True, compile to quantum circuit (default: True)
             compiler (SupportedCompiler, optional): override default compiler (default: internal)
-            bool_optimizer (BoolOptimizerProfile, optional): override default optimizer
+            bool_optimizer (BoolOptimizerProfile, optional): override default optimizer;
+                steps skipped for exceeding the budget of the profile (see
+                BoolOptimizerProfile.with_budget) are listed in qf.compile_stats.skipped
                 (default: defaultOptimizer)
             uncompute (bool, optional): whenever uncompute input qubits during compilation
                 (default: True)
+            cache (Union[bool, CompilationCache], optional): if True (or a CompilationCache),
+                reuse optimized expressions and circuits from the on-disk cache
+                (default: False)
+            profile (Union[bool, CompileStats], optional): if True, also record peak
+                memory and sympy node count of every stage in qf.compile_stats; a
+                CompileStats can be passed to register callbacks (default: False)
         """
-        fun_ast = ast.parse(f if isinstance(f, str) else inspect.getsource(f))
+        stats = get_compile_stats(profile)
+        with stats.stage("parse"):
+            fun_ast = ast.parse(f if isinstance(f, str) else inspect.getsource(f))
         assert isinstance(fun_ast.body[0], ast.FunctionDef)
 
         if isinstance(f, str):
             exec(f, globals())
         original_f = eval(fun_ast.body[0].name) if isinstance(f, str) else f
 
-        def _do_translate(fun_ast, original_f):
+        qcache = get_cache(cache)
+
+        def _do_translate(fun_ast, original_f, qstats=None):
+            # Every bind of an unbound qlassf gets its own stats
+            qstats = stats.copy() if qstats is None else qstats
+
+            if qcache is not None:
+                ckey = qcache.key(
+                    fun_ast,
+                    types,
+                    defs,
+                    bool_optimizer,
+                    compiler,
+                    uncompute,
+                    to_compile,
+                )
+                entry = qcache.get(ckey)
+                if entry is not None:
+                    qf = QlassF(
+                        entry["name"],
+                        original_f,
+                        entry["args"],
+                        entry["returns"],
+                        entry["expressions"],
+                    )
+                    if entry["qcircuit"] is not None:
+                        qf._qcircuit = entry["qcircuit"]
+                    qf.compile_stats = qstats
+                    return qf
+
             # print(ast.dump(fun_ast, indent=4))
-            fun = ast2ast(fun_ast.body[0])
+            with qstats.stage("ast2ast"):
+                fun = ast2ast(fun_ast.body[0])
             # print(ast.dump(fun, indent=4))
-            fun_name, args, fun_ret, exps = translate_ast(fun, types, defs)
+            with qstats.stage("translate_ast"):
+                fun_name, args, fun_ret, exps = translate_ast(fun, types, defs)
+                qstats.set_expressions(exps)
 
-            exps = bool_optimizer.apply(exps)
+            with qstats.stage("optimize"):
+                exps = bool_optimizer.apply(exps, qstats)
+                qstats.set_expressions(exps)
 
             # Return the qlassf object
             qf = QlassF(fun_name, original_f, args, fun_ret, exps)
+            qf.compile_stats = qstats
 
             if to_compile:
                 qf.compile(compiler, uncompute=uncompute)
+
+            # Results of skipped steps depend on the machine load, so are not cached
+            if qcache is not None and not qstats.skipped:
+                qcache.put(
+                    ckey,
+                    {
+                        "name": fun_name,
+                        "args": args,
+                        "returns": fun_ret,
+                        "expressions": exps,
+                        "qcircuit": qf._qcircuit if to_compile else None,
+                    },
+                )
             return qf
 
         # If it has parameters return the unboundqlassf
@@ -333,7 +509,7 @@ class QlassF(QCircuitWrapper):
             return UnboundQlassf(fun_ast, _do_translate, params, original_f)
         else:
             # Else, return the translation
-            return _do_translate(fun_ast, original_f)
+            return _do_translate(fun_ast, original_f, stats)
 
 
 def qlassf(
@@ -344,6 +520,8 @@ def qlassf(
     compiler: SupportedCompiler = "internal",
     bool_optimizer: BoolOptimizerProfile = defaultOptimizer,
     uncompute: bool = True,
+    cache: Union[bool, CompilationCache] = False,
+    profile: Union[bool, CompileStats] = False,
 ) -> Union["QlassF", UnboundQlassf]:
     """Decorator / function creating a QlassF object
 
@@ -353,10 +531,16 @@ def qlassf(
         defs (List[Qlassf]): list of qlassf to inject
         to_compile (boolean, optional): if True, compile to quantum circuit (default: True)
         compiler (SupportedCompiler, optional): override default compiler (default: internal)
-        bool_optimizer (BoolOptimizerProfile, optional): override default optimizer
+        bool_optimizer (BoolOptimizerProfile, optional): override default optimizer;
+            steps skipped for exceeding the budget of the profile (see
+            BoolOptimizerProfile.with_budget) are listed in compile_stats.skipped
             (default: defaultOptimizer)
         uncompute (bool, optional): whenever uncompute input qubits during compilation
             (default: True)
+        cache (Union[bool, CompilationCache], optional): if True (or a CompilationCache),
+            reuse optimized expressions and circuits from the on-disk cache (default: False)
+        profile (Union[bool, CompileStats], optional): if True, also record peak memory
+            and sympy node count of every stage in compile_stats (default: False)
     """
     defs_fun = list(map(lambda q: q.to_logicfun(), defs))
 
@@ -368,6 +552,8 @@ def qlassf(
         compiler,
         uncompute=uncompute,
         bool_optimizer=bool_optimizer,
+        cache=cache,
+        profile=profile,
     )
 
 
@@ -378,10 +564,22 @@ def qlassfa(
     compiler: SupportedCompiler = "internal",
     bool_optimizer: BoolOptimizerProfile = defaultOptimizer,
     uncompute: bool = True,
+    cache: Union[bool, CompilationCache] = False,
+    profile: Union[bool, CompileStats] = False,
 ):
     """Decorator with parameters for qlassf"""
 
     def _inner(fun):
-        return qlassf(fun, types, defs, to_compile, compiler, bool_optimizer, uncompute)
+        return qlassf(
+            fun,
+            types,
+            defs,
+            to_compile,
+            compiler,
+            bool_optimizer,
+            uncompute,
+            cache,
+            profile,
+        )
 
     return _inner
@@ -0,0 +1,273 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ast
+import inspect
+import textwrap
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .. import boolopt, types
+from ..ast2logic import LogicFun
+from ..qlassfun import QlassF
+
+BatchResult = Dict[str, Any]
+BatchJob = Tuple[str, str, Dict[str, Any], List[str]]
+"""A job is a tuple (name, function source, qlassf options, names of the defs)"""
+
+
+def _decorator_options(  # noqa: C901
+    deco: ast.expr,
+) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+    """Return the (options, defs) of a qlassf / qlassfa decorator, or None if deco is
+    not a qlassf decorator"""
+
+    def _name(e):
+        if isinstance(e, ast.Name):
+            return e.id
+        elif isinstance(e, ast.Attribute):
+            return e.attr
+        return None
+
+    if _name(deco) == "qlassf":
+        return {}, []
+    elif not isinstance(deco, ast.Call) or _name(deco.func) != "qlassfa":
+        return None
+
+    opts: Dict[str, Any] = {}
+    deps: List[str] = []
+    for kw in deco.keywords:
+        if kw.arg == "defs" and isinstance(kw.value, (ast.List, ast.Tuple)):
+            deps = [_name(e) for e in kw.value.elts]
+        elif kw.arg == "types" and isinstance(kw.value, (ast.List, ast.Tuple)):
+            opts["types"] = [_name(e) for e in kw.value.elts]
+        elif kw.arg == "bool_optimizer":
+            opts["bool_optimizer"] = _name(kw.value)
+        elif kw.arg in ["to_compile", "compiler", "uncompute", "cache"]:
+            opts[kw.arg] = ast.literal_eval(kw.value)
+        else:
+            raise Exception(
+                f"Unsupported qlassfa argument for batch compilation: {kw.arg}"
+            )
+
+    if None in deps or None in opts.get("types", []):
+        raise Exception("defs and types of qlassfa should be plain names")
+    return opts, deps
+
+
+def find_jobs(scode: str) -> List[BatchJob]:
+    """Given a string `scode` containing a script with qlassf definitions, returns the
+    list of compilation jobs, without executing the script"""
+    jobs: List[BatchJob] = []
+    for node in ast.parse(scode).body:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+
+        for deco in node.decorator_list:
+            res = _decorator_options(deco)
+            if res is not None:
+                src = ast.get_source_segment(scode, node) or ""
+                jobs.append((node.name, src, res[0], res[1]))
+                break
+    return jobs
+
+
+def _empty_result(name: str) -> BatchResult:
+    return {
+        "name": name,
+        "expressions": None,
+        "circuit": None,
+        "num_qubits": None,
+        "num_gates": None,
+        "time": {},
+        "error": None,
+    }
+
+
+def _dependency_failed(name: str, dep: str) -> BatchResult:
+    res = _empty_result(name)
+    res["error"] = f"Dependency {dep} failed"
+    return res
+
+
+def _compile_job(
+    name: str,
+    src: str,
+    opts: Dict[str, Any],
+    defs: List[LogicFun],
+    qasm_version: int,
+) -> Tuple[BatchResult, Optional[LogicFun]]:
+    """Translate, optimize and compile a single function; runs in a worker process"""
+    from ..qcircuit import exporter_qasm
+
+    res = _empty_result(name)
+    t_start = time.perf_counter()
+    try:
+        qf = QlassF.from_function(
+            src,
+            types=[getattr(types, t) for t in opts.get("types", [])],
+            defs=defs,
+            to_compile=False,
+            bool_optimizer=getattr(
+                boolopt, opts.get("bool_optimizer") or "defaultOptimizer"
+            ),
+            cache=opts.get("cache", False),
+        )
+        if not isinstance(qf, QlassF):
+            raise Exception("Functions with parameters cannot be batch compiled")
+
+        t_translate = time.perf_counter()
+        res["time"]["translate"] = t_translate - t_start
+        res["expressions"] = [[str(s), str(e)] for s, e in qf.expressions]
+
+        if opts.get("to_compile", True):
+            qf.compile(opts.get("compiler", "internal"), opts.get("uncompute", True))
+            t_compile = time.perf_counter()
+            res["time"]["compile"] = t_compile - t_translate
+
+            qc = qf.circuit()
+            res["circuit"] = exporter_qasm.QasmExporter(version=qasm_version).export(
+                qc, mode="circuit"
+            )
+            res["num_qubits"] = qc.num_qubits
+            res["num_gates"] = qc.num_gates
+            res["time"]["export"] = time.perf_counter() - t_compile
+
+        logicfun: Optional[LogicFun] = qf.to_logicfun()
+    except Exception as e:
+        res["error"] = f"{e.__class__.__name__}: {e}"
+        logicfun = None
+
+    res["time"]["total"] = time.perf_counter() - t_start
+    return res, logicfun
+
+
+def compile_jobs(
+    jobs: List[BatchJob], max_workers: Optional[int] = None, qasm_version: int = 3
+) -> List[BatchResult]:
+    """Compile a list of jobs over a process pool; a job is submitted as soon as all
+    its defs are compiled. Results are returned in the same order of jobs.
+
+    Args:
+        jobs (List[BatchJob]): the jobs to compile
+        max_workers (int, optional): number of worker processes; if 1, compile in the
+            current process (default: number of cpus)
+        qasm_version (int, optional): qasm version of the serialized circuits (default: 3)
+    """
+    results: List[Optional[BatchResult]] = [None] * len(jobs)
+    logicfuns: Dict[str, Optional[LogicFun]] = {}
+    pending = list(range(len(jobs)))
+    running: Dict[Future, int] = {}
+
+    names = set(map(lambda j: j[0], jobs))
+    for name, _, _, deps in jobs:
+        if not names.issuperset(deps):
+            raise Exception(f"Unknown defs {set(deps) - names} for function {name}")
+
+    with (
+        ProcessPoolExecutor(max_workers=max_workers)
+        if max_workers != 1
+        else nullcontext()
+    ) as executor:
+        while pending or running:
+            ready = [i for i in pending if all(d in logicfuns for d in jobs[i][3])]
+            if not ready and not running:
+                raise Exception(
+                    f"Circular defs between functions: {[jobs[i][0] for i in pending]}"
+                )
+
+            for i in ready:
+                pending.remove(i)
+                name, src, opts, deps = jobs[i]
+                defs: List[Any] = [logicfuns[d] for d in deps]
+
+                if None in defs:
+                    results[i] = _dependency_failed(name, deps[defs.index(None)])
+                    logicfuns[name] = None
+                elif executor is None:
+                    results[i], logicfuns[name] = _compile_job(
+                        name, src, opts, defs, qasm_version
+                    )
+                else:
+                    running[
+                        executor.submit(
+                            _compile_job, name, src, opts, defs, qasm_version
+                        )
+                    ] = i
+
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    i = running.pop(fut)
+                    results[i], logicfuns[jobs[i][0]] = fut.result()
+
+    return results  # type: ignore
+
+
+def compile_batch(
+    functions: List[Union[str, Callable]],
+    max_workers: Optional[int] = None,
+    qasm_version: int = 3,
+    **options,
+) -> List[BatchResult]:
+    """Translate, optimize and compile independent functions in parallel
+
+    Args:
+        functions (List[Union[str, Callable]]): the functions, as str code or callable
+        max_workers (int, optional): number of worker processes (default: number of cpus)
+        qasm_version (int, optional): qasm version of the serialized circuits (default: 3)
+        options: qlassfa options applied to every function (to_compile, compiler,
+            uncompute, cache, bool_optimizer and types as names)
+
+    Returns:
+        List[BatchResult]: for every function, a dict with its name, expressions, circuit
+            (as qasm), num_qubits, num_gates, per-stage time and error
+    """
+    jobs: List[BatchJob] = []
+    for f in functions:
+        src = f if isinstance(f, str) else inspect.getsource(f)
+        fun_ast = ast.parse(textwrap.dedent(src))
+        assert isinstance(fun_ast.body[0], ast.FunctionDef)
+        fun_ast.body[0].decorator_list = []
+        jobs.append((fun_ast.body[0].name, ast.unparse(fun_ast), options, []))
+    return compile_jobs(jobs, max_workers=max_workers, qasm_version=qasm_version)
+
+
+def compile_str_batch(
+    scode: str,
+    max_workers: Optional[int] = None,
+    qasm_version: int = 3,
+    **options,
+) -> List[BatchResult]:
+    """Compile all the qlassf functions of the script `scode` in parallel, without
+    executing it; results follow the definition order. `options` are used as defaults
+    for the options not specified in the decorators"""
+    jobs = [
+        (name, src, {**options, **opts}, deps)
+        for name, src, opts, deps in find_jobs(scode)
+    ]
+    return compile_jobs(jobs, max_workers=max_workers, qasm_version=qasm_version)
+
+
+def compile_file_batch(
+    fpath: str,
+    max_workers: Optional[int] = None,
+    qasm_version: int = 3,
+    **options,
+) -> List[BatchResult]:
+    """Same as compile_str_batch, but works with a filepath"""
+    with open(fpath, "r") as f:
+        return compile_str_batch(f.read(), max_workers, qasm_version, **options)
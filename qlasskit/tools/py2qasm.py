@@ -15,11 +15,14 @@
 # limitations under the License.
 
 import argparse
+import io
+import json
 import sys
 
 import qlasskit
 from qlasskit.qcircuit import exporter_qasm
 from qlasskit.qlassfun import QlassF
+from qlasskit.tools.batch import compile_str_batch
 from qlasskit.tools.utils import parse_str
 
 from .tools import find_last_qlassf
@@ -33,10 +36,22 @@ def read_input(input_file):
 
 
 def convert_to_quasm(qlassf: QlassF, compiler="internal", version=3):
+    out = io.StringIO()
+    stream_to_quasm(qlassf, out, compiler=compiler, version=version)
+    return out.getvalue()
+
+
+def stream_to_quasm(qlassf: QlassF, output_file, compiler="internal", version=3):
+    """Compile qlassf and write the qasm program incrementally to output_file (a path,
+    a text file object, or "-" for stdout)"""
     qlassf.compile(compiler=compiler)
     qcirc = qlassf.circuit()
     exporter = exporter_qasm.QasmExporter(version=version)
-    return exporter.export(qcirc, mode="circuit")
+    if output_file == "-":
+        exporter.export_to(qcirc, sys.stdout, mode="circuit")
+        sys.stdout.write("\n")
+    else:
+        exporter.export_to(qcirc, output_file, mode="circuit")
 
 
 def output_result(result, output_file):
@@ -56,7 +71,10 @@ def main():
     )
     parser.add_argument("-e", "--entrypoint", help="Entrypoint function name")
     parser.add_argument(
-        "-o", "--output", default="-", help="Output file (default: stdout)"
+        "-o",
+        "--output",
+        default="-",
+        help="Output file, gzipped if ending with .gz (default: stdout)",
     )
     parser.add_argument(
         "-c",
@@ -72,6 +90,20 @@ def main():
         default="3.0",
         help="QASM version (default: 3.0)",
     )
+    parser.add_argument(
+        "-a",
+        "--all",
+        action="store_true",
+        help="Compile all the qlassf functions in parallel, and output a json with "
+        "expressions, circuits and timings",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes for --all (default: number of cpus)",
+    )
     parser.add_argument(
         "-v", "--version", action="version", version=f"qlasskit {qlasskit.__version__}"
     )
@@ -79,6 +111,16 @@ def main():
     args = parser.parse_args()
 
     script = read_input(args.input_file)
+    compiler = args.compiler
+    version = 3 if args.qasm_version == "3.0" else 2
+
+    if args.all:
+        results = compile_str_batch(
+            script, max_workers=args.jobs, qasm_version=version, compiler=compiler
+        )
+        output_result(json.dumps(results, indent=2), args.output)
+        return
+
     qlassf_list = parse_str(script)
 
     if args.entrypoint:
@@ -86,12 +128,8 @@ def main():
     else:
         qlassf = find_last_qlassf(qlassf_list)
 
-    compiler = args.compiler
-    version = 3 if args.qasm_version == "3.0" else 2
-
     if qlassf:
-        bool_expr = convert_to_quasm(qlassf, compiler=compiler, version=version)
-        output_result(bool_expr, args.output)
+        stream_to_quasm(qlassf, args.output, compiler=compiler, version=version)
     else:
         print("No qlassf function found", file=sys.stderr)
 
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+# Copyright 2023-2025 Davide Gessa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import time
+
+import qlasskit
+from qlasskit.cache import CompilationCache
+
+
+def print_info(cache: CompilationCache):
+    entries = cache.entries()
+    print(f"path: {cache.path}")
+    print(f"entries: {len(entries)}")
+    print(f"size: {sum(map(lambda e: e[1], entries))} bytes")
+    print(f"max size: {cache.max_size} bytes")
+
+
+def print_list(cache: CompilationCache):
+    for key, size, atime in reversed(cache.entries()):
+        print(
+            f"{key}\t{size}\t{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(atime))}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect and purge the qlassf compilation cache."
+    )
+    parser.add_argument(
+        "-d",
+        "--cache-dir",
+        default=None,
+        help="Cache directory (default: ~/.cache/qlasskit)",
+    )
+    parser.add_argument(
+        "-v", "--version", action="version", version=f"qlasskit {qlasskit.__version__}"
+    )
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("info", help="Show cache location and usage (default)")
+    sub.add_parser("list", help="List cache entries, most recently used first")
+    purge = sub.add_parser("purge", help="Remove cache entries")
+    purge.add_argument(
+        "--older-than",
+        type=float,
+        default=None,
+        help="Only remove entries not accessed in the last N days",
+    )
+    purge.add_argument("key", nargs="*", help="Only remove the given entries")
+
+    args = parser.parse_args()
+    cache = CompilationCache(args.cache_dir)
+
+    if args.command == "list":
+        print_list(cache)
+    elif args.command == "purge":
+        if args.key:
+            removed = len(list(filter(cache.remove, args.key)))
+        else:
+            older_than = (
+                args.older_than * 86400 if args.older_than is not None else None
+            )
+            removed = cache.purge(older_than=older_than)
+        print(f"Removed {removed} entries")
+    else:
+        print_info(cache)
+
+
+if __name__ == "__main__":
+    main()
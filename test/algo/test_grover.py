@@ -16,6 +16,7 @@ import unittest
 
 from qlasskit import Qint2, qlassf
 from qlasskit.algorithms import Grover
+from qlasskit.qcircuit import StatevectorSim
 
 from ..utils import qiskit_measure_and_count
 
@@ -106,3 +107,62 @@ def subset_sum(ii: Tuple[Qint[2], Qint[2]]) -> Qint[2]:
         self.assertEqual((1, 2) in counts_readable, True)
         self.assertEqual(counts_readable[(1, 2)] > 300, True)
         self.assertEqual(counts_readable[(2, 1)] > 300, True)
+
+    def test_grover_subcircuits(self):
+        f = """
+def hash(k: Qint[4]) -> bool:
+    h = True
+    for i in range(4):
+        h = h and k[i]
+    return h
+"""
+        qf = qlassf(f)
+        algo = Grover(qf, True, subcircuits=True)
+        self.assertEqual(algo.circuit().num_gates, Grover(qf, True).circuit().num_gates)
+        self.assertFalse(algo.circuit().gates.materialized)
+        self.assertFalse(Grover(qf, True).circuit().gates.materialized)
+
+        qc = algo.circuit().export("circuit", "qiskit")
+        counts = qiskit_measure_and_count(qc, shots=1024)
+        counts_readable = algo.decode_counts(counts)
+
+        self.assertEqual(counts_readable[15] > 600, True)
+
+    def test_grover_sample(self):
+        f = """
+def hash(k: Qint[4]) -> bool:
+    h = False
+    for i in [7]:
+        if i == k:
+            h = True
+    return h
+"""
+        qf = qlassf(f)
+        algo = Grover(qf, True)
+
+        counts_readable = algo.sample(shots=1024, seed=1)
+        self.assertEqual(sum(counts_readable.values()), 1024)
+        self.assertEqual(counts_readable[7] > 600, True)
+
+    def test_grover_success_probabilities(self):
+        f = """
+def hash(k: Qint[4]) -> bool:
+    return k == 7 or k == 3 or k == 12
+"""
+        qf = qlassf(f)
+        curve = Grover(qf, n_matching=3).success_probabilities()
+        self.assertEqual(len(curve), 2 * 2 + 1)
+        self.assertAlmostEqual(curve[0], 3 / 16)
+
+        for k in range(1, len(curve)):
+            algo = Grover(qf, n_iterations=k)
+            probs = StatevectorSim().probabilities(algo.circuit(), algo.output_qubits)
+            self.assertAlmostEqual(curve[k], probs[[3, 7, 12]].sum())
+
+    def test_grover_success_probabilities_element(self):
+        qf = qlassf("def f(a: Qint2) -> Qint2:\n\treturn a + 1")
+        algo = Grover(qf, Qint2(3))
+        curve = algo.success_probabilities(3)
+
+        probs = StatevectorSim().probabilities(algo.circuit(), algo.output_qubits)
+        self.assertAlmostEqual(curve[algo.n_iterations], probs[2])
@@ -17,6 +17,7 @@ import unittest
 from parameterized import parameterized_class
 
 from qlasskit import qlassf
+from qlasskit.ast2logic.env import _bind_logicfun
 
 from ..utils import COMPILATION_ENABLED, ENABLED_COMPILERS, compute_and_compare_results
 
@@ -63,6 +64,18 @@ class TestQlassfFunctionDef(unittest.TestCase):
         compute_and_compare_results(self, qf)
         compute_and_compare_results(self, qg, test_original_f=False)
 
+    def test_pass_function_to_many(self):
+        f = "def neg(b: Qint2) -> Qint2:\n\treturn b + 1"
+        qf = qlassf(f, to_compile=COMPILATION_ENABLED, compiler=self.compiler)
+
+        hits = _bind_logicfun.cache_info().hits
+        for op in ["+", "-", "^"]:
+            g = f"def test(a: Qint2, b: Qint2) -> Qint2:\n\treturn neg(a) {op} neg(b)"
+            qg = qlassf(g, to_compile=COMPILATION_ENABLED, defs=[qf])
+            compute_and_compare_results(self, qg, test_original_f=False)
+
+        self.assertGreaterEqual(_bind_logicfun.cache_info().hits - hits, 2)
+
     def test_inner_function1(self):
         f = """def test(a: bool) -> bool:
     def test2(b:bool) -> bool:
@@ -185,3 +185,64 @@ class TestQlassfTruthTable(unittest.TestCase):
         f = "def test(a: Qint12) -> Qint12:\n\treturn a"
         qf = qlassf(f, to_compile=False)
         self.assertRaises(Exception, lambda: qf.truth_table())
+
+    def test_packed_truth(self):
+        f = "def test(a: Qint4, b: Qint2) -> Qint4:\n\treturn a + b"
+        qf = qlassf(f, to_compile=False)
+        tt = qf.truth_table()
+        packed = qf.truth_table_packed()
+        self.assertEqual(packed.shape, (4, 1))
+
+        for i, line in enumerate(tt):
+            outs = [bool((int(w[0]) >> i) & 1) for w in packed]
+            self.assertEqual(line[-4:], outs)
+
+        self.assertEqual(tt, qf.truth_table(max=2**6))
+
+    def test_packed_truth_chunks(self):
+        f = "def test(a: Qint8, b: Qint8) -> Qint8:\n\treturn a ^ b"
+        qf = qlassf(f, to_compile=False)
+        chunks = list(qf.truth_table_chunks(chunk_bits=12))
+        self.assertEqual(len(chunks), 16)
+        self.assertEqual(chunks[1][0], 2**12)
+
+        packed = qf.truth_table_packed()
+        for first_row, chunk in chunks:
+            w = first_row // 64
+            self.assertTrue((packed[:, w : w + chunk.shape[1]] == chunk).all())
+
+    def test_packed_truth_small_chunks(self):
+        f = "def test(a: Qint4, b: Qint4) -> Qint4:\n\treturn a + b"
+        qf = qlassf(f, to_compile=False)
+        tt = qf.truth_table()
+
+        for chunk_bits in [0, 2, 5]:
+            chunks = list(qf.truth_table_chunks(chunk_bits=chunk_bits))
+            self.assertEqual(len(chunks), 2 ** (8 - chunk_bits))
+
+            for k, (first_row, chunk) in enumerate(chunks):
+                self.assertEqual(first_row, k * 2**chunk_bits)
+                self.assertEqual(chunk.shape, (4, 1))
+                self.assertTrue((chunk >> 2**chunk_bits == 0).all())
+                for j in range(2**chunk_bits):
+                    outs = [bool((int(w[0]) >> j) & 1) for w in chunk]
+                    self.assertEqual(tt[first_row + j][-4:], outs)
+
+        # The chunks never run past the input space
+        qf = qlassf("def test(a: Qint2) -> Qint2:\n\treturn a + 1", to_compile=False)
+        chunks = list(qf.truth_table_chunks(chunk_bits=1))
+        self.assertEqual([c[0] for c in chunks], [0, 2])
+        chunks = list(qf.truth_table_chunks(chunk_bits=8))
+        self.assertEqual(len(chunks), 1)
+
+    def test_packed_truth_24bits(self):
+        f = "def test(a: Qint12, b: Qint12) -> Qint12:\n\treturn a + b"
+        qf = qlassf(f, to_compile=False)
+        packed = qf.truth_table_packed()
+        self.assertEqual(packed.shape, (12, 2**24 // 64))
+
+        for a, b in [(0, 0), (1, 4095), (1234, 2345), (4095, 4095)]:
+            # Args bits are little endian, and the first arg bit is the row msb
+            row = int(format(a, "012b")[::-1] + format(b, "012b")[::-1], 2)
+            res = [(int(w[row // 64]) >> (row % 64)) & 1 for w in packed]
+            self.assertEqual(int("".join(map(str, res[::-1])), 2), (a + b) % 4096)
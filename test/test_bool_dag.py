@@ -0,0 +1,121 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import unittest
+
+from sympy import Symbol, symbols
+from sympy.logic import ITE, And, Implies, Not, Or, Xor
+from sympy.logic.boolalg import false, true
+
+from qlasskit import qlassf
+from qlasskit.boolopt.booldag import OP_AND, OP_NOT, OP_XOR, BoolDAG, BoolDAGException
+from qlasskit.boolquant import Q
+
+a, b, c, d = symbols("a,b,c,d")
+
+
+def equivalent(e1, e2, syms):
+    for vals in itertools.product([False, True], repeat=len(syms)):
+        m = dict(zip(syms, vals))
+        if bool(e1.xreplace(m)) != bool(e2.xreplace(m)):
+            return False
+    return True
+
+
+class TestBoolDAG(unittest.TestCase):
+    def test_hash_consing(self):
+        dag = BoolDAG()
+        n1 = dag.from_sympy(And(a, Or(b, c)))
+        n2 = dag.from_sympy(And(Or(c, b), a))
+        self.assertEqual(n1, n2)
+        self.assertEqual(dag.count([n1]), 5)
+
+    def test_local_simplification(self):
+        dag = BoolDAG()
+        va, vb = dag.var("a"), dag.var("b")
+        self.assertEqual(dag.not_(dag.not_(va)), va)
+        self.assertEqual(dag.and_([va, dag.not_(va)]), dag.false)
+        self.assertEqual(dag.or_([va, dag.not_(va)]), dag.true)
+        self.assertEqual(dag.and_([va, va, dag.true]), va)
+        self.assertEqual(dag.xor([va, vb, va]), vb)
+        self.assertEqual(dag.xor([va, dag.not_(vb)]), dag.not_(dag.xor([va, vb])))
+        self.assertEqual(dag.ops[dag.and_([va, dag.and_([vb, va])])], OP_AND)
+        self.assertEqual(dag.args(dag.and_([va, dag.and_([vb, va])])), (va, vb))
+
+    def test_node_view(self):
+        dag = BoolDAG()
+        na, nb = dag.node(dag.var("a")), dag.node(dag.var("b"))
+        n = (na & nb) ^ ~na
+        self.assertEqual(n.op, OP_NOT)
+        self.assertEqual(n.args[0].op, OP_XOR)
+        self.assertEqual(repr(~na), "not(a)")
+        self.assertEqual(na.name, "a")
+
+    def test_sympy_roundtrip(self):
+        for e in [
+            And(a, Not(b), Or(c, d)),
+            Xor(a, Not(b), c),
+            ITE(a, b, c),
+            Implies(a, Xor(b, d)),
+            Or(And(a, b), And(Not(a), c), d),
+            true,
+            false,
+        ]:
+            dag = BoolDAG()
+            r = dag.to_sympy(dag.from_sympy(e))
+            self.assertTrue(equivalent(e, r, [a, b, c, d]), e)
+
+    def test_unsupported(self):
+        dag = BoolDAG()
+        self.assertRaises(BoolDAGException, lambda: dag.from_sympy(Q.H(a)))
+
+    def test_from_exps(self):
+        _t, _ret = Symbol("_t"), Symbol("_ret")
+        exps = [(_t, And(a, b)), (a, Not(a)), (_ret, Xor(_t, a))]
+
+        dag = BoolDAG()
+        nodes = dag.from_exps(exps)
+        self.assertEqual(set(dag.vars.keys()), {"a", "b"})
+        self.assertTrue(
+            equivalent(dag.to_exps(nodes)[-1][1], Xor(And(a, b), Not(a)), [a, b, c, d])
+        )
+
+    def test_evaluate_bitparallel(self):
+        e = Or(And(a, Not(b)), Xor(b, c))
+        dag = BoolDAG()
+        n = dag.from_sympy(e)
+
+        rows = list(itertools.product([False, True], repeat=3))
+        words = {
+            s: sum(1 << i for i, r in enumerate(rows) if r[j])
+            for j, s in enumerate(["a", "b", "c"])
+        }
+        (res,) = dag.evaluate([n], words, ones=(1 << len(rows)) - 1)
+
+        for i, r in enumerate(rows):
+            self.assertEqual(
+                bool((res >> i) & 1),
+                bool(e.xreplace(dict(zip([a, b, c], r)))),
+            )
+
+    def test_truth_table_via_dag(self):
+        qf = qlassf(
+            "def test(a: Qint2, b: Qint2) -> Qint2:\n\treturn a + b", to_compile=False
+        )
+        self.assertIsNotNone(qf._truth_table_program())
+        for line in qf.truth_table():
+            x = line[0] + 2 * line[1]
+            y = line[2] + 2 * line[3]
+            self.assertEqual(line[4] + 2 * line[5], (x + y) % 4)
@@ -12,5 +12,333 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-# import unittest
-# from qlasskit.boolopt import bool_optimizer
+import pickle
+import signal
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from sympy import Basic, Symbol, symbols
+from sympy.logic import ITE, And, Not, Or, Xor
+
+from qlasskit import CompileStats, SkippedStep, qlassf
+from qlasskit.boolopt import BoolOptimizerProfile, SympyTransformer, defaultOptimizer
+from qlasskit.boolopt.bool_optimizer import _Packed, apply_cse, merge_expressions
+from qlasskit.boolopt.budget import (
+    Budget,
+    BudgetGuard,
+    check_deadline,
+    exceeds_nodes,
+    run_with_timeout,
+)
+from qlasskit.boolopt.exp_transformers import remove_ITE, transform_or2and
+
+from .utils import compute_and_compare_results
+
+a, b, c, _ret = symbols("a,b,c,_ret")
+
+f_src = (
+    "def test_budget(a: Qint4, b: Qint4) -> Qint4:\n\treturn a + b if a > b else a - b"
+)
+
+
+def busy(seconds, cooperative=True):
+    t = time.perf_counter()
+    while time.perf_counter() - t < seconds:
+        if cooperative:
+            check_deadline()
+    return True
+
+
+def slow_step(exps):
+    busy(10)
+    return []
+
+
+class count_visits(SympyTransformer):
+    def __init__(self):
+        self.count = 0
+
+    def dispatch(self, e):
+        self.count += 1
+        return super().dispatch(e)
+
+
+def shared_chain(n):
+    """Return an expression of n levels, each using the previous one twice"""
+    x = a
+    for i in range(n):
+        x = Xor(And(x, Symbol(f"b{i}")), Or(x, Symbol(f"c{i}")))
+    return x
+
+
+class TestSympyTransformer(unittest.TestCase):
+    def test_shared_subtrees(self):
+        opt = count_visits()
+        self.assertEqual(opt.visit(shared_chain(10)), shared_chain(10))
+        self.assertEqual(opt.count, 10 * 3)
+
+    def test_pass(self):
+        opt = count_visits()
+        exps = [(_ret, shared_chain(8)), (c, Not(shared_chain(8)))]
+        BoolOptimizerProfile.apply_step(opt, exps)
+        self.assertEqual(opt.count, 8 * 3 + 1)
+
+        opt.count = 0
+        opt.visit(shared_chain(8))
+        self.assertEqual(opt.count, 8 * 3)
+
+    def test_unchanged(self):
+        e = And(Not(a), Or(b, c))
+        self.assertIs(SympyTransformer().visit(e), e)
+
+        res = transform_or2and().visit(Xor(Or(a, b, c), And(b, Or(a, b, c))))
+        t = Not(And(Not(a), Not(b), Not(c)))
+        self.assertEqual(res, Xor(t, And(b, t)))
+
+    def test_threads(self):
+        # A pass is local to its thread, even when the transformer is shared
+        opt = count_visits()
+        with opt.memo(), ThreadPoolExecutor(1) as executor:
+            self.assertEqual(opt._memo, {})
+            self.assertIsNone(executor.submit(lambda: opt._memo).result())
+            e = shared_chain(4)
+            self.assertEqual(executor.submit(opt.visit, e).result(), e)
+            self.assertEqual(opt._memo, {})
+            self.assertEqual(opt.visit(e), e)
+            self.assertEqual(opt.count, 2 * 4 * 3)
+
+    def test_threads_profile(self):
+        srcs = [f_src, "def f(a: Qint4, b: Qint4) -> bool:\n\treturn a > b and a != 3"]
+        raw = BoolOptimizerProfile([])
+        exps = [
+            qlassf(s, to_compile=False, bool_optimizer=raw).expressions
+            for s in srcs * 2
+        ]
+        with ThreadPoolExecutor(4) as executor:
+            res = list(executor.map(defaultOptimizer.apply, exps))
+        self.assertEqual(res, [defaultOptimizer.apply(e) for e in exps])
+
+
+class TestBudget(unittest.TestCase):
+    def test_run_with_timeout(self):
+        self.assertEqual(run_with_timeout(lambda: 42, None), (True, 42))
+        self.assertEqual(run_with_timeout(lambda: 42, 1), (True, 42))
+
+        t = time.perf_counter()
+        self.assertEqual(run_with_timeout(lambda: busy(10), 0.05), (False, None))
+        self.assertLess(time.perf_counter() - t, 5)
+
+    def test_run_with_timeout_not_cooperative(self):
+        # Without checks f runs to the end, then its result is discarded
+        t = time.perf_counter()
+        f = lambda: busy(0.2, cooperative=False)  # noqa: E731
+        self.assertEqual(run_with_timeout(f, 0.05), (False, None))
+        self.assertGreaterEqual(time.perf_counter() - t, 0.2)
+
+    def test_run_with_timeout_signals(self):
+        # The timers and the signal handlers of the caller are left alone
+        def handler(*_):
+            pass
+
+        prev = signal.signal(signal.SIGALRM, handler)
+        signal.setitimer(signal.ITIMER_REAL, 100)
+        try:
+            run_with_timeout(lambda: busy(10), 0.05)
+            self.assertGreater(signal.getitimer(signal.ITIMER_REAL)[0], 90)
+            self.assertIs(signal.getsignal(signal.SIGALRM), handler)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, prev)
+
+    def test_run_with_timeout_visit(self):
+        opt = count_visits()
+        self.assertEqual(
+            run_with_timeout(lambda: opt.visit(shared_chain(3)), 0), (False, None)
+        )
+        self.assertEqual(opt.count, 0)
+        self.assertIsNone(opt._memo)
+
+    def test_run_with_timeout_nested(self):
+        def inner():
+            return run_with_timeout(lambda: busy(10), 0.05)
+
+        self.assertEqual(run_with_timeout(inner, 5), (True, (False, None)))
+        self.assertEqual(
+            run_with_timeout(lambda: run_with_timeout(lambda: busy(10), 5), 0.05),
+            (False, None),
+        )
+
+    def test_exceeds_nodes(self):
+        exps = [(_ret, And(a, Or(b, c)))]
+        self.assertFalse(exceeds_nodes(exps, None))
+        self.assertFalse(exceeds_nodes(exps, 5))
+        self.assertTrue(exceeds_nodes(exps, 4))
+
+    def test_step_time(self):
+        stats = CompileStats()
+        exps = [(_ret, And(a, Not(Not(b))))]
+        opt = BoolOptimizerProfile([slow_step], Budget(step_time=0.05))
+
+        self.assertEqual(opt.apply(exps, stats), exps)
+        self.assertEqual(stats.skipped, [SkippedStep("opt:0:slow_step", "time")])
+
+    def test_exp_nodes(self):
+        stats = CompileStats()
+        exps = [(a, Or(b, c)), (_ret, And(a, Not(Not(b))))]
+        opt = defaultOptimizer.with_budget(exp_nodes=3)
+
+        self.assertEqual(opt.apply(exps, stats), [(_ret, And(b, Or(b, c)))])
+        self.assertIn(
+            SkippedStep("opt:0:merge_expressions", "nodes", "_ret"), stats.skipped
+        )
+        self.assertTrue(all(sk.symbol == "_ret" for sk in stats.skipped))
+
+    def test_merge_skipped(self):
+        t0, t1 = symbols("t0,t1")
+        exps = [(t0, And(a, b)), (t1, Or(t0, c)), (_ret, And(t1, Not(t0)))]
+        m0, m1 = symbols("m0,m1")
+
+        res = merge_expressions(exps, lambda s, f, e: None)
+        self.assertEqual(
+            res, [(m0, And(a, b)), (m1, Or(m0, c)), (_ret, And(m1, Not(m0)))]
+        )
+
+        res = merge_expressions(exps, lambda s, f, e: None if s == t1 else f(e))
+        self.assertEqual(res, [(m0, Or(c, And(a, b))), (_ret, And(m0, Not(And(a, b))))])
+
+    def test_apply_cse_order(self):
+        m0, r0, r1 = symbols("m0,_ret.0,_ret.1")
+        exps = [(m0, And(a, b)), (r0, Xor(And(m0, c), a)), (r1, Xor(And(m0, c), b))]
+        res = apply_cse(exps)
+        self.assertEqual(res[0], (m0, And(a, b)))
+        self.assertEqual(res[1][1], And(m0, c))
+        self.assertEqual(res[2:], [(r0, Xor(res[1][0], a)), (r1, Xor(res[1][0], b))])
+
+    def test_not_skippable(self):
+        exps = [(_ret, ITE(a, b, c))]
+        opt = BoolOptimizerProfile([remove_ITE()], Budget(step_nodes=0))
+        self.assertEqual(opt.apply(exps), [(_ret, Or(And(a, b), And(Not(a), c)))])
+
+    def test_qlassf(self):
+        qf = qlassf(f_src, bool_optimizer=defaultOptimizer.with_budget(exp_nodes=20))
+        ref = qlassf(f_src, to_compile=False)
+
+        self.assertGreater(len(qf.compile_stats.skipped), 0)
+        self.assertIn("skipped", qf.compile_stats.to_dict())
+        self.assertEqual(qf.truth_table(), ref.truth_table())
+        compute_and_compare_results(self, qf)
+
+        qf = qlassf(f_src, bool_optimizer=defaultOptimizer.with_budget(step_time=0))
+        self.assertEqual(qf.truth_table(), ref.truth_table())
+        compute_and_compare_results(self, qf)
+
+        qf = qlassf(f_src, bool_optimizer=defaultOptimizer.with_budget(exp_time=60))
+        self.assertEqual(qf.compile_stats.skipped, [])
+        self.assertEqual(qf.expressions, ref.expressions)
+
+    def test_qlassf_circuits(self):
+        # Whatever the budget skips, the compiler must get expressions it handles
+        srcs = [
+            "def f(a: Qint4, b: Qint4) -> bool:\n\treturn a > b and a != 3",
+            "def f(a: Qint4, b: Qint4) -> Qint4:\n\treturn (a - b) if a > b else (b ^ a)",
+        ]
+        budgets = [
+            {"step_nodes": 10},
+            {"exp_time": 1e-4},
+            {"step_time": 0},
+            {"exp_nodes": 5},
+        ]
+        for src in srcs:
+            for budget in budgets:
+                with self.subTest(src=src, budget=budget):
+                    opt = defaultOptimizer.with_budget(**budget)
+                    qf = qlassf(src, bool_optimizer=opt)
+                    compute_and_compare_results(self, qf, test_original_f=False)
+
+
+class TestParallel(unittest.TestCase):
+    def test_packed(self):
+        shared = Xor(a, And(b, c))
+        exps = [_ret, And(shared, Not(a)), Or(shared, ITE(a, b, c)), Xor(c, shared)]
+        res = pickle.loads(pickle.dumps(_Packed(exps))).exps
+        self.assertEqual(res, exps)
+        self.assertEqual([e.args for e in res], [e.args for e in exps])
+        x, y = [next(a for a in e.args if a == shared) for e in res[1:3]]
+        self.assertIs(x, y)
+
+    def test_packed_deep(self):
+        # Deeper than the recursion limit; Not(Not(e)) would evaluate to e
+        e = And(a, b)
+        for _ in range(5000):
+            e = Basic.__new__(Not, e)
+        res = pickle.loads(pickle.dumps(_Packed([e]))).exps[0]
+
+        depth = 0
+        while isinstance(res, Not):
+            res = res.args[0]
+            depth += 1
+        self.assertEqual(depth, 5000)
+        self.assertEqual(res, And(a, b))
+
+    def test_merge_order(self):
+        t0, t1, t2 = symbols("t0,t1,t2")
+        r0, r1 = symbols("_ret.0,_ret.1")
+        exps = [
+            (t0, And(a, b)),
+            (t1, Or(t0, c)),
+            (t0, Xor(t0, t1)),
+            (r0, And(t0, Not(t1))),
+            (t2, Or(a, c)),
+            (r1, Xor(t2, t0)),
+        ]
+        with ThreadPoolExecutor(2) as executor:
+            self.assertEqual(
+                merge_expressions(exps, executor=executor), merge_expressions(exps)
+            )
+
+            guard = BudgetGuard(Budget(exp_nodes=5))
+            res = merge_expressions(exps, guard, executor)
+            ref_guard = BudgetGuard(Budget(exp_nodes=5))
+            self.assertEqual(res, merge_expressions(exps, ref_guard))
+            self.assertEqual(guard.skipped, ref_guard.skipped)
+
+    def test_with_processes(self):
+        opt = defaultOptimizer.with_processes(2)
+        self.assertEqual(opt.processes, 2)
+        self.assertEqual(opt.steps, defaultOptimizer.steps)
+        self.assertIsNotNone(defaultOptimizer.with_processes().processes)
+        self.assertEqual(opt.with_budget(exp_nodes=20).processes, 2)
+        self.assertEqual(opt.parallel_nodes, defaultOptimizer.parallel_nodes)
+        self.assertEqual(
+            opt.with_processes(2, 5).with_budget(exp_nodes=20).parallel_nodes, 5
+        )
+
+    def test_executor_for(self):
+        exps = [(_ret, And(a, Or(b, c)))]
+        self.assertIsNone(defaultOptimizer.executor_for(exps))
+        self.assertIsNone(defaultOptimizer.with_processes(2, 5).executor_for(exps))
+
+        # Profiles with the same processes share a pool
+        pool = defaultOptimizer.with_processes(2, 4).executor_for(exps)
+        self.assertIsNotNone(pool)
+        self.assertIs(defaultOptimizer.with_processes(2, 0).executor_for(exps), pool)
+
+    def test_qlassf(self):
+        opt = defaultOptimizer.with_processes(2, parallel_nodes=0)
+        qf = qlassf(f_src, bool_optimizer=opt)
+        ref = qlassf(f_src)
+        self.assertEqual(qf.expressions, ref.expressions)
+        compute_and_compare_results(self, qf)
+
+    def test_qlassf_budget(self):
+        raw = BoolOptimizerProfile([])
+        exps = qlassf(f_src, to_compile=False, bool_optimizer=raw).expressions
+        stats = CompileStats()
+        opt = defaultOptimizer.with_budget(exp_nodes=20)
+        ref = opt.apply(exps, stats)
+
+        par_stats = CompileStats()
+        res = opt.with_processes(2, parallel_nodes=0).apply(exps, par_stats)
+        self.assertEqual(res, ref)
+        self.assertEqual(par_stats.skipped, stats.skipped)
@@ -0,0 +1,110 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from qlasskit import CompilationCache, boolopt, qlassf
+
+from .utils import compute_and_compare_results
+
+f_src = "def test(a: Qint2, b: Qint2) -> Qint2:\n\treturn a + b"
+
+
+class TestCompilationCache(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix="qlasskit_cache_")
+        self.cache = CompilationCache(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_hit(self):
+        qf = qlassf(f_src, cache=self.cache)
+        self.assertEqual(len(self.cache.entries()), 1)
+
+        qf2 = qlassf(f_src, cache=self.cache)
+        self.assertEqual(len(self.cache.entries()), 1)
+        self.assertEqual(qf.expressions, qf2.expressions)
+        self.assertEqual(qf.circuit().num_gates, qf2.circuit().num_gates)
+        self.assertEqual(qf.circuit().qubit_map, qf2.circuit().qubit_map)
+        compute_and_compare_results(self, qf2)
+
+    def test_key_normalized_source(self):
+        qlassf(f_src, cache=self.cache)
+        qlassf(
+            "def test(a: Qint2, b: Qint2) -> Qint2:\n\n\t# comment\n\treturn a  +  b",
+            cache=self.cache,
+        )
+        self.assertEqual(len(self.cache.entries()), 1)
+
+    def test_key_options(self):
+        qlassf(f_src, cache=self.cache)
+        qlassf(f_src, cache=self.cache, uncompute=False)
+        qlassf(f_src, cache=self.cache, bool_optimizer=boolopt.fastOptimizer)
+        qlassf(f_src, cache=self.cache, to_compile=False)
+        self.assertEqual(len(self.cache.entries()), 4)
+
+    def test_key_defs(self):
+        qf_a = qlassf("def g(a: bool) -> bool:\n\treturn not a", to_compile=False)
+        qf_b = qlassf("def g(a: bool) -> bool:\n\treturn a", to_compile=False)
+        f = "def test(a: bool) -> bool:\n\treturn g(a)"
+        r1 = qlassf(f, defs=[qf_a], cache=self.cache)
+        r2 = qlassf(f, defs=[qf_b], cache=self.cache)
+        self.assertEqual(len(self.cache.entries()), 2)
+        self.assertNotEqual(r1.expressions, r2.expressions)
+
+    def test_lru_eviction(self):
+        qlassf(f_src, cache=self.cache)
+        size = self.cache.size()
+        self.cache.max_size = size
+
+        qlassf("def test(a: Qint2) -> Qint2:\n\treturn a + 1", cache=self.cache)
+        self.assertEqual(len(self.cache.entries()), 1)
+        self.assertLessEqual(self.cache.size(), max(size, self.cache.entries()[0][1]))
+
+    def test_corrupted_entry(self):
+        qlassf(f_src, cache=self.cache)
+        key = self.cache.entries()[0][0]
+        with open(os.path.join(self.path, key + ".qfc"), "wb") as f:
+            f.write(b"garbage")
+
+        qf = qlassf(f_src, cache=self.cache)
+        compute_and_compare_results(self, qf)
+        self.assertEqual(len(self.cache.entries()), 1)
+
+    def test_purge(self):
+        qlassf(f_src, cache=self.cache)
+        self.assertEqual(self.cache.purge(older_than=3600), 0)
+        self.assertEqual(self.cache.purge(), 1)
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_cli(self):
+        qlassf(f_src, cache=self.cache)
+        cmd = ["python", "-m", "qlasskit.tools.qlasskit_cache", "-d", self.path]
+
+        res = subprocess.run(cmd + ["info"], capture_output=True, text=True, check=True)
+        self.assertIn("entries: 1", res.stdout)
+
+        res = subprocess.run(cmd + ["list"], capture_output=True, text=True, check=True)
+        self.assertIn(self.cache.entries()[0][0], res.stdout)
+
+        res = subprocess.run(
+            cmd + ["purge"], capture_output=True, text=True, check=True
+        )
+        self.assertIn("Removed 1 entries", res.stdout)
+        self.assertEqual(self.cache.entries(), [])
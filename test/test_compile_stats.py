@@ -0,0 +1,101 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import tempfile
+import unittest
+
+from qlasskit import CompileStats, boolopt, qlassf
+
+f_src = "def test(a: Qint2, b: Qint2) -> Qint2:\n\treturn a + b"
+
+STAGES = ["parse", "ast2ast", "translate_ast", "optimize", "compile"]
+
+
+class TestCompileStats(unittest.TestCase):
+    def test_stages(self):
+        qf = qlassf(f_src)
+        names = [st.name for st in qf.compile_stats]
+
+        for name in STAGES:
+            self.assertIn(name, names)
+        n_steps = len(boolopt.defaultOptimizer.steps)
+        self.assertEqual(len(names), len(STAGES) + n_steps)
+        self.assertEqual(names[4], "opt:0:merge_expressions")
+
+        for st in qf.compile_stats:
+            self.assertGreaterEqual(st.duration, 0)
+            self.assertIsNone(st.peak_memory)
+            self.assertIsNone(st.nodes)
+
+        self.assertEqual(qf.compile_stats["optimize"].expressions, len(qf.expressions))
+        self.assertGreater(qf.compile_stats.total_time, 0)
+
+        compile_st = qf.compile_stats["compile"]
+        self.assertEqual(compile_st.qubits, qf.circuit().num_qubits)
+        self.assertEqual(compile_st.gates, qf.circuit().num_gates)
+
+    def test_profile(self):
+        qf = qlassf(f_src, profile=True)
+
+        for name in ["translate_ast", "optimize", "opt:1:apply_cse"]:
+            st = qf.compile_stats[name]
+            self.assertGreater(st.peak_memory, 0)
+            self.assertGreater(st.nodes, 0)
+
+        opt = qf.compile_stats["optimize"]
+        for st in qf.compile_stats:
+            if st.category == "optimizer":
+                self.assertLessEqual(st.peak_memory, opt.peak_memory)
+                self.assertGreaterEqual(st.start, opt.start)
+
+    def test_callbacks(self):
+        events = []
+        stats = CompileStats(callbacks=[lambda e, st: events.append((e, st.name))])
+        qf = qlassf(f_src, profile=stats)
+
+        self.assertIs(qf.compile_stats, stats)
+        self.assertEqual(events[0], ("begin", "parse"))
+        self.assertEqual(events[-1], ("end", "compile"))
+        self.assertIn(("end", "opt:0:merge_expressions"), events)
+        self.assertEqual(len(events), 2 * len(stats))
+
+    def test_unbound(self):
+        qf = qlassf(
+            "def test(a: Qint2, b: Parameter[int]) -> Qint2:\n\treturn a + b",
+            profile=True,
+        )
+        qf1 = qf.bind(b=1)
+        qf2 = qf.bind(b=2)
+        self.assertIsNot(qf1.compile_stats, qf2.compile_stats)
+        self.assertEqual(len(qf1.compile_stats), len(qf2.compile_stats))
+        self.assertEqual(qf1.compile_stats.stages[0].name, "parse")
+
+    def test_export(self):
+        qf = qlassf(f_src, profile=True)
+        d = json.loads(qf.compile_stats.to_json())
+        self.assertEqual(len(d["stages"]), len(qf.compile_stats))
+        self.assertNotIn("_exps", d["stages"][0])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            qf.compile_stats.to_chrome_trace(path)
+            with open(path, "r") as f:
+                trace = json.load(f)
+
+        events = trace["traceEvents"]
+        self.assertEqual(len(events), len(qf.compile_stats))
+        self.assertTrue(all(e["ph"] == "X" for e in events))
+        self.assertIn("nodes", events[2]["args"])
@@ -15,8 +15,19 @@
 import unittest
 
 from parameterized import parameterized_class
+from sympy import Symbol, symbols
 
 from qlasskit import qlassf
+from qlasskit.ast2logic import Arg
+from qlasskit.boolopt import BoolOptimizerProfile
+from qlasskit.compiler import (
+    ExpQMap,
+    InternalCompiler,
+    LivenessStrategy,
+    PebblingStrategy,
+    to_quantum,
+)
+from qlasskit.compiler.ancilla import SymbolPebbler, schedule_by_liveness
 
 from .utils import ENABLED_COMPILERS, compute_and_compare_results
 
@@ -70,6 +81,20 @@ class TestCompiler(unittest.TestCase):
         self.assertEqual(qf.circuit().num_gates, 4)
         compute_and_compare_results(self, qf)
 
+    def test_not_of_shared(self):
+        # ~(a ^ b) must not flip the qubit of a ^ b, which And still uses
+        f = (
+            "def test(a: bool, b: bool, c: bool) -> bool:\n\t"
+            "return c or (a and (a ^ b) and not (a ^ b))"
+        )
+        qf = qlassf(
+            f,
+            to_compile=True,
+            compiler=self.compiler,
+            bool_optimizer=BoolOptimizerProfile([]),
+        )
+        compute_and_compare_results(self, qf)
+
     def test_sum_and_sub(self):
         f = "def test(a: Qint[2]) -> Qint[2]:\n" "\treturn (a + 3) - 3"
         qf = qlassf(f, to_compile=True, compiler=self.compiler, uncompute=True)
@@ -79,3 +104,148 @@ class TestCompiler(unittest.TestCase):
 
 
 # class TestInternalCompiler(unittest.TestCase):
+
+
+class TestAncillaStrategy(unittest.TestCase):
+    def test_liveness_chain(self):
+        a = symbols("a.0:9")
+        exps = []
+        for i in range(8):
+            exps.append((symbols(f"x{i}"), a[i] & a[i + 1]))
+            exps.append((symbols(f"_ret.{i}"), symbols(f"x{i}") ^ a[8]))
+        args = [Arg("a", bool, [s.name for s in a])]
+        returns = Arg("_ret", bool, [f"_ret.{i}" for i in range(8)])
+
+        qc = to_quantum("test", args, returns, exps)
+        qc_live = to_quantum(
+            "test", args, returns, exps, ancilla_strategy=LivenessStrategy()
+        )
+        self.assertEqual(qc.num_qubits, 9 + 8 + 8)
+        self.assertEqual(qc_live.num_qubits, 9 + 8 + 1)
+
+    def test_liveness(self):
+        f = "def test(a: Qint4, b: Qint4, c: Qint4) -> Qint4:\n\treturn a + b + c"
+        qf = qlassf(f, to_compile=False)
+        qf.compile(ancilla_strategy=LivenessStrategy())
+        compute_and_compare_results(self, qf)
+
+    def test_pebbling(self):
+        f = "def test(a: Qint4, b: Qint4) -> Qint8:\n\treturn a * b"
+        qf = qlassf(f, to_compile=True)
+        n_qubits = qf.circuit().num_qubits
+
+        qf.compile(ancilla_strategy=PebblingStrategy(max_qubits=0))
+        self.assertLess(qf.circuit().num_qubits, n_qubits)
+        compute_and_compare_results(self, qf)
+
+    def test_pebbling_counters(self):
+        f = "def test(a: Qint4, b: Qint4, c: Qint4) -> Qint4:\n\treturn a + b + c"
+        qf = qlassf(f, to_compile=False)
+        compiler = InternalCompiler(PebblingStrategy(max_qubits=0))
+        compiler.compile(qf.name, qf.args, qf.returns, qf.expressions)
+        self.assertGreater(compiler.pebbler.recomputed, 0)
+        self.assertEqual(compiler.pebbler.live, set())
+
+    def test_pebbling_gates_computed(self):
+        # Every live symbol, recomputed ones included, can be uncomputed
+        test = self
+
+        class CheckedPebbler(SymbolPebbler):
+            def before(self, i, exp):
+                super().before(i, exp)
+                for n in self.live:
+                    q = self.qc[n]
+                    test.assertTrue(
+                        any(ws[-1] == q for _, ws, _ in self.qc.gates_computed)
+                    )
+
+        class CheckedStrategy(PebblingStrategy):
+            def pebbler(self, compiler, qc, exprs):
+                return CheckedPebbler(compiler, qc, exprs, self.max_qubits)
+
+        f = "def test(a: Qint4, b: Qint4, c: Qint4) -> Qint4:\n\treturn a + b + c"
+        qf = qlassf(f, to_compile=False)
+        compiler = InternalCompiler(CheckedStrategy(max_qubits=0))
+        compiler.compile(qf.name, qf.args, qf.returns, qf.expressions)
+        self.assertGreater(compiler.pebbler.recomputed, 0)
+
+    def test_strategy_stats(self):
+        f = "def test(a: Qint4, b: Qint4) -> Qint8:\n\treturn a * b"
+        qf = qlassf(f, to_compile=False)
+        for strategy in [None, LivenessStrategy(), PebblingStrategy(max_qubits=0)]:
+            qf.compile(ancilla_strategy=strategy)
+        default, live, pebbling = [
+            st for st in qf.compile_stats if st.name == "compile"
+        ]
+
+        # Uncomputing and recomputing the symbols trades gates for qubits
+        self.assertEqual((default.qubits, default.gates), (50, 238))
+        self.assertEqual((live.qubits, live.gates), (50, 282))
+        self.assertEqual((pebbling.qubits, pebbling.gates), (37, 544))
+
+    def test_liveness_hash(self):
+        # Rounds of a hash, as in a Grover oracle: the symbols of a round die in the next
+        f = (
+            "def test(k: Qint4) -> Qint4:\n\th = k\n"
+            "\tfor i in range(3):\n\t\th = (h ^ (h << 1)) + 3\n\treturn h"
+        )
+        qf = qlassf(f, to_compile=False)
+        for strategy in [None, LivenessStrategy(), PebblingStrategy(max_qubits=0)]:
+            qf.compile(ancilla_strategy=strategy)
+            compute_and_compare_results(self, qf, test_original_f=False)
+        default, live, pebbling = [
+            st for st in qf.compile_stats if st.name == "compile"
+        ]
+
+        self.assertEqual((default.qubits, default.gates), (20, 86))
+        self.assertEqual((live.qubits, live.gates), (18, 86))
+        self.assertEqual((pebbling.qubits, pebbling.gates), (17, 124))
+
+    def test_schedule_by_liveness(self):
+        a, b, c, x, y, z = symbols("a b c x y z")
+        exps = [
+            (x, a & b),
+            (y, a ^ b),
+            (z, x & c),
+            (Symbol("_ret.0"), y | c),
+            (x, x ^ z),
+            (Symbol("_ret.1"), x & y),
+        ]
+        res = schedule_by_liveness(exps)
+        self.assertEqual(sorted(map(str, res)), sorted(map(str, exps)))
+
+        # The reads and the writes of x keep their order
+        self.assertLess(res.index(exps[2]), res.index(exps[4]))
+        self.assertLess(res.index(exps[4]), res.index(exps[5]))
+
+        # z is read right after being computed
+        self.assertEqual(res.index(exps[4]), res.index(exps[2]) + 1)
+
+    def test_other_compiler(self):
+        f = "def test(a: bool) -> bool:\n\treturn not a"
+        qf = qlassf(f, to_compile=False)
+        self.assertRaises(
+            Exception,
+            lambda: qf.compile("recompiler", ancilla_strategy=LivenessStrategy()),
+        )
+
+
+class TestExpQMap(unittest.TestCase):
+    def test_reverse_index(self):
+        a, b, c = symbols("a b c")
+        m = ExpQMap()
+        m[a & b] = 3
+        m[a | b] = 3
+        m[b ^ c] = 4
+        m[~c] = 5
+
+        self.assertNotIn(a & b, m)
+        self.assertEqual(m[a | b], 3)
+
+        m[b ^ c] = 5
+        self.assertNotIn(~c, m)
+        self.assertEqual(m.qubit_map, {3: {a | b}, 5: {b ^ c}})
+
+        m.remove([3, 5, 7])
+        self.assertEqual(len(m), 0)
+        self.assertEqual(m.qubit_map, {})
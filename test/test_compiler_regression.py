@@ -54,6 +54,18 @@ class TestCompilerRegression(unittest.TestCase):
 
         qlassf(f, bool_optimizer=boolopt.fastOptimizer)
 
+    def test_5_cancel_inverses(self):
+        # The peephole pass cancels gate pairs across gates on other qubits; the
+        # previous one, matching only adjacent gates, left 153 gates here
+        f = """def f(a: Qlist[Qint4, 4]) -> Qint4:
+    s = Qint4(0)
+    for x in a:
+        s = s + x
+    return s"""
+        qc = qlassf(f, to_compile=True, compiler="internal").circuit()
+        self.assertEqual(qc.num_gates, 139)
+        self.assertEqual(qc.num_qubits, 38)
+
 
 @parameterized_class(("compiler"), ENABLED_COMPILERS)
 class TestCompilerRegression_Multicomp(unittest.TestCase):
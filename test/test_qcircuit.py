@@ -12,11 +12,30 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
+import gc
+import itertools
+import pickle
+import random
 import unittest
+import weakref
 
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Statevector
 from sympy import Symbol
 
-from qlasskit.qcircuit import QCircuit, QCircuitEnhanced, gates
+from qlasskit import qlassf
+from qlasskit.qcircuit import (
+    CNotSim,
+    CompactGateList,
+    GateNotSimulableException,
+    LazyGateList,
+    QCircuit,
+    QCircuitEnhanced,
+    StatevectorSim,
+    gates,
+)
 
 from .utils import qiskit_measure_and_count
 
@@ -66,6 +85,33 @@ class TestQCircuit(unittest.TestCase):
         self.assertRaises(Exception, lambda qc: qc.get_key_by_index(3), qc)
         self.assertEqual(qc.get_key_by_index(0), "a")
 
+    def test_get_key_by_index_remap(self):
+        qc = QCircuitEnhanced()
+        a = qc.add_qubit("a")
+        anc = qc.add_ancilla()
+        self.assertEqual(qc.get_key_by_index(anc), "anc_0")
+
+        qc["a2"] = a
+        self.assertEqual(qc.get_key_by_index(a), "a2")
+        qc["a"] = a
+        self.assertEqual(qc.get_key_by_index(a), "a2")
+        del qc["a2"]
+        self.assertEqual(qc.get_key_by_index(a), "a")
+
+        qc.map_qubit(Symbol("r"), anc, promote=True)
+        self.assertEqual(qc.get_key_by_index(anc), "r")
+        self.assertNotIn("anc_0", qc)
+
+        qc["a"] = anc
+        self.assertEqual(qc.qubit_map.keys_of(anc), ["a", "r"])
+        self.assertEqual(qc.get_key_by_index(anc), "r")
+        self.assertRaises(Exception, lambda: qc.get_key_by_index(a))
+
+        qc2 = copy.deepcopy(qc)
+        qc2["z"] = a
+        self.assertEqual(qc2.get_key_by_index(a), "z")
+        self.assertEqual(pickle.loads(pickle.dumps(qc)).get_key_by_index(anc), "r")
+
     def test_add_free_ancilla(self):
         qc = QCircuitEnhanced()
         a = qc.add_ancilla(is_free=True)
@@ -81,6 +127,160 @@ class TestQCircuit(unittest.TestCase):
         qc = qc.repeat(4)
         self.assertEqual(qc.num_gates, 3 * 4)
 
+    def test_repeat_lazy(self):
+        block = QCircuitEnhanced(2)
+        block.x(0)
+        block.cx(0, 1)
+
+        qc = block.repeat(100)
+        self.assertIsInstance(qc.gates, LazyGateList)
+        self.assertEqual(len(qc.gates), 200)
+        self.assertIs(qc.gates[198], block.gates[0])
+        self.assertEqual(len(qc.repeat(3).gates), 600)
+
+        block.h(1)
+        qc.x(1)
+        qc.ancilla_lst.add(1)
+        self.assertEqual(len(block.gates), 3)
+        self.assertEqual(len(qc.gates), 201)
+        self.assertEqual(block.ancilla_lst, set())
+        self.assertEqual(named(qc.gates[:4]), named(block.gates[:2] * 2))
+
+    def test_append_lazy(self):
+        block = QCircuit(2)
+        block.x(0)
+        block.cx(0, 1)
+
+        qc = QCircuit(2)
+        qc.h(1)
+        qc += block.repeat(50)
+        self.assertFalse(qc.gates.materialized)
+        self.assertEqual(len(qc.gates), 101)
+        self.assertIs(qc.gates[99], block.gates[0])
+
+        qc.h(1)
+        self.assertEqual(named(qc.gates[-3:]), named(block.gates[:] + [qc.gates[0]]))
+
+    def test_copy_shares_gates(self):
+        qc = QCircuit(2)
+        qc.cx(0, 1)
+        qc.mctrl(gates.Z(), [0], 1)
+
+        for c in [qc.copy(), qc + qc, copy.deepcopy(qc)]:
+            self.assertIs(c.gates[0][0], qc.gates[0][0])
+            self.assertIs(c.gates[1][0], qc.gates[1][0])
+            c.x(0)
+            c["a"] = 0
+            self.assertEqual(len(qc.gates), 2)
+            self.assertNotIn("a", qc)
+
+
+def named(gl):
+    return [(g.name, w, p) for g, w, p in gl]
+
+
+class TestQCircuitCompact(unittest.TestCase):
+    def _circuits(self):
+        qcs = []
+        for compact in [False, True]:
+            qc = QCircuit(4, compact=compact)
+            qc.h(0)
+            qc.cx(0, 1)
+            qc.ccx(0, 1, 2)
+            qc.mcx([0, 1, 2], 3)
+            qc.cp(0.5, 1, 2)
+            qc.barrier("b")
+            qc.append(gates.MCtrl(gates.Z(), 2), [0, 1, 3])
+            qcs.append(qc)
+        return qcs
+
+    def test_interned_gates(self):
+        qc = QCircuit(2)
+        qc.cx(0, 1)
+        qc.cx(1, 0)
+        self.assertIs(qc.gates[0][0], qc.gates[1][0])
+        self.assertIs(gates.intern(gates.CX()), qc.gates[0][0])
+        mcx = gates.intern(gates.MCX(3))
+        self.assertIs(gates.from_opcode(gates.opcode(gates.MCX(3))), mcx)
+
+    def test_same_gates(self):
+        qc, qcc = self._circuits()
+        self.assertEqual(named(qcc.gates), named(qc.gates))
+        self.assertEqual(named(qcc.gates_computed), named(qc.gates_computed))
+        self.assertEqual(qcc.gates, list(qcc.gates))
+        self.assertEqual(qcc.num_gates, qc.num_gates)
+        self.assertEqual(qcc.gate_stats, qc.gate_stats)
+        self.assertEqual(named([qcc.gates[-1]]), named([qc.gates[-1]]))
+        self.assertEqual(named(reversed(qcc.gates)), named(reversed(qc.gates)))
+        self.assertEqual(qcc.export("circuit", "qasm"), qc.export("circuit", "qasm"))
+
+    def test_copy(self):
+        qc, qcc = self._circuits()
+        for c in [qcc.copy(), qcc + qcc, qcc.repeat(3), qcc.copy(vanilla=True)]:
+            self.assertTrue(c.compact)
+            self.assertEqual(named(c.gates[: len(qc.gates)]), named(qc.gates))
+
+        c = copy.deepcopy(qcc)
+        c.x(0)
+        self.assertEqual(len(c.gates), len(qcc.gates) + 1)
+
+        self.assertEqual(named(pickle.loads(pickle.dumps(qcc)).gates), named(qc.gates))
+
+    def test_mutation(self):
+        qc, qcc = self._circuits()
+        for c in [qc, qcc]:
+            c.gates[1:3] = [(gates.X(), [3], None)]
+            del c.gates[0]
+            c.gates.insert(0, (gates.Swap(), [0, 3], None))
+        self.assertEqual(named(qcc.gates), named(qc.gates))
+
+    def test_mutation_in_place(self):
+        random.seed(7)
+        g = [gates.intern(g) for g in [gates.X(), gates.CX(), gates.MCX(3), gates.CP()]]
+        pool = [(g[0], [0], None), (g[1], [1, 2], None)]
+        pool += [(g[2], [0, 1, 2, 3], None), (g[3], [0, 3], 0.5)]
+        ref = [random.choice(pool) for _ in range(20)]
+        gl = CompactGateList(ref)
+        for _ in range(200):
+            i, j = sorted(random.randrange(-3, len(ref) + 3) for _ in range(2))
+            new = [random.choice(pool) for _ in range(random.randrange(3))]
+            op = random.choice(["set", "setslice", "del", "delslice", "insert"])
+            if op == "set" and -len(ref) <= i < len(ref):
+                ref[i] = gl[i] = new[0] if new else pool[0]
+            elif op == "setslice":
+                ref[i:j] = gl[i:j] = new
+            elif op == "del" and -len(ref) <= i < len(ref):
+                del ref[i], gl[i]
+            elif op == "delslice":
+                del ref[i:j:2], gl[i:j:2]
+            elif op == "insert":
+                ref.insert(i, pool[1])
+                gl.insert(i, pool[1])
+            self.assertEqual(gl, ref)
+            self.assertEqual(len(gl.offsets), len(gl) + 1)
+            self.assertEqual(gl.offsets[-1], len(gl.operands))
+
+    def test_uncompute(self):
+        res = []
+        for compact in [False, True]:
+            qc = QCircuitEnhanced(compact=compact)
+            a = [qc.add_qubit(f"a{i}") for i in range(3)]
+            anc = qc.add_ancilla(is_free=False)
+            r = qc.add_qubit("r")
+            qc.ccx(a[0], a[1], anc)
+            qc.x(anc)
+            qc.cx(anc, r)
+            qc.uncompute([anc])
+            qc.uncompute_all([r])
+            qc.remove_identities()
+            res.append(qc)
+
+        self.assertEqual(named(res[0].gates), named(res[1].gates))
+        self.assertEqual(
+            CNotSim().simulate(res[1], [True, True]),
+            CNotSim().simulate(res[0], [True, True]),
+        )
+
 
 class TestQCircuitUncomputing(unittest.TestCase):
     def test1(self):
@@ -129,6 +329,194 @@ class TestQCircuitUncomputing(unittest.TestCase):
         qc.uncompute_all([r])
         # qc.draw()
 
+    def test_uncompute_all_lazy(self):
+        qc = QCircuitEnhanced()
+        q = [qc.add_qubit() for x in range(2)]
+        a = qc.add_ancilla(is_free=False)
+        r = qc.add_qubit()
+        qc.ccx(q[0], q[1], a)
+        qc.cx(a, r)
+        forward = list(qc.gates)
+
+        self.assertEqual(qc.uncompute_all([r]), {a})
+        self.assertIsInstance(qc.gates, LazyGateList)
+        self.assertEqual(named(qc.gates), named(forward + [forward[0]]))
+        self.assertEqual(len(qc.gates_computed), 3)
+
+        self.assertEqual(
+            CNotSim().simulate(qc, [True, True]), [True, True, False, True]
+        )
+        qc.export("circuit", "qasm")
+        self.assertFalse(qc.gates.materialized)
+
+        qc.x(r)
+        self.assertTrue(qc.gates.materialized)
+        self.assertEqual(len(qc.gates), 4)
+        self.assertEqual(
+            named(qc.gates[2:]), named([forward[0], (gates.X(), [r], None)])
+        )
+
+
+class TestLazyGateList(unittest.TestCase):
+    def test_segments(self):
+        base = [(gates.X(), [i], None) for i in range(4)]
+        gl = LazyGateList([(base, range(4)), (base, [3, 1])])
+
+        self.assertEqual(len(gl), 6)
+        self.assertEqual(gl[4], base[3])
+        self.assertEqual(gl[-1], base[1])
+        self.assertEqual(gl[3:5], [base[3], base[3]])
+        self.assertEqual(list(reversed(gl)), [base[1], base[3]] + base[::-1])
+        self.assertRaises(IndexError, lambda: gl[6])
+
+        del gl[0]
+        self.assertEqual(gl, base[1:] + [base[3], base[1]])
+        self.assertEqual(len(base), 4)
+
+
+class TestQCircuitSubCircuit(unittest.TestCase):
+    def _circuits(self):
+        inner = QCircuit(2, name="inner")
+        inner.cx(0, 1)
+        mid = QCircuit(3, name="mid")
+        mid.append_subcircuit(inner, [1, 2])
+        mid.x(0)
+        mid.ccx(0, 1, 2)
+
+        qc = QCircuit(4)
+        sub = qc.append_subcircuit(mid)
+        qc.append_subcircuit(sub, [3, 2, 1])
+        qc.append_subcircuit(inner, [0, 3], name="inner")
+
+        flat = QCircuit(4)
+        for g, w, p in qc.iter_gates():
+            flat.append(g, w, p)
+        return qc, flat
+
+    def test_expand(self):
+        qc, flat = self._circuits()
+        self.assertEqual(len(qc.gates), 3)
+        self.assertEqual(qc.num_gates, 7)
+        self.assertEqual(qc.gate_stats, flat.gate_stats)
+        self.assertEqual(
+            named(flat.gates[3:5]),
+            named([(gates.CX(), [2, 1], None), (gates.X(), [3], None)]),
+        )
+
+        for init in itertools.product([False, True], repeat=4):
+            self.assertEqual(
+                CNotSim().simulate(qc, list(init)), CNotSim().simulate(flat, list(init))
+            )
+
+    def test_shared_definition(self):
+        qc, _ = self._circuits()
+        self.assertIs(qc.gates[0][0], qc.gates[1][0])
+        qc.gates[0][0].qc.x(0)
+        self.assertEqual(qc.num_gates, 7 + 2)
+
+        qcc = qc.copy()
+        self.assertIs(qcc.gates[0][0], qc.gates[0][0])
+
+    def test_not_interned(self):
+        # The lists keep their subcircuits alive, the table of opcodes does not
+        qc = QCircuit(2)
+        qc.cx(0, 1)
+        qcc = QCircuit(2, compact=True)
+        sub = qcc.append_subcircuit(qc)
+        op = gates.opcode(sub)
+        self.assertLess(op, 0)
+        self.assertIs(gates.intern(sub), sub)
+
+        ref = weakref.ref(sub)
+        c = pickle.loads(pickle.dumps(qcc))
+        del sub
+        gc.collect()
+        self.assertIs(qcc.gates[0][0], ref())
+        self.assertIs(gates.from_opcode(op), ref())
+        self.assertEqual(c.gates[0][0].qc.num_gates, 1)
+
+        del qcc
+        gc.collect()
+        self.assertIsNone(ref())
+        self.assertNotEqual(gates.opcode(c.gates[0][0]), op)
+
+    def test_qasm(self):
+        qc, _ = self._circuits()
+        qasm = qc.export("circuit", "qasm")
+
+        self.assertEqual(qasm.count("gate mid "), 1)
+        self.assertEqual(qasm.count("gate inner "), 1)
+        self.assertEqual(qasm.count("gate inner_2 "), 1)
+        self.assertLess(qasm.index("gate inner "), qasm.index("gate mid "))
+        self.assertIn("\tmid q3 q2 q1\n", qasm)
+        self.assertIn("\tinner q1 q2\n", qasm)
+
+    def test_qiskit(self):
+        qc, flat = self._circuits()
+        qk = qc.export("circuit", "qiskit")
+        self.assertEqual(len(qk.data), 3)
+        self.assertEqual(qk.data[1].operation.name, "mid")
+
+        for init in [[True, False, True, False], [False, True, True, True]]:
+            counts = []
+            for c in [qc, flat]:
+                qk = QuantumCircuit(4)
+                [qk.x(i) for i in range(4) if init[i]]
+                qk.compose(c.export("circuit", "qiskit"), inplace=True)
+                counts.append(qiskit_measure_and_count(qk, shots=8))
+            self.assertEqual(counts[0], counts[1])
+
+
+class TestQCircuitPeephole(unittest.TestCase):
+    def test_cascade(self):
+        qc = QCircuit(3)
+        qc.x(0)
+        qc.cx(0, 1)
+        qc.h(2)
+        qc.ccx(0, 1, 2)
+        qc.ccx(1, 0, 2)
+        qc.h(2)
+        qc.cx(0, 1)
+        qc.x(0)
+        qc.remove_identities()
+        self.assertEqual(qc.num_gates, 0)
+
+    def test_disjoint_wires(self):
+        qc = QCircuit(4)
+        qc.cx(0, 1)
+        qc.x(2)
+        qc.swap(2, 3)
+        qc.cx(0, 1)
+        qc.swap(3, 2)
+        qc.remove_identities()
+        self.assertEqual(named(qc.gates), [("X", [2], None)])
+
+    def test_interfering(self):
+        qc = QCircuit(3)
+        qc.cx(0, 1)
+        qc.x(0)
+        qc.cx(0, 1)
+        qc.cx(1, 2)
+        qc.cx(2, 1)
+        qc.cx(1, 2)
+        qc.t(2)
+        qc.t(2)
+        qc.remove_identities()
+        self.assertEqual(qc.num_gates, 8)
+
+    def test_barrier(self):
+        qc = QCircuit(2)
+        qc.h(0)
+        qc.barrier()
+        qc.h(0)
+        qc.h(1)
+        qc.h(1)
+        qc.remove_identities()
+        self.assertEqual(
+            named(qc.gates),
+            [("H", [0], None), ("_barrier", [], None), ("H", [0], None)],
+        )
+
 
 class TestQCircuitQFT(unittest.TestCase):
     def test_qft(self):
@@ -151,3 +539,157 @@ class TestQCircuitQFT(unittest.TestCase):
 
         counts = qiskit_measure_and_count(qc.export("circuit", "qiskit"), shots=1024)
         self.assertEqual(counts, {"000": 1024})
+
+
+class TestCNotSim(unittest.TestCase):
+    def test_simulate(self):
+        qc = QCircuit(4)
+        qc.x(0)
+        qc.ccx(0, 1, 2)
+        qc.mcx([0, 1, 2], 3)
+        self.assertEqual(
+            CNotSim().simulate(qc, initialize=[False, True]), [True, True, True, True]
+        )
+        self.assertEqual(CNotSim().simulate(qc, to_measure=[2, 3]), [False, False])
+
+    def test_simulate_batch(self):
+        qc = QCircuit(5)
+        qc.x(0)
+        qc.cx(0, 1)
+        qc.ccx(1, 2, 3)
+        qc.mcx([0, 1, 2, 3], 4)
+        qc.append(gates.MCtrl(gates.X(), 2), [3, 4, 0])
+
+        inits = [list(v) for v in itertools.product([False, True], repeat=3)] * 30
+        res = CNotSim().simulate_batch(qc, inits)
+        self.assertEqual(len(res), len(inits))
+        for init, r in zip(inits, res):
+            self.assertEqual(r, CNotSim().simulate(qc, initialize=init))
+
+        res = CNotSim().simulate_batch(qc, inits, to_measure=[4, 0])
+        for init, r in zip(inits, res):
+            self.assertEqual(r, CNotSim().simulate(qc, init, to_measure=[4, 0]))
+
+    def test_simulate_batch_exhaustive(self):
+        qf = qlassf(
+            "def test(a: Qint4, b: Qint4) -> Qint4:\n\treturn a + b", to_compile=True
+        )
+        tt = qf.truth_table()
+        outs = qf.truth_table_header()[-qf.output_size :]
+        res = CNotSim().simulate_batch(
+            qf.circuit(), [line[: qf.input_size] for line in tt], to_measure=outs
+        )
+        self.assertEqual(res, [line[qf.input_size :] for line in tt])
+
+    def test_simulate_batch_not_simulable(self):
+        qc = QCircuit(2)
+        qc.h(0)
+        self.assertRaises(
+            GateNotSimulableException,
+            lambda: CNotSim().simulate_batch(qc, [[False, False]]),
+        )
+
+    def test_permutation_table(self):
+        qf = qlassf(
+            "def test(a: Qint2, b: Qint2) -> Qint2:\n\treturn a + b", to_compile=True
+        )
+        qc = qf.circuit().copy()
+        qc.swap(0, 1)
+        self.assertTrue(qc.is_permutation())
+
+        n = qc.num_qubits
+        table = qc.permutation_table()
+        inits = [[bool(i >> q & 1) for q in range(n)] for i in range(2**n)]
+        for i, r in enumerate(CNotSim().simulate_batch(qc, inits)):
+            self.assertEqual(table[i], sum(b << q for q, b in enumerate(r)))
+        self.assertEqual(sorted(table), list(range(2**n)))
+
+        self.assertIs(qc.permutation_table(), table)
+        qc.x(0)
+        self.assertEqual(list(qc.permutation_table()), [t ^ 1 for t in table])
+
+        # In place changes keeping the number of gates, as done by the optimizers
+        qc.gates[-1:] = [(gates.X(), [1], None)]
+        self.assertEqual(list(qc.permutation_table()), [t ^ 2 for t in table])
+        qc.gates[-1] = (gates.X(), [0], None)
+        self.assertEqual(list(qc.permutation_table()), [t ^ 1 for t in table])
+
+        qc.h(0)
+        self.assertFalse(qc.is_permutation())
+        self.assertRaises(GateNotSimulableException, lambda: qc.permutation_table())
+
+
+class TestStatevectorSim(unittest.TestCase):
+    def test_random(self):
+        random.seed(1)
+        gate_list = [gates.X, gates.Y, gates.Z, gates.H, gates.S, gates.T]
+        gate_list += [gates.CX, gates.CZ, gates.CCX, gates.Swap]
+
+        for _ in range(10):
+            qc = QCircuit.random(5, 30, gate_list)
+            qc.cp(0.3, 1, 3)
+            qc.append(gates.P(), [2], 1.1)
+            qc.mctrl(gates.Z(), [0, 2], 4)
+            qc.mcx([0, 1, 2], 3)
+
+            init = QCircuit(5)
+            init.x(0)
+            init.x(2)
+            expected = Statevector(
+                init.export("circuit", "qiskit").compose(qc.export("circuit", "qiskit"))
+            ).data
+            state = StatevectorSim().statevector(qc, [True, False, True])
+            self.assertTrue(np.allclose(state, expected))
+
+    def test_controlled_h(self):
+        qc = QCircuit(3)
+        qc.x(0)
+        qc.mctrl(gates.H(), [0, 2], 1)
+        qc.mctrl(gates.H(), [0], 1)
+        state = StatevectorSim().statevector(qc)
+        self.assertTrue(
+            np.allclose(state, np.array([0, 1, 0, 1, 0, 0, 0, 0]) / np.sqrt(2))
+        )
+
+        qc.mctrl(gates.H(), [0], 1)
+        state = StatevectorSim().statevector(qc)
+        self.assertTrue(np.allclose(state, [0, 1, 0, 0, 0, 0, 0, 0]))
+
+    def test_sample(self):
+        qc = QCircuit(3)
+        qc.h(0)
+        qc.cx(0, 2)
+        qc.x(1)
+
+        probs = StatevectorSim().probabilities(qc, to_measure=[1, 2])
+        self.assertTrue(np.allclose(probs, [0, 0.5, 0, 0.5]))
+
+        counts = StatevectorSim().sample(qc, shots=1000, seed=1)
+        self.assertEqual(set(counts), {"010", "111"})
+        self.assertEqual(sum(counts.values()), 1000)
+        self.assertEqual(StatevectorSim().sample(qc, 10, to_measure=[1]), {"1": 10})
+
+    def test_permutation_runs(self):
+        random.seed(2)
+        run = QCircuit.random(4, 20, [gates.X, gates.CX, gates.CCX, gates.Swap])
+        qc = QCircuit(4)
+        for _ in range(2):
+            qc.h(0)
+            qc.h(2)
+            qc += run
+            qc.t(1)
+
+        sim = StatevectorSim()
+        expected = Statevector(qc.export("circuit", "qiskit")).data
+        self.assertTrue(np.allclose(sim.statevector(qc), expected))
+        self.assertEqual(len(sim._tables), 1)
+
+        state = sim.statevector(run, [True, False, True])
+        self.assertEqual(np.flatnonzero(state).tolist(), [run.permutation_table()[5]])
+
+    def test_not_simulable(self):
+        qc = QCircuit(1)
+        qc.append(gates.P(), [0])
+        self.assertRaises(
+            GateNotSimulableException, lambda: StatevectorSim().statevector(qc)
+        )
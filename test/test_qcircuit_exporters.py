@@ -11,6 +11,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import gzip
+import io
+import os
+import tempfile
 import unittest
 
 import cirq
@@ -22,6 +26,7 @@ from sympy.physics.quantum.qapply import qapply
 from sympy.physics.quantum.qubit import Qubit, measure_all
 
 from qlasskit.qcircuit import QCircuit
+from qlasskit.qcircuit.exporter_qasm import QasmExporter
 
 from .utils import qiskit_measure_and_count
 
@@ -96,6 +101,24 @@ class TestQCircuitExportQASM(unittest.TestCase):
         call += ",".join([f"q[{x}]" for x in range(self.qc.num_qubits)])
         self.assertEqual(qasm_c, f"OPENQASM 3.0;\n\n{self.result}{call};\n")
 
+    def test_export_qasm_stream(self):
+        for version in [2, 3]:
+            exporter = QasmExporter(version=version)
+            qasm_c = exporter.export(self.qc, "circuit")
+
+            out = io.StringIO()
+            exporter.export_to(self.qc, out, "circuit")
+            self.assertEqual(out.getvalue(), qasm_c)
+
+            with tempfile.TemporaryDirectory() as d:
+                exporter.export_to(self.qc, os.path.join(d, "qc.qasm"), "circuit")
+                with open(os.path.join(d, "qc.qasm"), "rb") as f:
+                    self.assertEqual(f.read(), qasm_c.encode())
+
+                exporter.export_to(self.qc, os.path.join(d, "qc.qasm.gz"), "circuit")
+                with gzip.open(os.path.join(d, "qc.qasm.gz"), "rb") as f:
+                    self.assertEqual(f.read(), qasm_c.encode())
+
 
 @parameterized_class(
     ("qc", "result"),
@@ -0,0 +1,185 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from parameterized import parameterized
+from sympy import symbols
+from sympy.logic import ITE, And, Implies, Not, Or, Xor
+from sympy.logic.boolalg import true
+
+from qlasskit import qlassf
+from qlasskit.boolopt import (
+    BoolOptimizerProfile,
+    Budget,
+    Rule,
+    defaultOptimizer,
+    fusedOptimizer,
+    rule_rewrite,
+)
+from qlasskit.boolopt.bool_optimizer import apply_cse, merge_expressions
+from qlasskit.boolopt.rules import (
+    absorption_rules,
+    and_complement_rule,
+    default_rules,
+    double_not_rule,
+    or2and_rule,
+    or2xor_rule,
+    or_complement_rule,
+    remove_Implies_rule,
+    remove_ITE_rule,
+)
+
+from .test_bool_dag import equivalent
+
+a, b, c, d = symbols("a,b,c,d")
+_ret = symbols("_ret")
+
+
+def xor_not(e):
+    # Xor(!a, b) = !Xor(a, b)
+    for x in e.args:
+        if isinstance(x, Not):
+            return Not(Xor(*[y for y in e.args if y is not x], x.args[0]))
+    return None
+
+
+class TestRules(unittest.TestCase):
+    def test_rules(self):
+        self.assertEqual(
+            rule_rewrite([remove_ITE_rule]).visit(ITE(a, b, c)),
+            Or(And(a, b), And(Not(a), c)),
+        )
+        self.assertEqual(
+            rule_rewrite([remove_Implies_rule]).visit(Implies(a, b)), Or(Not(a), b)
+        )
+        self.assertEqual(
+            rule_rewrite([or2xor_rule]).visit(Or(And(a, b), And(Not(a), Not(b)))),
+            Not(Xor(a, b)),
+        )
+        self.assertEqual(
+            rule_rewrite([or2and_rule]).visit(Or(a, b, c)),
+            Not(And(Not(a), Not(b), Not(c))),
+        )
+        self.assertEqual(rule_rewrite([or2and_rule]).visit(Or(a, b)), Or(a, b))
+
+    def test_complement(self):
+        opt = rule_rewrite([and_complement_rule, or_complement_rule])
+        e = Xor(And(a, Not(a), evaluate=False), Or(b, c, Not(c), evaluate=False))
+        self.assertEqual(opt.visit(e), true)
+        self.assertEqual(opt.visit(Or(a, Not(b))), Or(a, Not(b)))
+
+    def test_absorption(self):
+        opt = rule_rewrite(absorption_rules)
+        self.assertEqual(opt.visit(And(a, b, Or(a, c))), And(a, b))
+        self.assertEqual(opt.visit(Or(a, And(a, c), And(b, c))), Or(a, And(b, c)))
+        self.assertEqual(opt.visit(Xor(d, Or(b, And(b, And(c, Or(c, a)))))), Xor(d, b))
+
+    def test_no_match(self):
+        e = Or(And(a, b, c), And(Not(a), Not(b)))
+        self.assertIs(rule_rewrite([or2xor_rule]).visit(e), e)
+
+    def test_fixpoint(self):
+        # The Or created by remove_ITE is rewritten by or2xor in the same pass
+        opt = rule_rewrite(default_rules)
+        self.assertEqual(opt.visit(ITE(a, b, Not(b))), Not(Xor(a, b)))
+        self.assertEqual(
+            opt.visit(And(d, Implies(a, Or(b, c)))),
+            And(d, Not(And(a, Not(b), Not(c)))),
+        )
+
+    def test_nested(self):
+        # Unlike transform_or2and, the Or below a 2 arguments Or are rewritten
+        e = Or(d, And(a, Or(a, b, c)))
+        self.assertEqual(
+            rule_rewrite([or2and_rule]).visit(e),
+            Or(d, And(a, Not(And(Not(a), Not(b), Not(c))))),
+        )
+
+    def test_profile(self):
+        opt = BoolOptimizerProfile(
+            [
+                merge_expressions,
+                remove_ITE_rule,
+                double_not_rule,
+                apply_cse,
+                or2and_rule,
+            ]
+        )
+        self.assertEqual(len(opt.steps), 4)
+        self.assertEqual(opt.steps[1].rules, [remove_ITE_rule, double_not_rule])
+        self.assertEqual(opt.steps[3].rules, [or2and_rule])
+        self.assertEqual(repr(opt.steps[1]), "rule_rewrite([remove_ITE, double_not])")
+
+    def test_not_skippable(self):
+        opt = BoolOptimizerProfile(default_rules, Budget(step_nodes=0))
+        self.assertFalse(opt.steps[0].skippable)
+        self.assertEqual(
+            opt.apply([(_ret, ITE(a, b, c))]), [(_ret, Or(And(a, b), And(Not(a), c)))]
+        )
+        self.assertTrue(rule_rewrite([double_not_rule]).skippable)
+
+    def test_custom_rule(self):
+        rule = Rule("xor_not", Xor, xor_not)
+        opt = rule_rewrite([rule, double_not_rule])
+        self.assertEqual(opt.visit(Xor(Not(a), b)), Not(Xor(a, b)))
+        self.assertEqual(opt.visit(Xor(Not(a), Not(b), c)), Xor(a, b, c))
+
+
+class TestFusedOptimizer(unittest.TestCase):
+    @parameterized.expand(
+        [
+            ("def f(a: Qint4, b: Qint4) -> Qint4:\n\treturn a - b ^ 3",),
+            ("def f(a: Qint4, b: Qint4) -> bool:\n\treturn a > b and a != 3",),
+            (
+                "def f(a: Qint4, b: Qint4) -> Qint4:\n\treturn a + b if a > b else a - b",
+            ),
+            ("def f(a: Qint2, b: Qint2) -> Qint4:\n\treturn a * b",),
+            (
+                "def f(a: bool, b: bool, c: bool) -> bool:\n"
+                "\treturn (a and not b) or (not a and c) or (b and c)",
+            ),
+        ]
+    )
+    def test_qlassf(self, src):
+        qf = qlassf(src, bool_optimizer=fusedOptimizer, to_compile=True)
+        ref = qlassf(src, to_compile=False)
+        self.assertEqual(qf.truth_table(), ref.truth_table())
+
+    @parameterized.expand(
+        [
+            ("def f(a: bool, b: bool) -> bool:\n\treturn a ^ (not b)",),
+            (
+                "def f(m: Qlist[Qint[4], 2]) -> Qint8:\n\thv = 0\n\tfor i in m:\n"
+                "\t\thv = ((hv << 4) ^ (hv >> 1) ^ i) & 0xff\n\treturn hv",
+            ),
+            (
+                "def f(a: Qlist[Qint4, 4]) -> Qint4:\n\ts = Qint4(0)\n\tfor x in a:\n"
+                "\t\ts = s + x\n\treturn s",
+            ),
+            ("def f() -> Tuple[Qint2, Qint2]:\n\treturn [0, 1]",),
+        ]
+    )
+    def test_regression_gates(self, src):
+        # The cases of test_compiler_regression: the rules do at least as well as the
+        # transformers of defaultOptimizer
+        qc = qlassf(src, bool_optimizer=fusedOptimizer).circuit()
+        ref = qlassf(src, bool_optimizer=defaultOptimizer).circuit()
+        self.assertLessEqual(qc.num_gates, ref.num_gates)
+        self.assertLessEqual(qc.num_qubits, ref.num_qubits)
+
+    def test_equivalence(self):
+        exps = [(_ret, Or(ITE(a, b, c), Implies(c, d), And(a, Not(Not(d)))))]
+        res = fusedOptimizer.apply(exps)[0][1]
+        self.assertTrue(equivalent(res, exps[0][1], [a, b, c, d]))
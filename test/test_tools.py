@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import gzip
+import json
 import os
 import subprocess
 import tempfile
@@ -27,7 +29,7 @@ from sympy.logic.utilities.dimacs import load
 import qlasskit
 from qlasskit.qcircuit import exporter_qasm
 from qlasskit.qlassfun import qlassf
-from qlasskit.tools import utils
+from qlasskit.tools import batch, py2qasm, utils
 
 dummy_script = """
 from qlasskit import qlassf
@@ -47,6 +49,80 @@ class TestTools_utils(unittest.TestCase):
         print(utils.parse_str(dummy_script))
 
 
+batch_script = """
+from qlasskit import qlassf, qlassfa
+
+@qlassf
+def a(b: bool) -> bool:
+    return not b
+
+@qlassfa(defs=[a], to_compile=False)
+def d(x: bool, y: bool) -> bool:
+    return a(x) and y
+
+@qlassfa(defs=[d])
+def e(x: bool, y: bool) -> bool:
+    return not d(x, y)
+
+def not_a_qlassf(x):
+    return x
+
+@qlassf
+def c(x: bool, y: bool, z: bool) -> bool:
+    return (x or y or not z) and (not y or z)
+"""
+
+
+class TestTools_batch(unittest.TestCase):
+    def test_find_jobs(self):
+        jobs = batch.find_jobs(batch_script)
+        self.assertEqual(list(map(lambda j: j[0], jobs)), ["a", "d", "e", "c"])
+        self.assertEqual(jobs[1][2], {"to_compile": False})
+        self.assertEqual(jobs[1][3], ["a"])
+        self.assertTrue(jobs[0][1].startswith("def a(b: bool) -> bool:"))
+
+    def test_compile_str_batch(self):
+        for workers in [1, 2]:
+            res = batch.compile_str_batch(batch_script, max_workers=workers)
+            self.assertEqual(list(map(lambda r: r["name"], res)), ["a", "d", "e", "c"])
+            for r in res:
+                self.assertIsNone(r["error"])
+                self.assertIn("total", r["time"])
+
+            self.assertIsNone(res[1]["circuit"])
+            self.assertEqual(res[2]["num_qubits"], 4)
+            self.assertTrue(res[2]["circuit"].startswith("OPENQASM 3.0;"))
+
+            qf = qlassf(dummy_qlassf, to_compile=True)
+            exporter = exporter_qasm.QasmExporter(version=3)
+            self.assertEqual(
+                res[3]["circuit"], exporter.export(qf.circuit(), mode="circuit")
+            )
+            self.assertEqual(
+                res[3]["expressions"], [[str(s), str(e)] for s, e in qf.expressions]
+            )
+
+    def test_compile_batch(self):
+        fs = [
+            "def f(a: Qint2, b: Qint2) -> Qint2:\n\treturn a + b",
+            "def g(a: Qint2) -> bool:\n\treturn a == 2",
+            "def h(a: Qint2) -> bool:\n\treturn a + zz",
+        ]
+        res = batch.compile_batch(fs, max_workers=2, to_compile=False)
+        self.assertEqual(list(map(lambda r: r["name"], res)), ["f", "g", "h"])
+        self.assertEqual(len(res[0]["expressions"]), 2)
+        self.assertNotIn("compile", res[1]["time"])
+        self.assertIsNotNone(res[2]["error"])
+
+    def test_failed_dependency(self):
+        script = batch_script.replace("return not b", "return not zz")
+        res = batch.compile_str_batch(script, max_workers=1)
+        self.assertIsNotNone(res[0]["error"])
+        self.assertEqual(res[1]["error"], "Dependency a failed")
+        self.assertEqual(res[2]["error"], "Dependency d failed")
+        self.assertIsNone(res[3]["error"])
+
+
 class TestPy2Bexp(unittest.TestCase):
     def setUp(self):
         # Create a temporary file to hold the dummy script
@@ -286,6 +362,12 @@ class TestPy2Qasm(unittest.TestCase):
         print(expected)
         self.assertTrue(result.stdout == expected)
 
+    def test_convert_to_quasm(self):
+        qf = qlassf(dummy_qlassf, to_compile=True, compiler="internal")
+        exporter = exporter_qasm.QasmExporter(version=2)
+        expected = exporter.export(qf.circuit(), mode="circuit")
+        self.assertEqual(py2qasm.convert_to_quasm(qf, version=2), expected)
+
     def test_specific_entrypoint(self):
         result = self.run_command(
             [
@@ -333,6 +415,26 @@ class TestPy2Qasm(unittest.TestCase):
         finally:
             os.unlink(output_file)
 
+    def test_output_to_gzip_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            output_file = os.path.join(d, "out.qasm.gz")
+            self.run_command(
+                [
+                    "python",
+                    "-m",
+                    "qlasskit.tools.py2qasm",
+                    "-i",
+                    self.temp_file.name,
+                    "-o",
+                    output_file,
+                ]
+            )
+            with gzip.open(output_file, "rt") as f:
+                content = f.read()
+            qf = qlassf(dummy_qlassf, to_compile=True, compiler="internal")
+            exporter = exporter_qasm.QasmExporter(version=3)
+            self.assertEqual(content, exporter.export(qf.circuit(), mode="circuit"))
+
     def test_stdin_input(self):
         result = self.run_command(
             ["python", "-m", "qlasskit.tools.py2qasm"], stdin_input=dummy_script
@@ -378,3 +480,25 @@ class TestPy2Qasm(unittest.TestCase):
         exporter = exporter_qasm.QasmExporter(version=3)
         expected = exporter.export(qf.circuit(), mode="circuit") + "\n"
         self.assertTrue(result.stdout == expected)
+
+    def test_all(self):
+        result = self.run_command(
+            [
+                "python",
+                "-m",
+                "qlasskit.tools.py2qasm",
+                "-i",
+                self.temp_file.name,
+                "-a",
+                "-j",
+                "2",
+            ]
+        )
+        res = json.loads(result.stdout)
+        self.assertEqual(list(map(lambda r: r["name"], res)), ["a", "c"])
+
+        qf = qlassf(dummy_qlassf, to_compile=True, compiler="internal")
+        exporter = exporter_qasm.QasmExporter(version=3)
+        self.assertEqual(
+            res[1]["circuit"], exporter.export(qf.circuit(), mode="circuit")
+        )
@@ -0,0 +1,106 @@
+# Copyright 2023-2025 Davide Gessa
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from parameterized import parameterized
+from sympy import Symbol, symbols
+from sympy.logic import And, Not, Or, Xor
+
+from qlasskit import qlassf
+from qlasskit.boolopt import defaultOptimizer, xagOptimizer
+from qlasskit.boolopt.xag import xag_rewrite
+from qlasskit.boolquant import Q
+
+from .test_bool_dag import equivalent
+
+a, b, c, d = symbols("a,b,c,d")
+_ret, _ret0, _ret1 = symbols("_ret,_ret.0,_ret.1")
+
+
+def inline(exps):
+    """Return the outputs of exps, with the temporary symbols replaced"""
+    env = {}
+    for s, e in exps:
+        env[s] = e.xreplace(env)
+    return env
+
+
+class TestXagRewrite(unittest.TestCase):
+    def test_redundancy(self):
+        exps = [(_ret, Or(And(a, b), And(a, Not(b))))]
+        self.assertEqual(xag_rewrite()(exps), [(_ret, a)])
+
+    def test_one_gate_cut(self):
+        exps = [(_ret, Xor(Or(And(a, b), And(a, Not(b))), Not(And(c, Not(c)))))]
+        self.assertEqual(xag_rewrite()(exps), [(_ret, Not(a))])
+
+        exps = [(_ret, Or(And(a, b, c), And(a, b, Not(c))))]
+        self.assertEqual(xag_rewrite()(exps), [(_ret, And(a, b))])
+
+    def test_merge_and_share(self):
+        x0 = Symbol("x0")
+        exps = [
+            (Symbol("t"), And(a, x0)),
+            (_ret0, Xor(Symbol("t"), c)),
+            (_ret1, Or(Symbol("t"), d)),
+        ]
+        res = xag_rewrite()(exps)
+        self.assertEqual(len(res), 3)
+
+        tmp = res[0][0]
+        self.assertNotIn(tmp.name, ["t", "x0"])
+        self.assertEqual(res[0][1], And(a, x0))
+        self.assertEqual(res[1:], [(_ret0, Xor(tmp, c)), (_ret1, Or(tmp, d))])
+
+    def test_shared_negation(self):
+        exps = [(_ret0, And(c, Not(Xor(a, b)))), (_ret1, And(d, Not(Xor(a, b))))]
+        res = xag_rewrite()(exps)
+        tmp = res[0][0]
+        self.assertEqual(res[0][1], Not(Xor(a, b)))
+        self.assertEqual(res[1:], [(_ret0, And(c, tmp)), (_ret1, And(d, tmp))])
+
+    def test_unsupported(self):
+        exps = [(_ret, Q.H(a))]
+        self.assertEqual(xag_rewrite()(exps), exps)
+
+    def test_equivalence(self):
+        exps = [
+            (Symbol("t"), Xor(a, And(b, c))),
+            (Symbol("u"), Or(And(Symbol("t"), d), And(Not(Symbol("t")), a))),
+            (_ret0, And(Symbol("u"), Not(And(a, b)))),
+            (_ret1, Xor(Symbol("u"), Symbol("t"), Or(b, c))),
+        ]
+        res = inline(xag_rewrite()(exps))
+        ref = inline(defaultOptimizer.apply(exps))
+        for s in [_ret0, _ret1]:
+            self.assertTrue(equivalent(res[s], ref[s], [a, b, c, d]))
+
+
+class TestXagOptimizer(unittest.TestCase):
+    @parameterized.expand(
+        [
+            ("def f(a: Qint4, b: Qint4) -> Qint4:\n\treturn a - b ^ 3",),
+            ("def f(a: Qint4, b: Qint4) -> bool:\n\treturn a > b and a != 3",),
+            (
+                "def f(a: Qint4, b: Qint4) -> Qint4:\n\tc = a\n\tfor i in range(2):"
+                "\n\t\tif c > b:\n\t\t\tc = c - b\n\treturn c",
+            ),
+            ("def f(a: Qint2, b: Qint2) -> Qint4:\n\treturn a * b",),
+        ]
+    )
+    def test_qlassf(self, src):
+        qf = qlassf(src, bool_optimizer=xagOptimizer, to_compile=True)
+        ref = qlassf(src, to_compile=False)
+        self.assertEqual(qf.truth_table(), ref.truth_table())
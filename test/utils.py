@@ -136,18 +136,19 @@ def compute_result_of_qcircuit(cls, qf, truth_line):  # noqa: C901
     return res_str
 
 
-def compute_result_of_qcircuit_using_cnotsim(cls, qf, truth_line):
+def compute_result_of_qcircuit_using_cnotsim(cls, qf, truth_lines):
+    """Simulate the circuit for all the truth_lines at once, using CNotSim batch mode"""
     qc = qf.circuit()
 
-    qinit = [True if truth_line[i] else False for i in range(qf.input_size)]
+    qinit = [line[: qf.input_size] for line in truth_lines]
+    to_measure = qf.truth_table_header()[-qf.output_size :]
 
-    res = CNotSim().simulate(qc, initialize=qinit)
+    res = CNotSim().simulate_batch(qc, initialize=qinit, to_measure=to_measure)
 
-    res_str = ""
-    for qname in qf.truth_table_header()[-qf.output_size :]:
-        res_str += "1" if res[qc[qname]] else "0"
-
-    return res_str
+    return {
+        tuple(line): "".join("1" if x else "0" for x in r)
+        for line, r in zip(truth_lines, res)
+    }
 
 
 def compute_result_of_originalf(cls, qf, truth_line):  # noqa: C901
@@ -209,7 +210,9 @@ def compute_result_of_originalf(cls, qf, truth_line):  # noqa: C901
     return res_original_str
 
 
-def compute_and_compare_results(cls, qf, test_original_f=True, test_qcircuit=True):
+def compute_and_compare_results(  # noqa: C901
+    cls, qf, test_original_f=True, test_qcircuit=True
+):
     """Create and simulate the qcircuit, and compare the result with the
     truthtable and with the original_f"""
     MAX_Q_SIM = 64
@@ -237,6 +240,15 @@ def compute_and_compare_results(cls, qf, test_original_f=True, test_qcircuit=Tru
     # print(circ_qi.draw("text"))
     # print(circ_qi.qasm())
 
+    cnotsim_results = None
+    if qc_truth and test_qcircuit and not os.getenv("GITHUB_ACTIONS"):
+        try:
+            cnotsim_results = compute_result_of_qcircuit_using_cnotsim(
+                cls, qf, qc_truth
+            )
+        except GateNotSimulableException:
+            pass
+
     for truth_line in truth_table:
         # Extract str of truthtable and result
         truth_str = "".join(
@@ -257,15 +269,8 @@ def compute_and_compare_results(cls, qf, test_original_f=True, test_qcircuit=Tru
             )
             cls.assertLessEqual(qf.num_qubits, max_qubits)
 
-            if os.getenv("GITHUB_ACTIONS"):
+            if cnotsim_results is not None:
+                cls.assertEqual(truth_str, cnotsim_results[tuple(truth_line)])
+            else:
                 res_qc = compute_result_of_qcircuit(cls, qf, truth_line)
                 cls.assertEqual(truth_str, res_qc)
-            else:
-                try:
-                    res_qc2 = compute_result_of_qcircuit_using_cnotsim(
-                        cls, qf, truth_line
-                    )
-                    cls.assertEqual(truth_str, res_qc2)
-                except GateNotSimulableException:
-                    res_qc = compute_result_of_qcircuit(cls, qf, truth_line)
-                    cls.assertEqual(truth_str, res_qc)